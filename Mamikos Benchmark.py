@@ -0,0 +1,383 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager, redirect_stdout
+from pathlib import Path
+from types import SimpleNamespace
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+
+from mamikos_utils import PageCorpus, ResourcePolicy, load_script, percentile, start_fixture_server
+
+
+def load_data_scraper():
+    """Import 'Mamikos Data Scrapper.py' (its file name is not a valid module name)"""
+    return load_script("Mamikos Data Scrapper.py", "mamikos_data_scrapper")
+
+
+def load_link_scraper():
+    """Import 'Mamikos Link Scrapper.py' the same way"""
+    return load_script("Mamikos Link Scrapper.py", "mamikos_link_scrapper")
+
+
+def build_stages(ds, ls):
+    """
+    Extraction stages to benchmark, as {kind: [(stage name, function(html, url))]}.
+    Search pages go through the link scraper's card harvest on a SoupDriver, which answers
+    HARVEST_CARDS_SCRIPT with harvest_cards() instead of a browser.
+    """
+    def fields_fast(html, url):
+        page = ds.LxmlPage.parse(html)
+        return ds.extract_product_fields_from_lxml(page) if page else ds.extract_product_fields_from_soup(BeautifulSoup(html, 'html.parser'))
+
+    return {
+        "listing": [
+            ("details_bs", lambda html, url: ds.scrape_mamikos_details_from_html(html)),
+            ("details_fast", lambda html, url: ds.scrape_mamikos_details_from_html_fast(html)),
+            ("fields", lambda html, url: ds.extract_product_fields_from_soup(BeautifulSoup(html, 'html.parser'))),
+            ("fields_fast", fields_fast),
+            ("full_record", lambda html, url: ds.scrape_product_data_from_html(html, url)),
+        ],
+        "search": [
+            ("harvest_cards", lambda html, url: replay_card_harvest(ls, html, url)),
+        ],
+    }
+
+
+def harvest_cards(driver):
+    """
+    Python counterpart of the link scraper's HARVEST_CARDS_SCRIPT over a SoupDriver's page:
+    the same card/link/text selectors, hrefs resolved against the page URL like link.href.
+    """
+    def text(card, selector):
+        element = card.select_one(selector)
+        return element.get_text().strip() if element else ''
+
+    results = []
+    for index, card in enumerate(driver.soup.select('.kost-rc')):
+        link = card.select_one('.kost-rc__inner') or card.select_one('a[href]')
+        if link is None:
+            continue
+        href = link.get('href') or ''
+        results.append({
+            'index': index,
+            'href': urljoin(driver.url, href) if link.name == 'a' and href else href,
+            'name': text(card, "[class*='room-title'], [class*='__title'], [class*='name']"),
+            'price': text(card, "[class*='price']"),
+            'area': text(card, "[class*='area'], [class*='location']"),
+        })
+    return results
+
+
+def replay_card_harvest(ls, html, url):
+    """
+    The link scraper's fast harvest (iter_harvested_links) over one saved search page.
+    No card is opened in a tab: replays have no browser to resolve redirects with.
+    Returns the product URLs it collected.
+    """
+    driver = SoupDriver(html, url, scripts={ls.HARVEST_CARDS_SCRIPT: harvest_cards})
+    scraper = object.__new__(ls.ImprovedMamikosScraper) # Skip __init__, which starts Chrome
+    scraper.driver = driver
+    scraper.opened_product_urls = []
+    scraper.card_details = {}
+    scraper.seen_index = None
+    scraper.verify_sample_rate = 0.0
+    scraper.verify_card_in_tab = lambda card: None
+    return list(scraper.iter_harvested_links(set()))
+
+
+class SoupElement:
+    """Element of a SoupDriver; every property read counts as one WebDriver call"""
+
+    def __init__(self, tag, driver):
+        self._tag = tag
+        self._driver = driver
+
+    @property
+    def tag_name(self):
+        self._driver.calls += 1
+        return self._tag.name
+
+    @property
+    def text(self):
+        self._driver.calls += 1
+        return self._tag.get_text()
+
+    def get_attribute(self, name):
+        self._driver.calls += 1
+        return self._tag.get(name)
+
+
+class SoupDriver:
+    """
+    Stand-in WebDriver over a saved page. It answers the calls debug_page_elements()
+    makes and counts them, since each one is a WebDriver round-trip in a real run.
+    execute_script() runs the Python counterpart registered for a script in `scripts`.
+    """
+
+    def __init__(self, html, url, scripts=None):
+        self.soup = BeautifulSoup(html, 'html.parser')
+        self.url = url
+        self._html = html
+        self._scripts = scripts or {}
+        self.calls = 0
+
+    @property
+    def current_url(self):
+        self.calls += 1
+        return self.url
+
+    @property
+    def title(self):
+        self.calls += 1
+        return self.soup.title.get_text() if self.soup.title else ""
+
+    @property
+    def page_source(self):
+        self.calls += 1
+        return self._html
+
+    def find_elements(self, by, selector):
+        self.calls += 1
+        try:
+            return [SoupElement(tag, self) for tag in self.soup.select(selector)]
+        except Exception:
+            return []
+
+    def execute_script(self, script, *args):
+        self.calls += 1
+        if script not in self._scripts:
+            raise NotImplementedError("SoupDriver has no Python counterpart for this script")
+        return self._scripts[script](self, *args)
+
+
+def debug_dom_calls(ds, pages):
+    """WebDriver calls debug_page_elements() makes on each page (it now only runs with --debug-selectors)"""
+    calls = []
+    for url, html in pages:
+        fake_scraper = SimpleNamespace(driver=SoupDriver(html, url))
+        ds.ImprovedMamikosScraper.debug_page_elements(fake_scraper)
+        calls.append(fake_scraper.driver.calls)
+    return calls
+
+
+@contextmanager
+def debug_logging():
+    """Log the scrapers' DEBUG messages (formatted, written to /dev/null) inside the block"""
+    logger = logging.getLogger("mamikos")
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        handler = logging.StreamHandler(devnull)
+        previous_level = logger.level
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+        try:
+            yield
+        finally:
+            logger.removeHandler(handler)
+            logger.setLevel(previous_level)
+
+
+# Bytes the page and its sub-resources pulled over the network, per the Resource Timing API
+TRANSFER_SIZE_SCRIPT = """
+return performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'))
+    .reduce((total, entry) => total + (entry.transferSize || 0), 0);
+"""
+
+
+def render_benchmark(ds, directory, repeat):
+    """
+    Load every .html page in `directory` (served by a local fixture server) in headless
+    Chrome, once with all resources and once with the --block-resources policy. Returns
+    one row per mode: render latency (driver.get + page_source), bytes transferred, and
+    whether the extracted record matched the unblocked render.
+    """
+    pages = sorted(Path(directory).glob("*.html"))
+    server, base_url = start_fixture_server(directory)
+    rows, baseline = [], {}
+    try:
+        for label, policy in (("all resources", None), ("blocked", ResourcePolicy())):
+            driver = ds.create_chrome_driver(resource_policy=policy)
+            latencies, transferred, mismatches = [], [], 0
+            try:
+                for _ in range(repeat):
+                    for page in pages:
+                        url = f"{base_url}/{page.name}"
+                        started = time.perf_counter()
+                        driver.get(url)
+                        html = driver.page_source
+                        latencies.append(time.perf_counter() - started)
+                        transferred.append(driver.execute_script(TRANSFER_SIZE_SCRIPT) or 0)
+                        record = ds.scrape_product_data_from_html(html, url)
+                        if policy is None:
+                            baseline.setdefault(page.name, record)
+                        elif record != baseline.get(page.name):
+                            mismatches += 1
+            finally:
+                driver.quit()
+            rows.append({
+                "mode": label,
+                "pages": len(latencies),
+                "p50_ms": percentile(latencies, 50) * 1000,
+                "p95_ms": percentile(latencies, 95) * 1000,
+                "kb_per_page": sum(transferred) / len(transferred) / 1024 if transferred else 0.0,
+                "record_mismatches": mismatches,
+            })
+    finally:
+        server.shutdown()
+    return rows
+
+
+def time_stage(function, pages, repeat):
+    """Run one stage over every page `repeat` times; returns per-call latencies in seconds."""
+    latencies = []
+    for _ in range(repeat):
+        for url, html in pages:
+            started = time.perf_counter()
+            function(html, url)
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+def peak_memory_of_stage(function, pages):
+    """Highest traced allocation peak (bytes) of one stage call over the corpus."""
+    peak = 0
+    tracemalloc.start()
+    try:
+        for url, html in pages:
+            tracemalloc.reset_peak()
+            function(html, url)
+            peak = max(peak, tracemalloc.get_traced_memory()[1])
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def check_golden(ds, corpus, listing_entries, update):
+    """
+    Compare full records and the fast extractor against stored golden outputs.
+    With update=True the golden files are (re)written instead. Returns a list of problems.
+    """
+    golden_dir = corpus.directory / "golden"
+    golden_dir.mkdir(exist_ok=True)
+    problems = []
+    for entry in listing_entries:
+        html = corpus.read(entry)
+        record = ds.scrape_product_data_from_html(html, entry["url"])
+        if ds.scrape_mamikos_details_from_html_fast(html) != ds.scrape_mamikos_details_from_html(html):
+            problems.append(f"{entry['url']}: fast extractor differs from the BeautifulSoup extractor")
+
+        golden_path = golden_dir / f"{Path(entry['file']).stem}.json"
+        if update:
+            golden_path.write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding='utf-8')
+            continue
+        if not golden_path.exists():
+            problems.append(f"{entry['url']}: no golden output (run with --update-golden)")
+            continue
+        expected = json.loads(golden_path.read_text(encoding='utf-8'))
+        changed = sorted(key for key in set(expected) | set(record) if expected.get(key) != record.get(key))
+        if changed:
+            problems.append(f"{entry['url']}: changed fields {', '.join(changed)}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded page corpus through the Mamikos extraction code.")
+    parser.add_argument("corpus", nargs="?", default="corpus", help="Corpus directory recorded with --record-corpus")
+    parser.add_argument("--repeat", type=int, default=3, help="Timing passes over the corpus per stage")
+    parser.add_argument("--update-golden", action="store_true", help="Write the current outputs as the new golden outputs")
+    parser.add_argument("--json", metavar="PATH", help="Also write the results as JSON")
+    parser.add_argument("--round-trip-ms", type=float, default=10.0,
+                        help="Assumed cost of one WebDriver call, for the debug diagnostics estimate")
+    parser.add_argument("--render-fixture", metavar="DIR",
+                        help="Instead of the corpus, render the .html pages in DIR in Chrome with and without --block-resources")
+    args = parser.parse_args()
+
+    if args.render_fixture:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull, redirect_stdout(devnull):
+            rows = render_benchmark(load_data_scraper(), args.render_fixture, args.repeat)
+        print(f"\n{'Mode':<15}{'Pages':>7}{'p50 ms':>10}{'p95 ms':>10}{'KB/page':>10}{'Changed':>9}")
+        print("-" * 61)
+        for row in rows:
+            print(f"{row['mode']:<15}{row['pages']:>7}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}"
+                  f"{row['kb_per_page']:>10.1f}{row['record_mismatches']:>9}")
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump({"render": rows}, f, indent=2)
+        return 1 if any(row['record_mismatches'] for row in rows) else 0
+
+    corpus = PageCorpus(args.corpus)
+    ds = load_data_scraper()
+    ls = load_link_scraper()
+    results = []
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull:
+        for kind, stages in build_stages(ds, ls).items():
+            entries = corpus.entries(kind)
+            pages = [(entry["url"], corpus.read(entry)) for entry in entries]
+            if not pages:
+                print(f"(no {kind} pages in {corpus.directory})")
+                continue
+            for name, function in stages:
+                with redirect_stdout(devnull): # Keep any stray prints out of the report
+                    latencies = time_stage(function, pages, args.repeat)
+                    peak = peak_memory_of_stage(function, pages)
+                results.append({
+                    "stage": name,
+                    "pages": len(pages),
+                    "pages_per_sec": len(latencies) / sum(latencies) if sum(latencies) else 0.0,
+                    "p50_ms": percentile(latencies, 50) * 1000,
+                    "p95_ms": percentile(latencies, 95) * 1000,
+                    "peak_mb": peak / (1024 * 1024),
+                })
+
+        with redirect_stdout(devnull):
+            problems = check_golden(ds, corpus, corpus.entries("listing"), args.update_golden)
+
+        # What --debug-selectors / DEBUG logging cost per page, now that both are opt-in
+        debug_cost = None
+        listing_pages = [(entry["url"], corpus.read(entry)) for entry in corpus.entries("listing")]
+        if listing_pages:
+            calls = debug_dom_calls(ds, listing_pages)
+            quiet = time_stage(lambda html, url: ds.scrape_mamikos_details_from_html(html), listing_pages, args.repeat)
+            with debug_logging():
+                verbose = time_stage(lambda html, url: ds.scrape_mamikos_details_from_html(html), listing_pages, args.repeat)
+            debug_cost = {
+                "debug_dom_calls_per_page": sum(calls) / len(calls),
+                "debug_dom_ms_per_page": sum(calls) / len(calls) * args.round_trip_ms,
+                "debug_logging_ms_per_page": (sum(verbose) / len(verbose) - sum(quiet) / len(quiet)) * 1000,
+            }
+
+    print(f"\n{'Stage':<14}{'Pages':>7}{'Pages/sec':>12}{'p50 ms':>10}{'p95 ms':>10}{'Peak MB':>10}")
+    print("-" * 63)
+    for row in results:
+        print(f"{row['stage']:<14}{row['pages']:>7}{row['pages_per_sec']:>12.1f}{row['p50_ms']:>10.2f}{row['p95_ms']:>10.2f}{row['peak_mb']:>10.2f}")
+
+    if debug_cost:
+        print("\nSkipped per page by default (opt in with --debug-selectors):")
+        print(f"  debug_page_elements: {debug_cost['debug_dom_calls_per_page']:.0f} WebDriver calls "
+              f"(~{debug_cost['debug_dom_ms_per_page']:.0f} ms at {args.round_trip_ms:g} ms/call)")
+        print(f"  DEBUG field logging: {debug_cost['debug_logging_ms_per_page']:.2f} ms")
+
+    if args.update_golden:
+        print(f"\n✓ Golden outputs written to {corpus.directory / 'golden'}")
+    elif problems:
+        print(f"\n❌ {len(problems)} golden check failure(s):")
+        for problem in problems:
+            print(f"  - {problem}")
+    else:
+        print("\n✓ All golden checks passed")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({"stages": results, "debug_cost": debug_cost, "golden_problems": problems}, f, indent=2)
+
+    return 1 if problems and not args.update_golden else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,9 @@
 from bs4 import BeautifulSoup
 import re
+try:
+    from lxml import etree, html as lxml_html
+except ImportError: # lxml is optional; the fast detail extractor falls back to BeautifulSoup
+    etree = lxml_html = None
 import requests
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service
@@ -12,10 +16,28 @@ from selenium.webdriver.common.action_chains import ActionChains
 import time
 import json
 import random
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
+from selenium.common.exceptions import (InvalidSelectorException, NoSuchElementException, StaleElementReferenceException,
+                                        TimeoutException, WebDriverException)
 import csv # Import the csv module
 import pandas as pd # Import pandas for CSV saving
 from pathlib import Path
+import argparse
+import logging
+import asyncio
+import contextlib
+import functools
+import math
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from mamikos_utils import (AsyncTokenBucket, DriverManager, HostRateLimiter, PageCache, PageCorpus, ResourcePolicy,
+                           RetryScheduler, ScrapeJournal, ScrapeMetrics, canonicalize_url, configure_logging, open_seen_index,
+                           wait_for_selectors)
+from mamikos_storage import open_record_writer
+
+# Per-field and per-selector diagnostics go to DEBUG, so normal runs skip formatting them
+logger = logging.getLogger("mamikos.data")
 
 # --- BeautifulSoup based scraping function (kept separate for clarity) ---
 def scrape_mamikos_details_from_html(html_content):
@@ -44,7 +66,7 @@ def scrape_mamikos_details_from_html(html_content):
     room_availability_bs = "N/A" # New field
     deposit_amount_bs = "N/A"    # New field
 
-    print("  Attempting to extract specific details with BeautifulSoup...")
+    logger.debug("  Attempting to extract specific details with BeautifulSoup...")
 
     # --- 1. Extract Owner Name ---
     owner_element = soup.find('div', class_='detail-kost-owner-section__owner-title')
@@ -54,9 +76,9 @@ def scrape_mamikos_details_from_html(html_content):
             owner_name = owner_text.replace("Kos disewakan oleh", "").strip()
         else:
             owner_name = owner_text.strip()
-        print(f"    - Owner Name (BS): '{owner_name}'")
+        logger.debug("    - Owner Name (BS): '%s'", owner_name)
     else:
-        print("    - Owner Name (BS): Element not found.")
+        logger.debug("    - Owner Name (BS): Element not found.")
 
 
     # --- 2. Extract Room Size ---
@@ -69,21 +91,21 @@ def scrape_mamikos_details_from_html(html_content):
                 text = element.get_text(strip=True)
                 if re.search(r'\d+(\.\d+)?\s*x\s*\d+(\.\d+)?\s*meter', text):
                     room_size = text
-                    print(f"    - Room Size (BS): '{room_size}'")
+                    logger.debug("    - Room Size (BS): '%s'", room_size)
                     break 
             if room_size == "N/A":
-                print("    - Room Size (BS): Pattern not found within elements.")
+                logger.debug("    - Room Size (BS): Pattern not found within elements.")
         else:
-            print("    - Room Size (BS): Parent container not found.")
+            logger.debug("    - Room Size (BS): Parent container not found.")
     else:
-        print("    - Room Size (BS): 'Spesifikasi tipe kamar' title not found.")
+        logger.debug("    - Room Size (BS): 'Spesifikasi tipe kamar' title not found.")
 
 
     # --- 3. Determine if Electricity is Included ---
     electricity_icon_excluded = soup.find('img', alt='Tidak termasuk listrik')
     if electricity_icon_excluded:
         is_electricity_included = "Tidak termasuk listrik"
-        print(f"    - Electricity (BS): '{is_electricity_included}' (via icon)")
+        logger.debug("    - Electricity (BS): '%s' (via icon)", is_electricity_included)
     else:
         all_p_tags = soup.find_all('p', string=re.compile(r'listrik', re.IGNORECASE))
         found_electricity_text = False
@@ -92,22 +114,22 @@ def scrape_mamikos_details_from_html(html_content):
             if "Tidak termasuk listrik" in text:
                 is_electricity_included = "Tidak termasuk listrik"
                 found_electricity_text = True
-                print(f"    - Electricity (BS): '{is_electricity_included}' (via explicit text)")
+                logger.debug("    - Electricity (BS): '%s' (via explicit text)", is_electricity_included)
                 break
             elif "listrik" in text: # If "listrik" is mentioned but not explicitly excluded
                 is_electricity_included = "Termasuk listrik (implied)"
                 found_electricity_text = True
-                print(f"    - Electricity (BS): '{is_electricity_included}' (via implied text)")
+                logger.debug("    - Electricity (BS): '%s' (via implied text)", is_electricity_included)
                 # Don't break immediately, in case a "Tidak termasuk" appears later
         
         if not found_electricity_text:
             description_element = soup.find('div', id='kost-owner-story-content')
             if description_element and "Token Mandiri" in description_element.get_text():
                 is_electricity_included = "Token Mandiri (electricity separate/token-based)"
-                print(f"    - Electricity (BS): '{is_electricity_included}' (via description)")
+                logger.debug("    - Electricity (BS): '%s' (via description)", is_electricity_included)
             else:
                 if is_electricity_included == "N/A": # Only if still N/A after checking implied texts
-                    print("    - Electricity (BS): No specific information or exclusion found.")
+                    logger.debug("    - Electricity (BS): No specific information or exclusion found.")
 
     # --- 4. Extract Price Before Discount (Original Price) ---
     # Prioritize specific class names for strikethrough prices
@@ -117,9 +139,9 @@ def scrape_mamikos_details_from_html(html_content):
     
     if price_before_discount_element:
         price_before_discount_bs = price_before_discount_element.get_text(strip=True)
-        print(f"    - Price Before Discount (BS): '{price_before_discount_bs}'")
+        logger.debug("    - Price Before Discount (BS): '%s'", price_before_discount_bs)
     else:
-        print("    - Price Before Discount (BS): Element not found.")
+        logger.debug("    - Price Before Discount (BS): Element not found.")
 
 
     # --- 5. Extract ALL Facilities from all relevant sections ---
@@ -138,27 +160,27 @@ def scrape_mamikos_details_from_html(html_content):
                     all_facilities_bs.append(text)
         
         if all_facilities_bs:
-            print(f"    - All Facilities (BS): Found {len(all_facilities_bs)} items.")
+            logger.debug("    - All Facilities (BS): Found %s items.", len(all_facilities_bs))
         else:
-            print("    - All Facilities (BS): No specific facility labels found across categories.")
+            logger.debug("    - All Facilities (BS): No specific facility labels found across categories.")
     else:
-        print("    - All Facilities (BS): No main facility category wrappers found.")
+        logger.debug("    - All Facilities (BS): No main facility category wrappers found.")
 
     # --- 6. Extract Room Availability ---
     room_availability_element = soup.find('p', class_='detail-kost-overview__availability-text bg-c-text bg-c-text--body-2')
     if room_availability_element:
         room_availability_bs = room_availability_element.get_text(strip=True)
-        print(f"    - Room Availability (BS): '{room_availability_bs}'")
+        logger.debug("    - Room Availability (BS): '%s'", room_availability_bs)
     else:
-        print("    - Room Availability (BS): Element not found.")
+        logger.debug("    - Room Availability (BS): Element not found.")
 
     # --- 7. Extract Deposit Amount ---
     deposit_amount_element = soup.find('p', class_='detail-kost-rule-item__pricing-amount bg-c-text bg-c-text--body-1')
     if deposit_amount_element:
         deposit_amount_bs = deposit_amount_element.get_text(strip=True)
-        print(f"    - Deposit Amount (BS): '{deposit_amount_bs}'")
+        logger.debug("    - Deposit Amount (BS): '%s'", deposit_amount_bs)
     else:
-        print("    - Deposit Amount (BS): Element not found.")
+        logger.debug("    - Deposit Amount (BS): Element not found.")
 
 
     return {
@@ -171,63 +193,735 @@ def scrape_mamikos_details_from_html(html_content):
         "deposit_amount_bs": deposit_amount_bs
     }
 
+# --- Fast single-parse variant of scrape_mamikos_details_from_html ---
+# BeautifulSoup's get_text() leaves out comments and the contents of these tags (ruby annotations included)
+_NON_TEXT_TAGS = frozenset(['script', 'style', 'template', 'rt', 'rp'])
+_ROOM_SIZE_LABEL_CLASS = re.compile(r'detail-kost-facility-item__label|bg-c-text--body-2')
+_ROOM_SIZE_PATTERN = re.compile(r'\d+(\.\d+)?\s*x\s*\d+(\.\d+)?\s*meter')
+_ROOM_SPEC_TITLE = re.compile(r'Spesifikasi tipe kamar', re.IGNORECASE)
+_LISTRIK = re.compile(r'listrik', re.IGNORECASE)
+
+def _lxml_get_text(element, separator="", strip=False):
+    """Equivalent of BeautifulSoup's Tag.get_text(separator, strip) for an lxml element"""
+    parts = []
+
+    def add(text):
+        if text:
+            if strip:
+                text = text.strip()
+            if text:
+                parts.append(text)
+
+    def walk(node):
+        add(node.text)
+        for child in node:
+            if isinstance(child.tag, str) and child.tag not in _NON_TEXT_TAGS:
+                walk(child)
+            add(child.tail) # Text after a comment/script still belongs to this element
+
+    if element.tag not in _NON_TEXT_TAGS:
+        walk(element)
+    return separator.join(parts)
+
+def _lxml_string(element):
+    """Equivalent of BeautifulSoup's Tag.string: the text of a lone child, recursing into lone child tags"""
+    while True:
+        children = list(element)
+        if element.text:
+            return None if children else element.text
+        if len(children) != 1 or children[0].tail:
+            return None
+        element = children[0]
+        if not isinstance(element.tag, str): # A lone comment counts as the string in BeautifulSoup
+            return element.text
+
+def _class_string(element):
+    """The class attribute normalised the way BeautifulSoup compares multi-class values"""
+    return " ".join((element.get('class') or '').split())
+
+class LxmlPage:
+    """
+    A page parsed once with lxml and walked once: every element in document order, plus
+    tag-name and class-token -> elements indexes. The fast detail extractor and the field
+    selectors are both answered from it, so a page is never parsed twice.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.elements = []
+        self.by_tag = {}
+        self.by_class = {}
+        for element in root.iter():
+            if not isinstance(element.tag, str): # Comments and processing instructions
+                continue
+            self.elements.append(element)
+            self.by_tag.setdefault(element.tag, []).append(element)
+            class_attr = element.get('class')
+            if class_attr:
+                for token in set(class_attr.split()):
+                    self.by_class.setdefault(token, []).append(element)
+
+    @classmethod
+    def parse(cls, html_content):
+        """The indexed page, or None when lxml is not installed or the input is best left to html.parser"""
+        # libxml2 normalises CR/LF while html.parser keeps it, so such input could differ
+        if lxml_html is None or not html_content or '\r' in html_content:
+            return None
+        try:
+            return cls(lxml_html.document_fromstring(html_content))
+        except (ValueError, etree.ParserError):
+            return None
+
+    @property
+    def title(self):
+        """Equivalent of soup.title.get_text(strip=True): the first <title>, or "" """
+        titles = self.by_tag.get('title')
+        return _lxml_get_text(titles[0], strip=True) if titles else ""
+
+    def select(self, selector):
+        """
+        Elements matching a CSS selector, in document order, like soup.select(). Only the
+        syntax PRODUCT_FIELD_SELECTORS uses is supported (tag, *, .class, [attr], [attr=v],
+        [attr*=v] and the descendant combinator); anything else raises ValueError.
+        """
+        compounds = _compile_selector(selector)
+        tag, classes, _ = compounds[-1]
+        if classes:
+            candidates = self.by_class.get(classes[0], ())
+        elif tag:
+            candidates = self.by_tag.get(tag, ())
+        else:
+            candidates = self.elements
+        return [element for element in candidates if _matches_selector(element, compounds)]
+
+_SELECTOR_PART = re.compile(r"""(?P<tag>\*|[a-zA-Z][\w-]*)|\.(?P<cls>[\w-]+)|\[(?P<attr>[\w-]+)(?:(?P<op>\*?=)(?P<quote>['"]?)(?P<value>[^'"\]]*)(?P=quote))?\]""")
+
+@functools.lru_cache(maxsize=None)
+def _compile_selector(selector):
+    """[(tag or None, class tokens, [(attribute, operator, value)])] per compound selector, outermost first"""
+    compounds = []
+    for compound in selector.split():
+        tag, classes, attributes, position = None, [], [], 0
+        while position < len(compound):
+            match = _SELECTOR_PART.match(compound, position)
+            if match is None or (match.group('tag') and position):
+                raise ValueError(f"Unsupported selector: {selector}")
+            if match.group('tag'):
+                tag = None if match.group('tag') == '*' else match.group('tag').lower()
+            elif match.group('cls'):
+                classes.append(match.group('cls'))
+            else:
+                attributes.append((match.group('attr').lower(), match.group('op'), match.group('value')))
+            position = match.end()
+        compounds.append((tag, tuple(classes), tuple(attributes)))
+    if not compounds:
+        raise ValueError(f"Unsupported selector: {selector}")
+    return tuple(compounds)
+
+def _matches_compound(element, compound):
+    tag, classes, attributes = compound
+    if tag and element.tag != tag:
+        return False
+    if classes and not set(classes) <= set((element.get('class') or '').split()):
+        return False
+    for name, operator, value in attributes:
+        actual = element.get(name)
+        if actual is None:
+            return False
+        if operator == '=' and actual != value:
+            return False
+        if operator == '*=' and (not value or value not in actual):
+            return False
+    return True
+
+def _matches_selector(element, compounds):
+    """The last compound matches the element itself, the others (in order) some of its ancestors"""
+    if not _matches_compound(element, compounds[-1]):
+        return False
+    remaining = list(compounds[:-1])
+    for ancestor in element.iterancestors():
+        if not remaining:
+            break
+        if _matches_compound(ancestor, remaining[-1]):
+            remaining.pop()
+    return not remaining
+
+def scrape_mamikos_details_from_html_fast(html_content, page=None):
+    """
+    Drop-in replacement for scrape_mamikos_details_from_html that returns the same dict.
+
+    The page is parsed once with lxml (or `page`, an already parsed LxmlPage, is reused)
+    and every field is answered from its class-name index instead of a separate full-tree
+    scan per field, and nothing is printed per field. Output matches the BeautifulSoup
+    version for well-formed markup such as Chrome's page_source (badly nested tags, e.g.
+    a <div> inside a <p>, are repaired differently by the two parsers). Falls back to the
+    BeautifulSoup version when lxml is not installed or cannot parse the input.
+    """
+    page = page or LxmlPage.parse(html_content)
+    if page is None:
+        return scrape_mamikos_details_from_html(html_content)
+    by_class = page.by_class
+    p_elements = page.by_tag.get('p', [])
+    excluded_electricity_icon = next((img for img in page.by_tag.get('img', ()) if img.get('alt') == 'Tidak termasuk listrik'), None)
+    owner_story = next((div for div in page.by_tag.get('div', ()) if div.get('id') == 'kost-owner-story-content'), None)
+
+    def first(tag, class_name, exact_class=False):
+        for element in by_class.get(class_name.split()[0], ()):
+            if element.tag == tag and (not exact_class or _class_string(element) == class_name):
+                return element
+        return None
+
+    owner_name = "N/A"
+    room_size = "N/A"
+    is_electricity_included = "N/A"
+    price_before_discount_bs = "N/A"
+    all_facilities_bs = []
+    room_availability_bs = "N/A"
+    deposit_amount_bs = "N/A"
+
+    # --- 1. Owner Name ---
+    owner_element = first('div', 'detail-kost-owner-section__owner-title')
+    if owner_element is not None:
+        owner_text = _lxml_get_text(owner_element, strip=True)
+        if "Kos disewakan oleh" in owner_text:
+            owner_name = owner_text.replace("Kos disewakan oleh", "").strip()
+        else:
+            owner_name = owner_text.strip()
+
+    # --- 2. Room Size ---
+    for title in by_class.get('detail-kost-facility-category__title', ()):
+        if title.tag != 'p':
+            continue
+        title_string = _lxml_string(title)
+        if title_string is None or not _ROOM_SPEC_TITLE.search(title_string):
+            continue
+        container = next((ancestor for ancestor in title.iterancestors('div')
+                          if 'detail-kost-facility-category' in (ancestor.get('class') or '').split()), None)
+        if container is not None:
+            for element in container.iter('p'):
+                classes = (element.get('class') or '').split()
+                if not any(_ROOM_SIZE_LABEL_CLASS.search(c) for c in classes):
+                    continue
+                text = _lxml_get_text(element, strip=True)
+                if _ROOM_SIZE_PATTERN.search(text):
+                    room_size = text
+                    break
+        break # Like soup.find(): only the first matching title is used
+
+    # --- 3. Electricity ---
+    if excluded_electricity_icon is not None:
+        is_electricity_included = "Tidak termasuk listrik"
+    else:
+        found_electricity_text = False
+        for p_tag in p_elements:
+            p_string = _lxml_string(p_tag)
+            if p_string is None or not _LISTRIK.search(p_string):
+                continue
+            text = _lxml_get_text(p_tag, strip=True)
+            if "Tidak termasuk listrik" in text:
+                is_electricity_included = "Tidak termasuk listrik"
+                found_electricity_text = True
+                break
+            elif "listrik" in text:
+                is_electricity_included = "Termasuk listrik (implied)"
+                found_electricity_text = True
+
+        if not found_electricity_text:
+            if owner_story is not None and "Token Mandiri" in _lxml_get_text(owner_story):
+                is_electricity_included = "Token Mandiri (electricity separate/token-based)"
+
+    # --- 4. Price Before Discount ---
+    price_element = first('span', 'rc-price__additional-discount-price bg-c-text bg-c-text--body-2 bg-c-text--strikethrough', exact_class=True)
+    if price_element is None:
+        price_element = first('span', 'bg-c-text bg-c-text--label-4 bg-c-text--strikethrough', exact_class=True)
+    if price_element is not None:
+        price_before_discount_bs = _lxml_get_text(price_element, strip=True)
+
+    # --- 5. All Facilities ---
+    for wrapper in by_class.get('detail-kost-facility-category', ()):
+        if wrapper.tag != 'div':
+            continue
+        for item in wrapper.iter('p'):
+            if 'detail-kost-facility-item__label' in (item.get('class') or '').split():
+                text = _lxml_get_text(item, strip=True)
+                if text and text not in all_facilities_bs:
+                    all_facilities_bs.append(text)
+
+    # --- 6. Room Availability ---
+    availability_element = first('p', 'detail-kost-overview__availability-text bg-c-text bg-c-text--body-2', exact_class=True)
+    if availability_element is not None:
+        room_availability_bs = _lxml_get_text(availability_element, strip=True)
+
+    # --- 7. Deposit Amount ---
+    deposit_element = first('p', 'detail-kost-rule-item__pricing-amount bg-c-text bg-c-text--body-1', exact_class=True)
+    if deposit_element is not None:
+        deposit_amount_bs = _lxml_get_text(deposit_element, strip=True)
+
+    return {
+        "owner_name": owner_name,
+        "room_size": room_size,
+        "is_electricity_included": is_electricity_included,
+        "price_before_discount_bs": price_before_discount_bs,
+        "all_facilities_bs": all_facilities_bs,
+        "room_availability_bs": room_availability_bs,
+        "deposit_amount_bs": deposit_amount_bs
+    }
+
+# --- Selectors for the fields read straight from the rendered page ---
+# (data key, field name used for validation/logging, selectors in priority order)
+PRODUCT_FIELD_SELECTORS = [
+    ('room_name', "Room Name", [
+        "p.detail-title__room-name",
+        "p[class*='detail-title__room-name']",
+        ".detail-title__room-name",
+        "h1", "h2", "h3",
+        "[class*='title']", "[class*='name']",
+        "main h1", "main h2"
+    ]),
+    ('price', "Price", [
+        "p[data-v-160ecdd7].bg-c-text.bg-c-text--body-1",
+        "span.rc-price__text.bg-c-text.bg-c-text--title-2", # More specific price selector
+        "p[class*='bg-c-text'][class*='body-1']",
+        ".bg-c-text.bg-c-text--body-1",
+        ".bg-c-text--body-1",
+        "[class*='price']", "[class*='harga']",
+        "*:contains('Rp')", "span:contains('Rp')", "p:contains('Rp')"
+    ]),
+    ('rating', "Rating", [
+        "p[data-v-d8a7c31a].detail-kost-overview__rating-text",
+        "p[class*='detail-kost-overview__rating-text']",
+        ".detail-kost-overview__rating-text",
+        "[class*='rating-text']",
+        "[class*='rating']", "[class*='score']",
+        "*:contains('★')", "span:contains('★')"
+    ]),
+    ('rating_count', "Rating Count", [
+        "p[data-v-d8a7c31a].detail-kost-overview__rating-review",
+        "p[class*='detail-kost-overview__rating-review']",
+        ".detail-kost-overview__rating-review",
+        "[class*='rating-review']",
+        "*:contains('ulasan')", "*:contains('review')"
+    ]),
+    ('transaction_count', "Transaction Count", [
+        "p[data-v-d8a7c31a].detail-kost-overview__total-transaction-text",
+        "p[class*='detail-kost-overview__total-transaction-text']",
+        ".detail-kost-overview__total-transaction-text",
+        "[class*='transaction-text']",
+        "*:contains('transaksi')", "*:contains('berhasil')"
+    ]),
+    ('tipe_kos', "Tipe Kos", [
+        "span[data-v-d8a7c31a].detail-kost-overview__gender-box",
+        "span[class*='detail-kost-overview__gender-box']",
+        ".detail-kost-overview__gender-box",
+        "[class*='gender-box']",
+        "*:contains('Putra')", "*:contains('Putri')", "*:contains('Campur')"
+    ]),
+    ('location', "Location", [
+        "p[data-v-d8a7c31a].detail-kost-overview__area-text",
+        "p[class*='detail-kost-overview__area-text']",
+        ".detail-kost-overview__area-text",
+        "[class*='area-text']",
+        "[class*='location']", "[class*='area']", "[class*='lokasi']"
+    ]),
+    ('discount_amount', "Discount", [
+        "span[data-v-160ecdd7].bg-c-text.bg-c-text--label-3",
+        "span[class*='bg-c-text'][class*='label-3']",
+        ".bg-c-text--label-3",
+        "[class*='discount']", "[class*='diskon']",
+        "*:contains('%')", "*:contains('diskon')"
+    ]),
+]
+
+# Collects every candidate text for every field in one WebDriver round-trip.
+# For each field it walks the selectors in priority order and, per matching element,
+# returns the same texts extract_text_with_priority reads one call at a time
+# (rendered text, textContent, value). Invalid selectors such as :contains() throw
+# in querySelectorAll and are skipped, exactly like the per-selector path.
+FIELD_CANDIDATES_SCRIPT = """
+const fields = arguments[0];
+const result = {};
+for (const [key, selectors] of fields) {
+    const seen = new Set();
+    const candidates = [];
+    for (const selector of selectors) {
+        let elements;
+        try {
+            elements = document.querySelectorAll(selector);
+        } catch (e) {
+            continue;
+        }
+        for (const el of elements) {
+            for (const text of [el.innerText, el.textContent, el.value]) {
+                const trimmed = (typeof text === 'string') ? text.trim() : '';
+                if (trimmed && !seen.has(trimmed)) {
+                    seen.add(trimmed);
+                    candidates.push(trimmed);
+                }
+            }
+        }
+    }
+    result[key] = candidates;
+}
+return result;
+"""
+
+# --- Adaptive readiness (see wait_for_listing_ready) ---
+# Everything scrape_mamikos_details_from_html and the field extraction read
+READINESS_SELECTORS = [
+    "p.detail-title__room-name",
+    "div.detail-kost-owner-section__owner-title",
+    "div.detail-kost-facility-category",
+    "p.detail-kost-overview__availability-text",
+    "p.detail-kost-rule-item__pricing-amount",
+]
+# Without these the page is not usable, so they are always waited for
+READINESS_CORE_SELECTORS = [
+    "p.detail-title__room-name",
+    "div.detail-kost-owner-section__owner-title",
+]
+# Minimum the fixed-delay path sleeps per page: 3-5s after get(), 3-5s after load,
+# at least one 2-3s scroll round and a final 1s (midpoints)
+FIXED_READINESS_SECONDS = 4 + 4 + 2.5 + 1
+
+LISTING_READY_SCRIPT = """
+const [selectors, coreSelectors, timeoutMs, settleMs, pollMs] = arguments;
+const done = arguments[arguments.length - 1];
+const start = performance.now();
+let lastMutation = start;
+const observer = new MutationObserver(() => { lastMutation = performance.now(); });
+observer.observe(document.documentElement, {childList: true, subtree: true});
+const present = (selector) => document.querySelector(selector) !== null;
+function check() {
+    window.scrollTo(0, document.body.scrollHeight); // Trigger lazy-loaded sections
+    const now = performance.now();
+    const missing = selectors.filter((selector) => !present(selector));
+    let reason = null;
+    if (missing.length === 0) {
+        reason = 'all selectors present';
+    } else if (coreSelectors.every(present) && now - lastMutation >= settleMs) {
+        reason = 'DOM settled';
+    } else if (now - start >= timeoutMs) {
+        reason = 'timeout';
+    }
+    if (reason) {
+        observer.disconnect();
+        done({reason: reason, missing: missing, elapsed_ms: now - start});
+    } else {
+        setTimeout(check, pollMs);
+    }
+}
+check();
+"""
+
+# Fields that must be found for an HTTP-fetched page to be accepted without a browser
+REQUIRED_HTTP_FIELDS = ['room_name', 'price']
+
+MISSING_VALUES = ("N/A", "Not found")
+
+class MissingFieldsError(Exception):
+    """A page rendered, but without some REQUIRED_HTTP_FIELDS (usually a slow or partial load)"""
+
+    def __init__(self, missing, record):
+        super().__init__(f"missing {', '.join(missing)}")
+        self.missing = missing
+        self.record = record
+
+def classify_failure(error):
+    """
+    (kind, retriable) for an exception raised while scraping one product page. Timeouts,
+    crashed browser sessions, incomplete pages and 5xx/429/connection errors are worth
+    another attempt; 4xx responses and errors in our own code are not.
+    """
+    if isinstance(error, MissingFieldsError):
+        return "missing_fields", True
+    if isinstance(error, (TimeoutException, requests.Timeout, asyncio.TimeoutError)):
+        return "timeout", True
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else None
+        return "http_error", status is None or status == 429 or status >= 500
+    if isinstance(error, requests.RequestException):
+        return "http_error", True
+    if isinstance(error, WebDriverException):
+        return "driver_crash", True
+    return "error", False
+
+# Headers for the browser-free fetch engines (HTTP and async)
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "id-ID,id;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+
+def validate_extracted_text(text, field_name):
+    """Validate extracted text makes sense for the field"""
+    text_lower = text.lower()
+    
+    skip_patterns = ['selengkapnya', 'chat', 'tanya pemilik', 'ajukan sewa', 'estimasi', 'promo', 'kuota terbatas', 'icon chevron right'] # Added 'promo' and related
+    if any(pattern in text_lower for pattern in skip_patterns):
+        if field_name not in ['Owner Name']: # Owner name can sometimes contain valid terms from skip_patterns
+            return False
+    
+    if field_name == "Price":
+        return 'rp' in text_lower and any(char.isdigit() for char in text)
+    elif field_name == "Rating":
+        return any(char.isdigit() for char in text) and len(text) < 10
+    elif field_name == "Room Name":
+        return len(text) > 5 and 'kos' in text_lower
+    elif field_name == "Discount": # Revised validation for discount
+        # A valid discount should contain numbers, a percentage, or specific discount keywords followed by numbers
+        if re.search(r'\d+%?', text) or '%' in text: # Matches "10%", "20", "50"
+            return True
+        if re.search(r'diskon\s*\d+rb', text_lower): # Matches "diskon 100rb"
+            return True
+        # If it's just "flash", "promo", or other non-quantifiable text, it's not a discount.
+        return False 
+    
+    return True
+
+def _extract_product_fields(select, text_of):
+    """PRODUCT_FIELD_SELECTORS in order over any parsed tree: select(selector) -> elements, text_of(element) -> text"""
+    fields = {}
+    for data_key, field_name, selectors in PRODUCT_FIELD_SELECTORS:
+        fields[data_key] = "Not found"
+        for selector in selectors:
+            if ':contains(' in selector: # Not valid CSS; the browser rejects these too
+                continue
+            found = None
+            for element in select(selector):
+                text = text_of(element)
+                if text and validate_extracted_text(text, field_name):
+                    found = text
+                    break
+            if found:
+                fields[data_key] = found
+                break
+    return fields
+
+def extract_product_fields_from_soup(soup):
+    """
+    HTML-only counterpart of the Selenium field extraction in extract_product_data.
+    Tries the same PRODUCT_FIELD_SELECTORS in the same order on an already parsed page.
+
+    Returns:
+        dict: data key -> extracted text, or "Not found".
+    """
+    return _extract_product_fields(
+        soup.select, lambda element: element.get_text(" ", strip=True) or (element.get('value') or '').strip())
+
+def extract_product_fields_from_lxml(page):
+    """extract_product_fields_from_soup for an LxmlPage; same selectors, same texts"""
+    return _extract_product_fields(
+        page.select, lambda element: _lxml_get_text(element, " ", strip=True) or (element.get('value') or '').strip())
+
+def scrape_product_data_from_html(html_content, url):
+    """
+    Build a full product record (same keys as extract_product_data) from raw page HTML,
+    without a browser. Used by the HTTP fetch engine.
+
+    The title, the detail fields and the selector fields all come from one lxml parse;
+    without lxml (or for input lxml would parse differently) the page goes through
+    BeautifulSoup instead, with the same result.
+    """
+    page = LxmlPage.parse(html_content)
+    if page is None:
+        soup = BeautifulSoup(html_content, 'html.parser')
+        data = {'url': url, 'page_title': soup.title.get_text(strip=True) if soup.title else ""}
+        data.update(scrape_mamikos_details_from_html(html_content))
+        data.update(extract_product_fields_from_soup(soup))
+        return data
+    data = {'url': url, 'page_title': page.title}
+    data.update(scrape_mamikos_details_from_html_fast(html_content, page=page))
+    data.update(extract_product_fields_from_lxml(page))
+    return data
+
+def format_timestamp(epoch=None):
+    """UTC ISO-8601 timestamp (to the second) for `scraped_at`/`delisted_at`; now if epoch is None"""
+    moment = datetime.now(timezone.utc) if epoch is None else datetime.fromtimestamp(epoch, timezone.utc)
+    return moment.isoformat(timespec='seconds')
+
+def load_previous_dataset(path):
+    """
+    Read an earlier run's output (save_data_to_json's .json, save_data_to_csv's .csv or a
+    .jsonl progress journal) as {canonical url: record}.
+    """
+    path = Path(path)
+    if path.suffix.lower() == '.jsonl':
+        return {canonicalize_url(url): record for url, record in ScrapeJournal.load(path).items()}
+    if path.suffix.lower() == '.csv':
+        with open(path, mode='r', newline='', encoding='utf-8') as file:
+            records = list(csv.DictReader(file))
+    else:
+        with open(path, 'r', encoding='utf-8') as file:
+            records = json.load(file)
+    return {canonicalize_url(record['url']): record for record in records if record.get('url')}
+
+def plan_incremental_crawl(current_urls, previous_records, refresh_fraction=0.1):
+    """
+    Decide what an incremental re-crawl has to scrape.
+
+    URLs not in the previous dataset (or previously delisted) are scraped. Of the listings
+    that are still live, the refresh_fraction with the oldest `scraped_at` (missing counts
+    as oldest) are scraped again; the rest keep their previous record. Previous listings
+    missing from current_urls have vanished from the search and are delisted.
+
+    Returns:
+        dict: new, refresh (URL lists), carried (URL list) and delisted (record list).
+    """
+    current_set = set(current_urls)
+    new, existing = [], []
+    for url in dict.fromkeys(current_urls): # Keeps CSV order, drops duplicates
+        previous = previous_records.get(url)
+        if previous is None or previous.get('listing_status') == 'delisted':
+            new.append(url)
+        else:
+            existing.append(url)
+
+    refresh_count = min(len(existing), math.ceil(len(existing) * max(0.0, refresh_fraction)))
+    oldest_first = sorted(existing, key=lambda url: previous_records[url].get('scraped_at') or '')
+    refresh = set(oldest_first[:refresh_count])
+    return {
+        'new': new,
+        'refresh': [url for url in existing if url in refresh],
+        'carried': [url for url in existing if url not in refresh],
+        'delisted': [record for url, record in previous_records.items() if url not in current_set],
+    }
+
+def create_chrome_driver(resource_policy=None):
+    """
+    Launch a new anti-detection Chrome session (the factory behind each scraper's DriverManager).
+    With a ResourcePolicy, images, fonts, media and trackers are not downloaded and pages
+    load with the "eager" strategy.
+    """
+    chrome_options = Options()
+    
+    # --- Anti-detection setup ---
+    # Disable automation detection features
+    chrome_options.add_argument("--disable-blink-features=AutomationControlled")
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+    
+    # General stealth options
+    chrome_options.add_argument("--disable-web-security")
+    chrome_options.add_argument("--disable-features=VizDisplayCompositor")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--no-sandbox") # Bypass OS security model (needed in some environments)
+    chrome_options.add_argument("--disable-dev-shm-usage") # Overcome limited resource problems (often paired with --no-sandbox)
+    chrome_options.add_argument("--disable-notifications") # Suppress notification pop-ups
+    chrome_options.add_argument("--log-level=3") # Suppress verbose logs from Chrome
+    chrome_options.add_argument("--disable-popup-blocking") # Disable pop-up blocker
+    chrome_options.add_argument("--disable-setuid-sandbox") # Another sandbox related option for stealth
+    chrome_options.add_argument("--allow-running-insecure-content") # Allow mixed content
+    chrome_options.add_argument("--disable-webgl") # Disable WebGL for fingerprinting mitigation
+    chrome_options.add_argument("--disable-software-rasterizer") # Disable software rasterizer for rendering consistency
+    chrome_options.add_argument("--no-default-browser-check") # Prevent "make default browser" prompts
+    chrome_options.add_argument("--ignore-certificate-errors") # Ignore certificate errors
+    chrome_options.add_argument("--disable-sync") # Disable sync services
+    chrome_options.add_argument("--mute-audio") # Mute audio
+
+    # Headless mode for background execution
+    chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-gpu") 
+    
+    # Set a consistent window size for headless (important for responsive sites)
+    chrome_options.add_argument("--window-size=1920,1080") 
+
+    # --- User-Agent Rotation ---
+    # A list of common User-Agent strings to rotate through
+    user_agents = [
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0",
+        "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Firefox/120.0",
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+        "Mozilla/5.0 (X11; CrOS x86_64 15183.78.0) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/107.0.5304.110 Safari/537.36" # Example Chrome OS
+    ]
+    selected_user_agent = random.choice(user_agents)
+    chrome_options.add_argument(f"user-agent={selected_user_agent}")
+    print(f"  Using User-Agent: {selected_user_agent}")
+    
+    if resource_policy is not None:
+        resource_policy.apply_to_options(chrome_options)
+    driver = webdriver.Chrome(options=chrome_options)
+    if resource_policy is not None:
+        resource_policy.apply_to_driver(driver)
+    
+    # Execute script to hide webdriver property (important anti-detection technique)
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    return driver
+
 class ImprovedMamikosScraper:
-    def __init__(self):
-        """Initialize Chrome driver with better anti-detection measures"""
-        chrome_options = Options()
-        
-        # --- Anti-detection setup ---
-        # Disable automation detection features
-        chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-        chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-        chrome_options.add_experimental_option('useAutomationExtension', False)
-        
-        # General stealth options
-        chrome_options.add_argument("--disable-web-security")
-        chrome_options.add_argument("--disable-features=VizDisplayCompositor")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("--no-sandbox") # Bypass OS security model (needed in some environments)
-        chrome_options.add_argument("--disable-dev-shm-usage") # Overcome limited resource problems (often paired with --no-sandbox)
-        chrome_options.add_argument("--disable-notifications") # Suppress notification pop-ups
-        chrome_options.add_argument("--log-level=3") # Suppress verbose logs from Chrome
-        chrome_options.add_argument("--disable-popup-blocking") # Disable pop-up blocker
-        chrome_options.add_argument("--disable-setuid-sandbox") # Another sandbox related option for stealth
-        chrome_options.add_argument("--allow-running-insecure-content") # Allow mixed content
-        chrome_options.add_argument("--disable-webgl") # Disable WebGL for fingerprinting mitigation
-        chrome_options.add_argument("--disable-software-rasterizer") # Disable software rasterizer for rendering consistency
-        chrome_options.add_argument("--no-default-browser-check") # Prevent "make default browser" prompts
-        chrome_options.add_argument("--ignore-certificate-errors") # Ignore certificate errors
-        chrome_options.add_argument("--disable-sync") # Disable sync services
-        chrome_options.add_argument("--mute-audio") # Mute audio
-
-        # Headless mode for background execution
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-gpu") 
-        
-        # Set a consistent window size for headless (important for responsive sites)
-        chrome_options.add_argument("--window-size=1920,1080") 
-
-        # --- User-Agent Rotation ---
-        # A list of common User-Agent strings to rotate through
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Edge/120.0.0.0",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Firefox/120.0",
-            "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; WOW64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Mozilla/5.0 (X11; CrOS x86_64 15183.78.0) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/107.0.5304.110 Safari/537.36" # Example Chrome OS
-        ]
-        selected_user_agent = random.choice(user_agents)
-        chrome_options.add_argument(f"user-agent={selected_user_agent}")
-        print(f"  Using User-Agent: {selected_user_agent}")
+    def __init__(self, fetch_engine="selenium", driver_manager=None):
+        """
+        Initialize Chrome driver with better anti-detection measures.
+        With fetch_engine="http" pages are fetched over a pooled requests session instead,
+        and Chrome is only launched the first time a page needs the Selenium fallback.
+        Browser sessions come from driver_manager (a DriverManager, shared by pool workers);
+        without one the scraper gets its own manager with no warm spares and no recycling.
+        """
+        self.fetch_engine = fetch_engine
+        self.driver = None
+        self.driver_manager = driver_manager or DriverManager(create_chrome_driver)
+        self._owns_driver_manager = driver_manager is None
+        self.http_session = None
+        if fetch_engine == "selenium":
+            self.start_driver()
         
-        self.driver = webdriver.Chrome(options=chrome_options)
+        self.scraped_data = []
+        self._results_lock = threading.RLock() # Guards scraped_data/writers when several workers report results
+        self.journal = None # Optional ScrapeJournal, see open_journal()
+        self.completed_urls = set() # Canonical CSV URLs the scraping loops skip: journaled by a resumed run, or kept by an incremental crawl
+        self.seen_index = None # Optional SeenUrlIndex: listings scraped by earlier runs are skipped, new ones added
+        self.url_regions = {} # URL -> region, when the CSV has a Region column (multi-region link batches)
+        self.single_pass_fields = True # False = the old one-WebDriver-call-per-selector extraction
+        self.field_extraction_seconds = [] # Per-page cost of the Selenium field extraction
+        self.corpus = None # Optional PageCorpus that keeps a copy of every fetched page
+        self.page_cache = None # Optional PageCache of rendered pages, see scrape_single_product()
+        self.last_page_source = None # HTML captured by the most recent extract_product_data() call
+        self.readiness_mode = "fixed" # "adaptive" = event-driven wait_for_listing_ready() instead of fixed sleeps
+        self.readiness_seconds = [] # Time spent waiting for each page to be ready
+        self.readiness_savings = [] # Adaptive mode: estimated seconds saved per page vs the fixed sleeps
+        self.page_load_metrics = [] # One {url, matched_selector, elapsed_seconds, preferred} per wait_for_page_load()
+        self.output_writers = [] # Streaming writers (mamikos_storage.open_record_writer) fed every record as it is produced
+        self.keep_results = True # False: records only go to the journal and output_writers, not into scraped_data
+        self.record_count = 0 # Records stored so far, whether or not they are kept in memory
+        self.incremental_crawl = False # Set by prepare_incremental_crawl(); new records are then marked active
+        self.incremental_url_count = 0
+        self.incremental_refresh = {} # Refresh URL -> its previous record, until a new record replaces it
+        self.debug_selectors = False # Run debug_page_elements() on every page (diagnostic WebDriver queries)
+        self.metrics = None # Optional ScrapeMetrics: per-URL stage timings (shared with pool workers)
+        self.retry_scheduler = RetryScheduler() # Failed URLs retried with backoff at the end of the run, then dead-lettered
         
-        # Execute script to hide webdriver property (important anti-detection technique)
-        self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+    def start_driver(self):
+        """Attach a healthy Chrome session from the driver manager to this scraper as self.driver"""
+        self.driver = self.driver_manager.acquire()
         
-        self.scraped_data = []
+    def restart_driver(self):
+        """Replace a crashed Chrome session without touching the data collected so far"""
+        self.driver = self.driver_manager.replace(self.driver)
+        
+    def ensure_driver(self):
+        """Launch Chrome on first use (the HTTP engine only needs it for fallbacks)"""
+        if self.driver is None:
+            print("  Launching Chrome for the Selenium fallback...")
+            self.start_driver()
+        
+    def get_http_session(self, pool_size=10):
+        """Pooled keep-alive HTTP session used by the HTTP fetch engine"""
+        if self.http_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update(HTTP_HEADERS)
+            self.http_session = session
+        return self.http_session
+        
+    def fetch_page_http(self, url, timeout=20):
+        """Fetch a page's raw HTML over the pooled session. Returns (final_url, html)."""
+        response = self.get_http_session().get(url, timeout=timeout)
+        response.raise_for_status()
+        return response.url, response.text
         
     def human_like_delay(self, min_seconds=1, max_seconds=3):
         """Add random delay to mimic human behavior"""
@@ -240,42 +934,38 @@ class ImprovedMamikosScraper:
         self.human_like_delay(1, 3)
         
     def wait_for_page_load(self, timeout=20):
-        """Wait for the product page to fully load"""
+        """
+        Wait for the product page to fully load.
+        All indicators are checked together in one polling loop under one overall deadline;
+        the generic ones (headings, main, .container) only count if none of the
+        page-specific ones appears in time.
+        """
         print("⏳ Waiting for product page to load...")
         
         load_indicators = [
             "p.detail-title__room-name", 
             ".detail-title__room-name",
-            "h1", "h2", 
             "[class*='detail-title']",
-            "main", ".container",
             ".detail-kost-owner-section__owner-title" # Added owner title as a robust indicator
         ]
+        fallback_indicators = ["h1", "h2", "main", ".container"]
         
-        for indicator in load_indicators:
-            try:
-                WebDriverWait(self.driver, timeout).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, indicator))
-                )
-                print(f"✓ Page loaded (detected: {indicator})")
-                return True
-            except TimeoutException:
-                continue
+        matched, elapsed, preferred = wait_for_selectors(self.driver, load_indicators, fallback_indicators, timeout)
+        self.page_load_metrics.append({'url': self.driver.current_url, 'matched_selector': matched,
+                                       'elapsed_seconds': round(elapsed, 3), 'preferred': preferred})
+        if matched:
+            print(f"✓ Page loaded (detected: {matched} after {elapsed:.1f}s)")
+            return True
         
-        print("⚠️ Could not confirm page load, proceeding anyway...")
+        print(f"⚠️ Could not confirm page load after {elapsed:.1f}s, proceeding anyway...")
         return False
         
     def wait_for_any_element(self, selectors, timeout=10):
-        """Wait for any of the given selectors to be present"""
-        for selector in selectors:
-            try:
-                element = WebDriverWait(self.driver, timeout).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, selector))
-                )
-                return element, selector
-            except TimeoutException:
-                continue
-        return None, None
+        """Wait for any of the given selectors to be present (one polling loop, one deadline)"""
+        matched, _, _ = wait_for_selectors(self.driver, selectors, timeout=timeout)
+        if matched is None:
+            return None, None
+        return self.driver.find_element(By.CSS_SELECTOR, matched), matched
         
     def extract_text_with_priority(self, selectors, field_name):
         """
@@ -283,6 +973,8 @@ class ImprovedMamikosScraper:
         Put the working selectors from product 2 first
         """
         for i, selector in enumerate(selectors):
+            if ':contains(' in selector: # Not valid CSS; the browser would reject it on every page
+                continue
             try:
                 elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
                 
@@ -297,51 +989,64 @@ class ImprovedMamikosScraper:
                     for method in text_methods:
                         try:
                             text = method(element)
-                            if text and len(text.strip()) > 0:
-                                if self.validate_extracted_text(text, field_name):
-                                    print(f"✓ {field_name}: '{text}' (selector #{i+1}: {selector})")
-                                    return text
-                        except:
-                            continue
+                        except StaleElementReferenceException:
+                            logger.debug("  %s: element went stale (selector #%d: %s)", field_name, i + 1, selector)
+                            break # The element is gone; the other methods would fail the same way
+                        if text and len(text.strip()) > 0:
+                            if self.validate_extracted_text(text, field_name):
+                                logger.debug("✓ %s: '%s' (selector #%d: %s)", field_name, text, i + 1, selector)
+                                return text
                             
-            except Exception as e:
+            except InvalidSelectorException as e:
+                logger.warning("⚠️ %s: invalid selector %s (%s)", field_name, selector, e.msg)
                 continue
+            # Any other WebDriverException means the session itself failed; it propagates so the
+            # page is classified (driver_crash/timeout) and retried instead of silently coming back "Not found"
         
-        print(f"❌ {field_name}: Not found with any selector")
+        logger.debug("❌ %s: Not found with any selector", field_name)
         return "Not found"
     
+    def extract_fields_single_pass(self):
+        """
+        Resolve all PRODUCT_FIELD_SELECTORS fields with a single execute_script call.
+        The browser returns the candidate texts in priority order and the usual
+        validate_extracted_text rules pick the winner here, so the result matches
+        extract_text_with_priority without its hundreds of WebDriver round-trips.
+        """
+        selector_table = [[data_key, selectors] for data_key, _, selectors in PRODUCT_FIELD_SELECTORS]
+        try:
+            candidates = self.driver.execute_script(FIELD_CANDIDATES_SCRIPT, selector_table) or {}
+        except WebDriverException as e:
+            print(f"  Single-pass extraction failed ({e}); using per-selector extraction.")
+            return {data_key: self.extract_text_with_priority(selectors, field_name)
+                    for data_key, field_name, selectors in PRODUCT_FIELD_SELECTORS}
+
+        fields = {}
+        for data_key, field_name, _ in PRODUCT_FIELD_SELECTORS:
+            fields[data_key] = "Not found"
+            for text in candidates.get(data_key, []):
+                text = text.strip()
+                if text and self.validate_extracted_text(text, field_name):
+                    fields[data_key] = text
+                    logger.debug("✓ %s: '%s'", field_name, text)
+                    break
+            else:
+                logger.debug("❌ %s: Not found with any selector", field_name)
+        return fields
+    
     def validate_extracted_text(self, text, field_name):
         """Validate extracted text makes sense for the field"""
-        text_lower = text.lower()
-        
-        skip_patterns = ['selengkapnya', 'chat', 'tanya pemilik', 'ajukan sewa', 'estimasi', 'promo', 'kuota terbatas', 'icon chevron right'] # Added 'promo' and related
-        if any(pattern in text_lower for pattern in skip_patterns):
-            if field_name not in ['Owner Name']: # Owner name can sometimes contain valid terms from skip_patterns
-                return False
-        
-        if field_name == "Price":
-            return 'rp' in text_lower and any(char.isdigit() for char in text)
-        elif field_name == "Rating":
-            return any(char.isdigit() for char in text) and len(text) < 10
-        elif field_name == "Room Name":
-            return len(text) > 5 and 'kos' in text_lower
-        elif field_name == "Discount": # Revised validation for discount
-            # A valid discount should contain numbers, a percentage, or specific discount keywords followed by numbers
-            if re.search(r'\d+%?', text) or '%' in text: # Matches "10%", "20", "50"
-                return True
-            if re.search(r'diskon\s*\d+rb', text_lower): # Matches "diskon 100rb"
-                return True
-            # If it's just "flash", "promo", or other non-quantifiable text, it's not a discount.
-            return False 
-        
-        return True
+        return validate_extracted_text(text, field_name)
     
     def debug_page_elements(self):
-        """Enhanced debugging to find available elements"""
-        print(f"\n🔍 DEBUGGING PAGE: {self.driver.current_url}")
-        print(f"Page title: {self.driver.title}")
-        print(f"Page source length: {len(self.driver.page_source)}")
-        print("-" * 60)
+        """
+        Enhanced debugging to find available elements. Costs dozens of WebDriver round-trips
+        per page, so extract_product_data() only calls it with debug_selectors on (--debug-selectors).
+        """
+        logger.debug("\n🔍 DEBUGGING PAGE: %s", self.driver.current_url)
+        logger.debug("Page title: %s", self.driver.title)
+        logger.debug("Page source length: %d", len(self.driver.page_source))
+        logger.debug("-" * 60)
         
         working_selectors = [
             "p.detail-title__room-name",
@@ -363,47 +1068,31 @@ class ImprovedMamikosScraper:
             "p.detail-kost-rule-item__pricing-amount" # Deposit amount (new)
         ]
         
-        print("🎯 Checking for key selectors on current page:")
+        logger.debug("🎯 Checking for key selectors on current page:")
         for selector in working_selectors:
             try:
                 elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
                 if elements:
-                    print(f"✓ Found {len(elements)} element(s) with: {selector}")
+                    logger.debug("✓ Found %d element(s) with: %s", len(elements), selector)
                     for i, elem in enumerate(elements[:3]): # Show first 3 elements
                         try:
                             # For img tags, also print alt attribute as it's relevant
                             if elem.tag_name == 'img' and elem.get_attribute('alt'):
-                                print(f"    {i+1}. Alt Text: '{elem.get_attribute('alt')}'")
+                                logger.debug("    %d. Alt Text: '%s'", i + 1, elem.get_attribute('alt'))
                             else:
                                 text = elem.text.strip()
-                                print(f"    {i+1}. Text: '{text[:100]}{'...' if len(text) > 100 else ''}'")
-                        except:
-                            print(f"    {i+1}. (No readable text/attribute)")
+                                logger.debug("    %d. Text: '%s%s'", i + 1, text[:100], '...' if len(text) > 100 else '')
+                        except StaleElementReferenceException:
+                            logger.debug("    %d. (No readable text/attribute)", i + 1)
                 else:
-                    print(f"❌ Not found: {selector}")
+                    logger.debug("❌ Not found: %s", selector)
             except Exception as e:
-                print(f"❌ Error with {selector}: {str(e)}")
+                logger.debug("❌ Error with %s: %s", selector, e)
         
-        print("-" * 60)
+        logger.debug("-" * 60)
     
-    def extract_product_data(self):
-        """Enhanced data extraction prioritizing working selectors"""
-        print("\n🎯 EXTRACTING PRODUCT DATA")
-        print("=" * 50)
-        
-        self.wait_for_page_load()
-        self.human_like_delay(3, 5)
-        
-        self.debug_page_elements() # Debug to see elements available after load
-        
-        data = {
-            'url': self.driver.current_url,
-            'page_title': self.driver.title
-        }
-        
-        print("\n📊 EXTRACTING FIELDS (from current page HTML):")
-        print("-" * 30)
-
+    def scroll_to_load_everything(self):
+        """Fixed-delay readiness: scroll until the page stops growing, then wait for the deposit element"""
         # --- Aggressive Scrolling to load all content ---
         print("  Initiating aggressive scrolling to load all dynamic content...")
         last_height = self.driver.execute_script("return document.body.scrollHeight")
@@ -430,118 +1119,150 @@ class ImprovedMamikosScraper:
             print("  Deposit amount element found via explicit wait.")
         except TimeoutException:
             print("  Deposit amount element NOT found via explicit wait. Proceeding without it.")
+    
+    def wait_for_listing_ready(self, timeout=15, settle=1.5, poll_interval=0.25):
+        """
+        Adaptive readiness: return as soon as every selector the extractors read is in the DOM.
+        A MutationObserver inside the page tracks DOM changes while the page is scrolled to the
+        bottom to trigger lazy sections. The wait also ends once the core selectors are present
+        and the DOM has been quiet for `settle` seconds (e.g. listings without a deposit rule),
+        or at `timeout` at the latest.
+        """
+        self.driver.set_script_timeout(timeout + 5)
+        started = time.perf_counter()
+        try:
+            result = self.driver.execute_async_script(
+                LISTING_READY_SCRIPT, READINESS_SELECTORS, READINESS_CORE_SELECTORS,
+                int(timeout * 1000), int(settle * 1000), int(poll_interval * 1000)
+            ) or {}
+        except WebDriverException as e:
+            print(f"⚠️ Adaptive wait failed ({e}); falling back to fixed delays.")
+            self.wait_for_page_load()
+            self.human_like_delay(3, 5)
+            self.scroll_to_load_everything()
+            return False
+        elapsed = time.perf_counter() - started
+        saved = FIXED_READINESS_SECONDS - elapsed
+        self.readiness_savings.append(saved)
+        missing = result.get('missing') or []
+        print(f"⚡ Page ready in {elapsed:.1f}s ({result.get('reason')}"
+              f"{', missing: ' + ', '.join(missing) if missing else ''}); ~{saved:.1f}s less than the fixed delays")
+        return result.get('reason') != 'timeout'
+    
+    def extract_product_data(self):
+        """Enhanced data extraction prioritizing working selectors"""
+        print("\n🎯 EXTRACTING PRODUCT DATA")
+        print("=" * 50)
+        
+        wait_started = time.perf_counter()
+        with self.timed("page_load_wait"):
+            if self.readiness_mode == "adaptive":
+                self.wait_for_listing_ready()
+            else:
+                self.wait_for_page_load()
+                self.human_like_delay(3, 5)
+        wait_seconds = time.perf_counter() - wait_started
+        
+        if self.debug_selectors:
+            with self.timed("debug_dom"):
+                self.debug_page_elements() # Debug to see elements available after load
+        
+        data = {
+            'url': self.driver.current_url,
+            'page_title': self.driver.title
+        }
+        
+        logger.debug("\n📊 EXTRACTING FIELDS (from current page HTML):")
+        logger.debug("-" * 30)
+
+        if self.readiness_mode != "adaptive":
+            scroll_started = time.perf_counter()
+            with self.timed("scroll"):
+                self.scroll_to_load_everything()
+            wait_seconds += time.perf_counter() - scroll_started
+        self.readiness_seconds.append(wait_seconds)
         
         # Get the full HTML content of the page after Selenium has loaded it and scrolled
-        html_content_after_load = self.driver.page_source
+        with self.timed("page_source"):
+            html_content_after_load = self.driver.page_source
+        self.last_page_source = html_content_after_load
+        if self.corpus is not None:
+            self.corpus.save("listing", data['url'], html_content_after_load)
         
-        # Use the BeautifulSoup function to extract the specific details
-        specific_details = scrape_mamikos_details_from_html(html_content_after_load)
+        # Extract the specific details (single-parse version of the BeautifulSoup function)
+        with self.timed("bs_parse"):
+            specific_details = scrape_mamikos_details_from_html_fast(html_content_after_load)
         
         # Merge the specific details into the main data dictionary
         data.update(specific_details)
-        print("  Specific details extracted via BeautifulSoup merged into data.")
+        logger.debug("  Specific details extracted via BeautifulSoup merged into data.")
 
         # Existing extractions for other fields (using Selenium directly)
-        room_name_selectors = [
-            "p.detail-title__room-name",
-            "p[class*='detail-title__room-name']",
-            ".detail-title__room-name",
-            "h1", "h2", "h3",
-            "[class*='title']", "[class*='name']",
-            "main h1", "main h2"
-        ]
-        data['room_name'] = self.extract_text_with_priority(room_name_selectors, "Room Name")
-        
-        price_selectors = [
-            "p[data-v-160ecdd7].bg-c-text.bg-c-text--body-1",
-            "span.rc-price__text.bg-c-text.bg-c-text--title-2", # More specific price selector
-            "p[class*='bg-c-text'][class*='body-1']",
-            ".bg-c-text.bg-c-text--body-1",
-            ".bg-c-text--body-1",
-            "[class*='price']", "[class*='harga']",
-            "*:contains('Rp')", "span:contains('Rp')", "p:contains('Rp')"
-        ]
-        data['price'] = self.extract_text_with_priority(price_selectors, "Price")
-        
-        rating_selectors = [
-            "p[data-v-d8a7c31a].detail-kost-overview__rating-text",
-            "p[class*='detail-kost-overview__rating-text']",
-            ".detail-kost-overview__rating-text",
-            "[class*='rating-text']",
-            "[class*='rating']", "[class*='score']",
-            "*:contains('★')", "span:contains('★')"
-        ]
-        data['rating'] = self.extract_text_with_priority(rating_selectors, "Rating")
-        
-        rating_count_selectors = [
-            "p[data-v-d8a7c31a].detail-kost-overview__rating-review",
-            "p[class*='detail-kost-overview__rating-review']",
-            ".detail-kost-overview__rating-review",
-            "[class*='rating-review']",
-            "*:contains('ulasan')", "*:contains('review')"
-        ]
-        data['rating_count'] = self.extract_text_with_priority(rating_count_selectors, "Rating Count")
-        
-        transaction_selectors = [
-            "p[data-v-d8a7c31a].detail-kost-overview__total-transaction-text",
-            "p[class*='detail-kost-overview__total-transaction-text']",
-            ".detail-kost-overview__total-transaction-text",
-            "[class*='transaction-text']",
-            "*:contains('transaksi')", "*:contains('berhasil')"
-        ]
-        data['transaction_count'] = self.extract_text_with_priority(transaction_selectors, "Transaction Count")
-        
-        tipe_kos_selectors = [
-            "span[data-v-d8a7c31a].detail-kost-overview__gender-box",
-            "span[class*='detail-kost-overview__gender-box']",
-            ".detail-kost-overview__gender-box",
-            "[class*='gender-box']",
-            "*:contains('Putra')", "*:contains('Putri')", "*:contains('Campur')"
-        ]
-        data['tipe_kos'] = self.extract_text_with_priority(tipe_kos_selectors, "Tipe Kos")
-        
-        location_selectors = [
-            "p[data-v-d8a7c31a].detail-kost-overview__area-text",
-            "p[class*='detail-kost-overview__area-text']",
-            ".detail-kost-overview__area-text",
-            "[class*='area-text']",
-            "[class*='location']", "[class*='area']", "[class*='lokasi']"
-        ]
-        data['location'] = self.extract_text_with_priority(location_selectors, "Location")
-        
-        discount_selectors = [
-            "span[data-v-160ecdd7].bg-c-text.bg-c-text--label-3",
-            "span[class*='bg-c-text'][class*='label-3']",
-            ".bg-c-text--label-3",
-            "[class*='discount']", "[class*='diskon']",
-            "*:contains('%')", "*:contains('diskon')"
-        ]
-        data['discount_amount'] = self.extract_text_with_priority(discount_selectors, "Discount")
+        started = time.perf_counter()
+        if self.single_pass_fields:
+            with self.timed("fields"): # All fields come back from one execute_script call
+                data.update(self.extract_fields_single_pass())
+        else:
+            for data_key, field_name, selectors in PRODUCT_FIELD_SELECTORS:
+                with self.timed(f"field:{data_key}"):
+                    data[data_key] = self.extract_text_with_priority(selectors, field_name)
+        elapsed = time.perf_counter() - started
+        self.field_extraction_seconds.append(elapsed)
+        logger.debug("  ⏱️ Field extraction took %.3fs (%s)", elapsed, 'single pass' if self.single_pass_fields else 'per selector')
         
         print(f"\n✅ Data extraction completed for: {data.get('room_name', 'Unknown')}")
         return data
     
-    def scrape_products(self, csv_file_path, region_name="Unknown Region", max_products=None): # Added region_name parameter
-        """Enhanced scraping with better navigation handling for URLs from CSV"""
+    def load_urls_from_csv(self, csv_file_path, max_products=None):
+        """
+        Read product URLs from the link scraper's CSV, honouring max_products. URLs are
+        canonicalised (canonicalize_url) and deduplicated, and with a seen_index the ones
+        scraped by earlier runs are dropped. A .jsonl path is read as a dead-letter file
+        (RetryScheduler), so only the URLs that failed in an earlier run are scraped again.
+        Returns None on failure.
+        """
         urls_from_csv = []
+        duplicates = 0
         try:
-            with open(csv_file_path, mode='r', newline='', encoding='utf-8') as file:
-                csv_reader = csv.reader(file)
-                next(csv_reader, None) # Skip the header row
-                for row in csv_reader:
-                    if row:
-                        urls_from_csv.append(row[0].strip())
+            if Path(csv_file_path).suffix.lower() == '.jsonl':
+                rows = [[entry['url'], entry.get('region') or ''] for entry in RetryScheduler.load_dead_letters(csv_file_path)]
+                region_column = 1
+            else:
+                with open(csv_file_path, mode='r', newline='', encoding='utf-8') as file:
+                    csv_reader = csv.reader(file)
+                    header = next(csv_reader, None) or [] # Skip the header row
+                    # Merged multi-region CSVs from the link scraper tag every URL with its region
+                    region_column = header.index('Region') if 'Region' in header else None
+                    rows = list(csv_reader)
+            seen = set()
+            for row in rows:
+                if row and row[0].strip():
+                    url = canonicalize_url(row[0])
+                    if url in seen:
+                        duplicates += 1
+                        continue
+                    seen.add(url)
+                    urls_from_csv.append(url)
+                    if region_column is not None and len(row) > region_column and row[region_column].strip():
+                        self.url_regions[url] = row[region_column].strip()
             print(f"\nSuccessfully loaded {len(urls_from_csv)} URLs from '{csv_file_path}'.")
+            if duplicates:
+                print(f"  Dropped {duplicates} duplicate URL(s) (same listing after canonicalisation).")
         except FileNotFoundError:
             print(f"\nError: CSV file '{csv_file_path}' not found. Please check the path.")
-            return False
+            return None
         except Exception as e:
             print(f"\nAn error occurred while reading the CSV file: {e}")
-            return False
+            return None
+
+        if self.seen_index is not None:
+            unseen = [url for url in urls_from_csv if url not in self.seen_index]
+            print(f"  Skipping {len(urls_from_csv) - len(unseen)} URL(s) already in the seen-URL index.")
+            urls_from_csv = unseen
 
         if not urls_from_csv:
             print("\nNo URLs to process from CSV. Exiting.")
-            return False
+            return None
             
         urls_to_scrape = urls_from_csv
         if max_products is not None and max_products < len(urls_to_scrape): # Check for None explicitly
@@ -549,35 +1270,467 @@ class ImprovedMamikosScraper:
             print(f"Scraping the first {max_products} URLs as requested.")
         else: # Add this else block to confirm all URLs are being processed if no limit
             print(f"Scraping all {len(urls_to_scrape)} URLs from the CSV.")
+        return urls_to_scrape
+
+    def new_worker_session(self):
+        """A new scraper with its own browser session but this scraper's settings and metric lists (pool mode)"""
+        session = ImprovedMamikosScraper(fetch_engine=self.fetch_engine, driver_manager=self.driver_manager)
+        session.single_pass_fields = self.single_pass_fields
+        session.corpus = self.corpus
+        session.page_cache = self.page_cache
+        session.readiness_mode = self.readiness_mode
+        session.metrics = self.metrics
+        session.debug_selectors = self.debug_selectors
+        # Per-page timing lists are shared (list.append is atomic), so the end-of-run summaries cover every worker
+        session.field_extraction_seconds = self.field_extraction_seconds
+        session.readiness_seconds = self.readiness_seconds
+        session.readiness_savings = self.readiness_savings
+        session.page_load_metrics = self.page_load_metrics
+        return session
+
+    def region_for(self, url, region_name):
+        """Region of a URL: its Region column in a merged CSV, otherwise the run's region_name"""
+        return self.url_regions.get(url, region_name)
+
+    def timed(self, stage_name):
+        """Context manager timing one stage of the current page when metrics are on"""
+        return self.metrics.stage(stage_name) if self.metrics is not None else contextlib.nullcontext()
+
+    def scrape_single_product(self, url, use_cache=True):
+        """
+        Fetch one product page with the configured engine and extract its data.
+        use_cache=False skips the page cache lookup (retries must not get the same page back).
+        """
+        if self.metrics is None:
+            return self._scrape_single_product(url, use_cache)
+        self.metrics.start_page(url)
+        try:
+            product_data = self._scrape_single_product(url, use_cache)
+        except Exception as e:
+            self.metrics.finish_page(error=e)
+            raise
+        self.metrics.finish_page(product_data)
+        return product_data
+
+    def _scrape_single_product(self, url, use_cache=True):
+        if self.page_cache is not None and use_cache:
+            with self.timed("cache_lookup"):
+                cached = self.page_cache.get(url)
+            if cached is not None:
+                with self.timed("bs_parse"):
+                    product_data = scrape_product_data_from_html(cached.html, cached.final_url)
+                product_data['scraped_at'] = format_timestamp(cached.fetched_at) # The page is as old as its fetch
+                print(f"💾 Parsed from cache ({cached.age / 3600:.1f}h old): {product_data.get('room_name')}")
+                return product_data
+
+        if self.fetch_engine == "http":
+            try:
+                with self.timed("navigation"):
+                    final_url, html_content = self.fetch_page_http(url)
+                if self.corpus is not None:
+                    self.corpus.save("listing", final_url, html_content)
+                with self.timed("bs_parse"):
+                    product_data = scrape_product_data_from_html(html_content, final_url)
+                missing = [field for field in REQUIRED_HTTP_FIELDS if product_data.get(field) in MISSING_VALUES]
+                if not missing:
+                    print(f"⚡ Extracted over plain HTTP: {product_data.get('room_name')}")
+                    if self.page_cache is not None:
+                        self.page_cache.put(url, html_content, final_url=final_url)
+                    return product_data
+                print(f"  HTTP page is missing {', '.join(missing)}; falling back to Selenium.")
+            except requests.RequestException as e:
+                if not classify_failure(e)[1]:
+                    raise # 404/410 and other permanent 4xx: a browser would only render the error page
+                print(f"  HTTP fetch failed ({e}); falling back to Selenium.")
+            self.ensure_driver()
+        return self.scrape_single_product_selenium(url)
 
+    def scrape_single_product_selenium(self, url):
+        """Open one product page in this scraper's browser and extract its data"""
+        with self.timed("navigation"):
+            self.driver.get(url)
+        if self.readiness_mode != "adaptive":
+            self.human_like_delay(3, 5) # Initial delay for page load
+        
+        # Extract data using the combined method
+        product_data = self.extract_product_data()
+        complete = all(product_data.get(field) not in MISSING_VALUES for field in REQUIRED_HTTP_FIELDS)
+        if self.page_cache is not None and complete: # A partial render would be served back to every retry
+            self.page_cache.put(url, self.last_page_source, final_url=product_data['url'])
+        if self.driver_manager.page_done(self.driver):
+            self.driver = self.driver_manager.recycle(self.driver) # Caps Chrome's memory growth on long runs
+        return product_data
+
+    def open_journal(self, journal_path, resume=False):
+        """
+        Start journaling every finished product to `journal_path`.
+        With resume=True, products already in the journal are loaded back into
+        scraped_data and their URLs are skipped by the scraping loops.
+        """
+        if resume:
+            previous = ScrapeJournal.load(journal_path)
+            self.completed_urls.update(canonicalize_url(url) for url in previous)
+            for record in previous.values():
+                self.store_record(record)
+            print(f"↩️ Resuming from '{journal_path}': {len(previous)} product(s) already done.")
+        self.journal = ScrapeJournal(journal_path, resume=resume)
+        if self.journal.backup_path is not None:
+            print(f"⚠️ '{journal_path}' already had progress and --resume was not given; "
+                  f"it was moved to '{self.journal.backup_path}' (rename it back and pass --resume to continue that run).")
+
+    def store_record(self, product_data):
+        """Count one record, keep it in scraped_data (unless keep_results is off) and stream it to output_writers"""
+        with self._results_lock:
+            self.record_count += 1
+            if self.keep_results:
+                self.scraped_data.append(product_data)
+            for writer in self.output_writers:
+                writer.write(product_data)
+
+    def record_product(self, product_data, source_url=None, mark_seen=True):
+        """
+        Store one finished product record (safe to call from worker threads).
+        mark_seen=False keeps the URL out of seen_index, for partial records that are also dead-lettered.
+        """
+        product_data.setdefault('scraped_at', format_timestamp())
+        if self.incremental_crawl:
+            product_data.setdefault('listing_status', 'active')
+        with self._results_lock:
+            self.incremental_refresh.pop(source_url or product_data.get('url'), None)
+            self.store_record(product_data)
+            if self.journal is not None:
+                self.journal.append(source_url or product_data.get('url'), product_data)
+            if self.seen_index is not None and mark_seen:
+                self.seen_index.add(source_url or product_data.get('url'))
+
+    def prepare_incremental_crawl(self, csv_file_path, previous_dataset_path, region_name="Unknown Region",
+                                  refresh_fraction=0.1, max_products=None):
+        """
+        Incremental re-crawl, step 1: compare all of the CSV's URLs with a previous dataset
+        (see plan_incremental_crawl). Listings that do not need scraping are copied into
+        scraped_data and marked completed, so whichever scraping loop runs next (over the
+        whole CSV, without max_products) only visits new URLs and the refresh share.
+        max_products caps those visits: refreshes past the cap keep their previous record
+        and new listings past it are left for the next run.
+
+        Returns:
+            list: The delisted records for finish_incremental_crawl(), or None if the CSV
+            could not be loaded (the run must then stop, or every listing would be delisted).
+        """
+        current_urls = self.load_urls_from_csv(csv_file_path)
+        if current_urls is None:
+            return None
+        previous = load_previous_dataset(previous_dataset_path)
+        plan = plan_incremental_crawl(current_urls, previous, refresh_fraction)
+        print(f"🔄 Incremental crawl against '{previous_dataset_path}': {len(plan['new'])} new, "
+              f"{len(plan['refresh'])} refreshed, {len(plan['carried'])} kept, {len(plan['delisted'])} delisted.")
+
+        self.incremental_crawl = True
+        self.incremental_url_count = len(current_urls)
+        positions = {url: i for i, url in reversed(list(enumerate(current_urls)))}
+
+        def carried_record(url):
+            record = dict(previous[url])
+            record.pop('delisted_at', None)
+            record['listing_status'] = 'active'
+            record['product_number'] = positions[url] + 1
+            record['region'] = self.region_for(url, region_name)
+            return record
+
+        refresh, new = set(plan['refresh']), set(plan['new'])
+        to_scrape = [url for url in current_urls if (url in refresh or url in new) and url not in self.completed_urls]
+        deferred = set(to_scrape[max_products:]) if max_products is not None else set()
+        if deferred:
+            print(f"  Scraping {max_products} of {len(to_scrape)} as requested: {len(deferred & refresh)} refresh(es) "
+                  f"keep their previous record, {len(deferred & new)} new listing(s) wait for the next run.")
+        for url in plan['carried'] + [url for url in plan['refresh'] if url in deferred]:
+            if url in self.completed_urls:
+                continue # Already scraped again in a resumed run
+            self.store_record(carried_record(url))
+            self.completed_urls.add(url)
+        self.completed_urls.update(deferred)
+        self.incremental_refresh = {url: carried_record(url) for url in plan['refresh']
+                                    if url not in deferred and url not in self.completed_urls}
+        return plan['delisted']
+
+    def finish_incremental_crawl(self, delisted_records):
+        """
+        Incremental re-crawl, step 2: refreshed listings that failed to scrape get their
+        previous record back, then the vanished listings are stored with listing_status
+        "delisted" after the CSV's products (delisted_at keeps the first date seen missing).
+        """
+        if self.incremental_refresh:
+            print(f"  {len(self.incremental_refresh)} refresh(es) failed; keeping their previous record.")
+            for record in self.incremental_refresh.values():
+                self.store_record(record)
+            self.incremental_refresh = {}
+            self.scraped_data.sort(key=lambda item: item.get('product_number', 0))
+        next_number = max([self.incremental_url_count] + [record.get('product_number', 0) for record in self.scraped_data]) + 1
+        now = format_timestamp()
+        for offset, record in enumerate(delisted_records):
+            record = dict(record)
+            if record.get('listing_status') != 'delisted':
+                record['delisted_at'] = now
+            record['listing_status'] = 'delisted'
+            record['product_number'] = next_number + offset
+            self.store_record(record)
+
+    def scrape_products(self, csv_file_path, region_name="Unknown Region", max_products=None): # Added region_name parameter
+        """Enhanced scraping with better navigation handling for URLs from CSV"""
+        urls_to_scrape = self.load_urls_from_csv(csv_file_path, max_products)
+        if not urls_to_scrape:
+            return False
 
         for i, url in enumerate(urls_to_scrape):
+            if url in self.completed_urls:
+                continue # Already journaled by an earlier run
+
             print(f"\n{'='*60}")
             print(f"PROCESSING PRODUCT {i+1} OF {len(urls_to_scrape)}: {url}")
             print(f"{'='*60}")
             
-            try:
-                self.driver.get(url)
-                self.human_like_delay(3, 5) # Initial delay for page load
-                
-                # Extract data using the combined method
-                product_data = self.extract_product_data()
-                product_data['product_number'] = i + 1
-                product_data['region'] = region_name # Add the region to the scraped data
-                self.scraped_data.append(product_data)
-                
-            except WebDriverException as e: # Catch WebDriver-specific errors (e.g., connection issues, crashes)
-                print(f"❌ WebDriver Error processing URL {url}: {str(e)}")
-                print("  Attempting to restart WebDriver for the next URL...")
-                self.close() # Close current driver
-                self.__init__() # Re-initialize the driver
-                continue # Continue to the next URL
-            except Exception as e:
-                print(f"❌ General Error processing URL {url}: {str(e)}")
-                continue
+            self.attempt_product(self, i, url, region_name)
             
-        return len(self.scraped_data) > 0
+        self.run_retries(region_name)
+        if self.completed_urls or self.retry_scheduler.recovered: # Resumed products were loaded first; restore the CSV order
+            self.scraped_data.sort(key=lambda item: item.get('product_number', 0))
+        return self.record_count > 0
+
+    def attempt_product(self, session, i, url, region_name, label="", fetch=None):
+        """
+        Scrape one URL with `session` (this scraper or a pool worker) and record it as
+        product i + 1. A failure is classified: retriable ones are queued on retry_scheduler,
+        permanent ones are dead-lettered, and a crashed browser is restarted. `fetch`
+        overrides session.scrape_single_product. Returns True on success.
+        """
+        try:
+            product_data = (fetch or session.scrape_single_product)(url)
+            missing = [field for field in REQUIRED_HTTP_FIELDS if product_data.get(field) in MISSING_VALUES]
+            if missing:
+                raise MissingFieldsError(missing, product_data)
+        except Exception as e:
+            self.handle_failure(session, i, url, region_name, e, label)
+            return False
+        product_data['product_number'] = i + 1
+        product_data['region'] = self.region_for(url, region_name)
+        self.record_product(product_data, source_url=url)
+        self.retry_scheduler.succeeded(url)
+        return True
+
+    def handle_failure(self, session, i, url, region_name, error, label=""):
+        kind, retriable = classify_failure(error)
+        print(f"❌ {label}Failed ({kind}) processing URL {url}: {error}")
+        if kind == "driver_crash":
+            print(f"  {label}Restarting the browser session...")
+            session.restart_driver() # Only the browser is replaced; engine, journal and results are kept
+        region = self.region_for(url, region_name)
+        if retriable and self.retry_scheduler.schedule(url, kind, error, product_number=i + 1, region=region):
+            print(f"  {label}↻ Queued for a retry at the end of the run.")
+            return
+        if isinstance(error, MissingFieldsError): # Out of attempts: keep what the page did show, as before
+            error.record['product_number'] = i + 1
+            error.record['region'] = region
+            self.record_product(error.record, source_url=url, mark_seen=False) # Feeding the dead letter back in must redo it
+        self.retry_scheduler.dead_letter(url, kind, error, product_number=i + 1, region=region)
+
+    def run_retries(self, region_name, rate_limiter=None):
+        """Retry pass at the end of a run: scrape each queued failure again once its backoff has passed"""
+        if not len(self.retry_scheduler):
+            return
+        print(f"\n↻ Retrying {len(self.retry_scheduler)} failed URL(s) with exponential backoff...")
+        if self.fetch_engine == "selenium" and self.driver is None:
+            self.start_driver()
+        for item in self.retry_scheduler.iter_due():
+            if rate_limiter is not None:
+                rate_limiter.wait(item['url'])
+            label = f"[Retry {item['attempts'] + 1}/{self.retry_scheduler.max_attempts}] "
+            print(f"\n{label}PROCESSING PRODUCT {item['product_number']} ({item['kind']} before): {item['url']}")
+            self.attempt_product(self, item['product_number'] - 1, item['url'], region_name, label,
+                                 fetch=functools.partial(self.scrape_single_product, use_cache=False))
+
+    def run_queue_worker(self, session, url_queue, rate_limiter, worker_number, region_name, total=None):
+        """
+        Worker loop shared by pool mode and the streaming pipeline: take (index, url) pairs
+        from url_queue until a None marker arrives, scrape each with `session` and record
+        the result on this scraper. A crashed browser session is restarted in place, and
+        failures are queued for the retry pass that follows (see attempt_product).
+        """
+        while True:
+            item = url_queue.get()
+            if item is None:
+                return
+            i, url = item
+            print(f"\n[Worker {worker_number}] PROCESSING PRODUCT {i+1}{f' OF {total}' if total else ''}: {url}")
+            rate_limiter.wait(url)
+            self.attempt_product(session, i, url, region_name, label=f"[Worker {worker_number}] ")
+
+    def scrape_products_pool(self, csv_file_path, region_name="Unknown Region", max_products=None,
+                             workers=3, max_requests_per_second=0.5):
+        """
+        Pool mode: scrape the CSV URLs with several independent browser sessions.
+
+        Every worker thread owns its own Chrome session (this scraper's driver is reused
+        as worker 1) and pulls (index, url) pairs from one shared queue. All workers go
+        through a single HostRateLimiter, so max_requests_per_second caps the load on the
+        site no matter how many workers run. Results are merged back into
+        self.scraped_data in CSV order with the usual product_number/region fields.
+        """
+        urls_to_scrape = self.load_urls_from_csv(csv_file_path, max_products)
+        if not urls_to_scrape:
+            return False
+
+        url_queue = queue.Queue()
+        for i, url in enumerate(urls_to_scrape):
+            if url not in self.completed_urls: # Skip URLs journaled by an earlier run
+                url_queue.put((i, url))
+        if url_queue.empty():
+            print("Every URL is already in the journal; nothing left to scrape.")
+            return self.record_count > 0
+
+        workers = max(1, min(workers, url_queue.qsize()))
+        for _ in range(workers):
+            url_queue.put(None) # One end-of-work marker per worker
+        print(f"🧵 Pool mode: {workers} browser session(s), max {max_requests_per_second} request(s)/sec per host.")
+
+        rate_limiter = HostRateLimiter(max_requests_per_second)
+        sessions = [self]
+        for _ in range(workers - 1):
+            sessions.append(self.new_worker_session())
+
+        threads = [
+            threading.Thread(target=self.run_queue_worker,
+                             args=(session, url_queue, rate_limiter, n + 1, region_name, len(urls_to_scrape)), daemon=True)
+            for n, session in enumerate(sessions)
+        ]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            for session in sessions[1:]: # Worker 1 is this scraper; main() closes it
+                session.close()
+        self.run_retries(region_name, rate_limiter)
+
+        # Workers finish out of order; restore the CSV order
+        self.scraped_data.sort(key=lambda item: item.get('product_number', 0))
+        return self.record_count > 0
             
+    async def _run_async_pipeline(self, indexed_urls, region_name, concurrency, requests_per_second, burst, parse_workers):
+        """
+        Fetch stage of the async engine. Keeps up to `concurrency` fetches in flight, paced by a
+        token bucket, and hands each page to a process pool for parsing so network waits and
+        CPU-bound parsing overlap. Returns the (index, url) pairs that still need a browser.
+        """
+        import aiohttp # Optional dependency, only needed for the async engine
+
+        bucket = AsyncTokenBucket(requests_per_second, burst)
+        semaphore = asyncio.Semaphore(concurrency)
+        loop = asyncio.get_running_loop()
+        needs_browser = []
+
+        timeout = aiohttp.ClientTimeout(total=30)
+        connector = aiohttp.TCPConnector(limit=concurrency)
+        with ProcessPoolExecutor(max_workers=parse_workers) as executor:
+            async with aiohttp.ClientSession(headers=HTTP_HEADERS, timeout=timeout, connector=connector) as session:
+
+                async def process(i, url):
+                    cached = self.page_cache.get(url) if self.page_cache is not None else None
+                    if cached is not None:
+                        html_content, final_url = cached.html, cached.final_url
+                    else:
+                        async with semaphore:
+                            await bucket.acquire()
+                            try:
+                                async with session.get(url) as response:
+                                    response.raise_for_status()
+                                    html_content = await response.text()
+                                    final_url = str(response.url)
+                            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                                if isinstance(e, aiohttp.ClientResponseError) and 400 <= e.status < 500 and e.status != 429:
+                                    print(f"❌ Failed (http_error) processing URL {url}: {e.status} {e.message}")
+                                    self.retry_scheduler.dead_letter(url, "http_error", e, product_number=i + 1,
+                                                                     region=self.region_for(url, region_name))
+                                    return
+                                print(f"  Async fetch failed for {url} ({e}); queued for Selenium.")
+                                needs_browser.append((i, url))
+                                return
+                        if self.corpus is not None:
+                            self.corpus.save("listing", final_url, html_content)
+                    # Parsing happens outside the semaphore, so the next fetch can start right away
+                    product_data = await loop.run_in_executor(executor, scrape_product_data_from_html, html_content, final_url)
+                    missing = [field for field in REQUIRED_HTTP_FIELDS if product_data.get(field) in MISSING_VALUES]
+                    if missing:
+                        print(f"  {url} is missing {', '.join(missing)}; queued for Selenium.")
+                        needs_browser.append((i, url))
+                        return
+                    if cached is None and self.page_cache is not None:
+                        self.page_cache.put(url, html_content, final_url=final_url)
+                    product_data['product_number'] = i + 1
+                    product_data['region'] = self.region_for(url, region_name)
+                    self.record_product(product_data, source_url=url)
+                    print(f"⚡ [{i+1}] {product_data.get('room_name')}")
+
+                await asyncio.gather(*(process(i, url) for i, url in indexed_urls))
+        return needs_browser
+
+    def scrape_products_async(self, csv_file_path, region_name="Unknown Region", max_products=None,
+                              concurrency=8, requests_per_second=0.5, burst=2, parse_workers=None):
+        """
+        Async engine: fetch the CSV URLs with aiohttp under bounded concurrency and a token-bucket
+        rate limit (requests_per_second, burst), parse them in a process pool with
+        scrape_product_data_from_html, then scrape whatever failed with the Selenium path.
+        """
+        urls_to_scrape = self.load_urls_from_csv(csv_file_path, max_products)
+        if not urls_to_scrape:
+            return False
+
+        indexed_urls = [(i, url) for i, url in enumerate(urls_to_scrape) if url not in self.completed_urls]
+        print(f"⚡ Async engine: {len(indexed_urls)} URL(s), {concurrency} in flight, "
+              f"{requests_per_second} request(s)/sec (burst {burst}).")
+        needs_browser = asyncio.run(self._run_async_pipeline(
+            indexed_urls, region_name, concurrency, requests_per_second, burst, parse_workers))
+
+        if needs_browser:
+            print(f"\n🌐 {len(needs_browser)} page(s) need the Selenium fallback.")
+            self.ensure_driver()
+        for i, url in sorted(needs_browser):
+            self.attempt_product(self, i, url, region_name, fetch=self.scrape_single_product_selenium)
+        self.run_retries(region_name)
+
+        self.scraped_data.sort(key=lambda item: item.get('product_number', 0))
+        return self.record_count > 0
+
+    def reparse_from_cache(self, csv_file_path, region_name="Unknown Region", max_products=None):
+        """
+        Rebuild the dataset for the CSV URLs purely from the page cache, ignoring the TTL.
+        Nothing is fetched, so a parsing change can be re-applied to a whole region quickly.
+        """
+        if self.page_cache is None:
+            print("❌ --reparse-from-cache needs a page cache (--cache-dir).")
+            return False
+        urls_to_scrape = self.load_urls_from_csv(csv_file_path, max_products)
+        if not urls_to_scrape:
+            return False
+
+        missing = 0
+        for i, url in enumerate(urls_to_scrape):
+            if url in self.completed_urls:
+                continue
+            cached = self.page_cache.get(url, ignore_ttl=True)
+            if cached is None:
+                missing += 1
+                continue
+            product_data = scrape_product_data_from_html(cached.html, cached.final_url)
+            product_data['scraped_at'] = format_timestamp(cached.fetched_at)
+            product_data['product_number'] = i + 1
+            product_data['region'] = self.region_for(url, region_name)
+            self.record_product(product_data, source_url=url)
+
+        print(f"💾 Rebuilt {len(urls_to_scrape) - missing} product(s) from cache; {missing} URL(s) were not cached.")
+        self.scraped_data.sort(key=lambda item: item.get('product_number', 0))
+        return self.record_count > 0
+
     def print_results(self):
         """Print scraped results in a formatted way"""
         print(f"\n{'='*60}")
@@ -650,20 +1803,113 @@ class ImprovedMamikosScraper:
     
     def close(self):
         """Close the browser"""
-        try:
-            self.driver.quit()
+        if self.http_session is not None:
+            self.http_session.close()
+            self.http_session = None
+        if self.driver is not None:
+            self.driver_manager.release(self.driver)
+            self.driver = None
             print("✓ Browser closed")
-        except:
-            pass
+        if self._owns_driver_manager:
+            self.driver_manager.close()
 
 # Test the improved functionality
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape Mamikos product pages listed in a CSV of URLs.")
+    parser.add_argument("csv_file", nargs="?", help="CSV file produced by the link scraper (prompted if omitted)")
+    parser.add_argument("--region", help="Region name stored with every product (prompted if omitted)")
+    parser.add_argument("--max-products", type=int, default=None, help="Only scrape the first N URLs")
+    parser.add_argument("--workers", type=int, default=1, help="Number of parallel browser sessions (pool mode when > 1)")
+    parser.add_argument("--warm-sessions", type=int, default=0,
+                        help="Spare Chrome sessions kept launched in the background, so crashes and recycling do not wait for a launch")
+    parser.add_argument("--block-resources", action="store_true",
+                        help="Do not download images, media, fonts, map tiles or analytics scripts, and load pages eagerly")
+    parser.add_argument("--allow-resource", metavar="PATTERN", action="append", default=[],
+                        help="With --block-resources: keep loading this URL pattern or category (images, media, fonts, maps, analytics)")
+    parser.add_argument("--block-resource", metavar="PATTERN", action="append", default=[],
+                        help="With --block-resources: also block this URL pattern ('*' wildcards, e.g. '*intercom.io*')")
+    parser.add_argument("--recycle-after", type=int, default=0, metavar="PAGES",
+                        help="Replace each Chrome session after this many pages to cap its memory growth (0 = never)")
+    parser.add_argument("--max-rps", type=float, default=0.5, help="Global request-rate cap per host in pool and async modes")
+    parser.add_argument("--engine", choices=["selenium", "http", "async"], default="selenium",
+                        help="How product pages are fetched: headless Chrome, plain HTTP, or the asyncio pipeline "
+                             "(the last two fall back to Selenium when needed)")
+    parser.add_argument("--concurrency", type=int, default=8, help="Fetches kept in flight by the async engine")
+    parser.add_argument("--burst", type=int, default=2, help="Token-bucket burst size for the async engine")
+    parser.add_argument("--adaptive-wait", action="store_true",
+                        help="Wait for the target selectors instead of fixed human-like sleeps after each page load")
+    parser.add_argument("--per-selector-fields", action="store_true",
+                        help="Use the old per-selector WebDriver field extraction (for timing comparisons)")
+    parser.add_argument("--record-corpus", metavar="DIR", help="Save every fetched product page into a benchmark corpus directory")
+    parser.add_argument("--cache-dir", metavar="DIR", help="Keep rendered pages in a compressed on-disk cache and reuse fresh ones")
+    parser.add_argument("--cache-ttl-hours", type=float, default=168, help="Age after which a cached page is fetched again (default 7 days)")
+    parser.add_argument("--cache-max-mb", type=float, default=2048, help="Cache size limit; least recently used pages are evicted first")
+    parser.add_argument("--reparse-from-cache", action="store_true", help="Rebuild the dataset from cached pages only, without fetching")
+    parser.add_argument("--journal", help="Progress journal file (default: <csv name>.journal.jsonl next to the CSV)")
+    parser.add_argument("--resume", action="store_true", help="Skip URLs already recorded in the journal")
+    parser.add_argument("--output", metavar="PATH", action="append", default=[],
+                        help="Stream every record to this .jsonl, .csv, .parquet or .sqlite file as it is scraped (repeatable)")
+    parser.add_argument("--parquet", metavar="PATH", help="Same as --output PATH.parquet: typed records (needs pyarrow)")
+    parser.add_argument("--row-group-size", type=int, default=1000, help="Records per Parquet row group")
+    parser.add_argument("--stream-only", action="store_true",
+                        help="Keep no records in memory: write them only to --output files and the journal "
+                             "(skips the end-of-run JSON/CSV files and the results printout)")
+    parser.add_argument("--no-print-results", action="store_true", help="Do not print every record at the end of the run")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING"], default="INFO",
+                        help="DEBUG also logs every field and selector match")
+    parser.add_argument("--debug-selectors", action="store_true",
+                        help="Probe the key selectors on every page and log what they find (implies --log-level DEBUG; slow)")
+    parser.add_argument("--metrics", metavar="PATH", help="Write per-URL stage timings as JSON lines and print a run summary")
+    parser.add_argument("--prometheus", metavar="PATH", help="Write the run summary in Prometheus text format at the end")
+    parser.add_argument("--previous-dataset", metavar="PATH",
+                        help="Incremental re-crawl: earlier JSON/CSV output (or journal) to compare the CSV's URLs against")
+    parser.add_argument("--refresh-fraction", type=float, default=0.1,
+                        help="Incremental re-crawl: share of unchanged listings re-scraped, oldest scraped_at first")
+    parser.add_argument("--max-attempts", type=int, default=3,
+                        help="Tries per URL; timeouts, browser crashes, incomplete pages and 5xx errors are retried at the end of the run")
+    parser.add_argument("--retry-base-delay", type=float, default=10.0,
+                        help="Backoff before the first retry in seconds, doubled per further attempt (with jitter, max 300 s)")
+    parser.add_argument("--dead-letter", metavar="PATH",
+                        help="JSONL file for URLs that failed for good (default: <csv name>.dead_letter.jsonl); pass it as the CSV to redo only those")
+    parser.add_argument("--seen-index", metavar="PATH",
+                        help="Skip listings scraped by earlier runs and add this run's (SQLite file, or a .bloom filter for huge runs)")
+    args = parser.parse_args()
+    if args.seen_index and args.previous_dataset:
+        parser.error("--seen-index skips every listing scraped before, so it cannot be combined with --previous-dataset")
+    configure_logging("DEBUG" if args.debug_selectors else args.log_level)
+
     # Define the path to your CSV file
-    user_input = input("Enter the CSV file path: ").strip().strip('"')
-    csv_file_path = Path(user_input)
-    region = input("Input Region Name: ")
+    user_input = args.csv_file or input("Enter the CSV file path: ")
+    csv_file_path = Path(user_input.strip().strip('"'))
+    region = args.region or input("Input Region Name: ")
     
-    scraper = ImprovedMamikosScraper()
+    # The async engine only opens Chrome for fallbacks, like the HTTP engine; reparsing never needs it
+    resource_policy = ResourcePolicy(deny=args.block_resource, allow=args.allow_resource) if args.block_resources else None
+    driver_manager = DriverManager(functools.partial(create_chrome_driver, resource_policy=resource_policy),
+                                   warm_sessions=args.warm_sessions,
+                                   recycle_after_pages=args.recycle_after)
+    scraper = ImprovedMamikosScraper(fetch_engine="http" if args.engine == "async" or args.reparse_from_cache else args.engine,
+                                     driver_manager=driver_manager)
+    scraper.keep_results = not args.stream_only
+    scraper.debug_selectors = args.debug_selectors
+    if args.seen_index:
+        scraper.seen_index = open_seen_index(args.seen_index, stage="details")
+    if args.metrics or args.prometheus:
+        scraper.metrics = ScrapeMetrics(args.metrics)
+    for output_path in args.output + ([args.parquet] if args.parquet else []):
+        scraper.output_writers.append(open_record_writer(output_path, row_group_size=args.row_group_size))
+    journal_path = Path(args.journal) if args.journal else csv_file_path.with_suffix('.journal.jsonl')
+    scraper.open_journal(journal_path, resume=args.resume)
+    scraper.retry_scheduler = RetryScheduler(
+        max_attempts=args.max_attempts, base_delay=args.retry_base_delay,
+        dead_letter_path=args.dead_letter or csv_file_path.with_suffix('.dead_letter.jsonl'))
+    scraper.single_pass_fields = not args.per_selector_fields
+    scraper.readiness_mode = "adaptive" if args.adaptive_wait else "fixed"
+    if args.record_corpus:
+        scraper.corpus = PageCorpus(args.record_corpus)
+    if args.cache_dir:
+        scraper.page_cache = PageCache(args.cache_dir, ttl_seconds=args.cache_ttl_hours * 3600,
+                                       max_bytes=int(args.cache_max_mb * 1024 * 1024))
     
     try:
         print("🚀 Starting Improved Mamikos Scraper...")
@@ -671,21 +1917,83 @@ if __name__ == "__main__":
         print("✨ Enhanced anti-detection and error handling for long runs.")
         print("-" * 60)
         
+        delisted_records = None
+        max_products = args.max_products
+        if args.previous_dataset:
+            delisted_records = scraper.prepare_incremental_crawl(csv_file_path, args.previous_dataset, region_name=region,
+                                                                 refresh_fraction=args.refresh_fraction,
+                                                                 max_products=args.max_products)
+            max_products = None # The plan already applied the cap to what gets scraped
+
         # Scrape products directly from the CSV URLs
         # Pass the desired region name here
-        success = scraper.scrape_products(csv_file_path, region_name=region) 
+        if args.previous_dataset and delisted_records is None:
+            print("\n❌ Incremental crawl aborted: the URL CSV could not be loaded.")
+            success = False
+        elif args.reparse_from_cache:
+            success = scraper.reparse_from_cache(csv_file_path, region_name=region, max_products=max_products)
+        elif args.engine == "async":
+            success = scraper.scrape_products_async(csv_file_path, region_name=region, max_products=max_products,
+                                                    concurrency=args.concurrency, requests_per_second=args.max_rps,
+                                                    burst=args.burst)
+        elif args.workers > 1:
+            success = scraper.scrape_products_pool(csv_file_path, region_name=region, max_products=max_products,
+                                                   workers=args.workers, max_requests_per_second=args.max_rps)
+        else:
+            success = scraper.scrape_products(csv_file_path, region_name=region, max_products=max_products)
+        if delisted_records is not None:
+            scraper.finish_incremental_crawl(delisted_records)
+            success = scraper.record_count > 0
         
+        if scraper.metrics is not None:
+            scraper.metrics.print_summary()
+        if driver_manager.start_seconds:
+            driver_manager.print_summary()
+        scraper.retry_scheduler.print_summary()
+        if scraper.page_load_metrics:
+            waits = [metric['elapsed_seconds'] for metric in scraper.page_load_metrics]
+            unconfirmed = sum(1 for metric in scraper.page_load_metrics if not metric['preferred'])
+            print(f"\n⏳ Page-load waits: {len(waits)}, average {sum(waits) / len(waits):.1f}s, "
+                  f"slowest {max(waits):.1f}s, {unconfirmed} without a page-specific indicator")
+        if scraper.readiness_seconds:
+            average = sum(scraper.readiness_seconds) / len(scraper.readiness_seconds)
+            print(f"\n⏱️ Average readiness wait ({scraper.readiness_mode}): {average:.1f}s/page")
+        if scraper.readiness_savings:
+            print(f"⚡ Adaptive waits saved ~{sum(scraper.readiness_savings) / 60:.1f} min "
+                  f"({sum(scraper.readiness_savings) / len(scraper.readiness_savings):.1f}s/page) vs the fixed delays")
+        if scraper.field_extraction_seconds:
+            average = sum(scraper.field_extraction_seconds) / len(scraper.field_extraction_seconds)
+            print(f"\n⏱️ Average field extraction time: {average:.3f}s/page over {len(scraper.field_extraction_seconds)} page(s)")
+
         if success:
             print("\n✅ SCRAPING COMPLETED!")
-            scraper.print_results()
-            scraper.save_data_to_json()
-            scraper.save_data_to_csv() # Save to CSV
+            if scraper.keep_results:
+                if not args.no_print_results:
+                    scraper.print_results()
+                scraper.save_data_to_json()
+                scraper.save_data_to_csv() # Save to CSV
         else:
             print("\n❌ SCRAPING FAILED or no URLs processed!")
             
     except KeyboardInterrupt:
         print("\n⚠️ Scraping interrupted by user")
+        print(f"  Finished products are kept in '{journal_path}'; rerun with --resume to continue.")
     except Exception as e:
         print(f"\n❌ Scraping failed with error: {str(e)}")
     finally:
+        scraper.journal.close()
+        scraper.retry_scheduler.close()
+        if scraper.metrics is not None:
+            scraper.metrics.close()
+            if args.prometheus:
+                Path(args.prometheus).write_text(scraper.metrics.prometheus_text(), encoding='utf-8')
+                print(f"✓ Prometheus metrics written to {args.prometheus}")
+        for writer in scraper.output_writers:
+            writer.close()
+            print(f"✓ {writer.rows_written} record(s) streamed to {writer.path}")
+        if scraper.page_cache is not None:
+            scraper.page_cache.close()
+        if scraper.seen_index is not None:
+            scraper.seen_index.close()
         scraper.close()
+        driver_manager.close()
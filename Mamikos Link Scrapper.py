@@ -10,10 +10,223 @@ import json
 import random
 import csv # Import csv module for saving data
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
+import argparse
+import queue
+import sys
+import threading
+from pathlib import Path
+from urllib.parse import parse_qsl, urldefrag, urljoin, urlparse, urlunparse
+import requests
+from mamikos_utils import (HostRateLimiter, PageCorpus, PAGE_LIMIT_KEYS, PAGE_NUMBER_KEYS, PAGE_OFFSET_KEYS,
+                           canonicalize_url, find_page_param, open_seen_index, wait_for_selectors)
+
+# Reads every loaded product card in one call: its index among the .kost-rc cards,
+# the absolute href of its link and whatever name/price/area text the card shows
+HARVEST_CARDS_SCRIPT = """
+const cards = document.querySelectorAll('.kost-rc');
+const text = (card, selector) => {
+    const element = card.querySelector(selector);
+    return element ? element.innerText.trim() : '';
+};
+const results = [];
+cards.forEach((card, index) => {
+    const link = card.querySelector('.kost-rc__inner') || card.querySelector('a[href]');
+    if (!link) return;
+    results.push({
+        index: index,
+        href: link.href || link.getAttribute('href') || '',
+        name: text(card, "[class*='room-title'], [class*='__title'], [class*='name']"),
+        price: text(card, "[class*='price']"),
+        area: text(card, "[class*='area'], [class*='location']")
+    });
+});
+return results;
+"""
+
+def normalise_card_href(href, base_url):
+    """Absolute product URL for a card href, without whitespace or #fragment"""
+    href = (href or '').strip()
+    if not href or href.startswith('javascript:'):
+        return None
+    return urldefrag(urljoin(base_url, href))[0]
+
+def looks_like_redirect(url):
+    """True for hrefs that may not be the final product URL (tracking/redirect links, other hosts)"""
+    parsed = urlparse(url)
+    if not parsed.netloc.endswith('mamikos.com'):
+        return True
+    query = parsed.query.lower()
+    path = parsed.path.lower()
+    return ('redirect' in path or '/go/' in path or 'redirect' in query
+            or 'url=' in query or not path.startswith('/room/'))
+
+# "Lihat lebih banyak lagi" (load more) button locators, most specific first
+LOAD_MORE_SELECTORS = [
+    # Prioritize the specific selector from user's working code
+    (By.CSS_SELECTOR, "a.list__content-load-link[data-v-4a297354][class*='list__content-load-link']"),
+    (By.XPATH, "//a[contains(., 'Lihat lebih banyak lagi') and contains(@class, 'list__content-load-link')]"),
+    (By.XPATH, "//button[contains(., 'Lihat lebih banyak lagi')]"), 
+    (By.XPATH, "//span[contains(., 'Lihat lebih banyak lagi')]"), 
+    (By.CSS_SELECTOR, "button.Button__solid"), # Common button class
+    (By.CSS_SELECTOR, "div.sticky-bottom-button button"), # Button within a sticky footer
+    (By.CSS_SELECTOR, "button[class*='load-more']"), # Generic load more button
+    (By.CSS_SELECTOR, "[data-testid='load-more-button']"), # If they use data-testids
+]
+
+# Keys that identify a listing object in the search endpoint's JSON, and where its card fields live
+LISTING_URL_KEYS = ("share_url", "url", "link", "slug")
+LISTING_NAME_KEYS = ("room-title", "room_title", "name", "title")
+LISTING_PRICE_KEYS = ("price_title_format", "price_title", "price")
+LISTING_AREA_KEYS = ("area_formatted", "area_label", "area", "subdistrict")
+
+def find_listing_records(payload):
+    """The first list of objects in a JSON response whose items carry a listing URL or slug"""
+    pending = [payload]
+    while pending: # Breadth-first, so the top-level result list wins over nested lists
+        value = pending.pop(0)
+        if isinstance(value, list):
+            if any(isinstance(item, dict) and any(key in item for key in LISTING_URL_KEYS) for item in value):
+                return [item for item in value if isinstance(item, dict)]
+            pending.extend(value)
+        elif isinstance(value, dict):
+            pending.extend(value.values())
+    return []
+
+def _first_text(record, keys):
+    """First non-empty value among `keys` as text; dict values (e.g. price objects) are flattened"""
+    for key in keys:
+        value = record.get(key)
+        if isinstance(value, dict):
+            value = " ".join(str(v) for v in value.values() if isinstance(v, (str, int, float)))
+        if value not in (None, "", [], {}):
+            return str(value).strip()
+    return ""
+
+def listing_record_to_card(record, base_url):
+    """Card-style dict (url, name, price, area, record) for one listing object from the search endpoint"""
+    url = None
+    for key in LISTING_URL_KEYS:
+        value = record.get(key)
+        if isinstance(value, str) and value.strip():
+            url = value.strip() if key != "slug" or "/" in value else f"/room/{value.strip()}"
+            break
+    return {
+        'url': normalise_card_href(url, base_url),
+        'name': _first_text(record, LISTING_NAME_KEYS),
+        'price': _first_text(record, LISTING_PRICE_KEYS),
+        'area': _first_text(record, LISTING_AREA_KEYS),
+        'record': record,
+    }
+
+def find_pair_param(pairs, keys):
+    """
+    find_page_param for [key, value] pairs: (pair, 1) for the first pair named by one of
+    `keys` (in `keys` order), so the caller can read or overwrite its value; else (None, None).
+    """
+    for key in keys:
+        for pair in pairs or ():
+            if pair[0] == key:
+                return pair, 1
+    return None, None
+
+class ListingApiPaginator:
+    """
+    Replays the search results request that the "Lihat lebih banyak lagi" button sends,
+    paging with its offset (or page number) parameter over a pooled requests session
+    instead of clicking the button. There is no click ceiling: paging stops when the
+    endpoint returns no listings, a short page, only listings already seen, or max_pages.
+
+    `request` is a captured request dict: url, method, headers and (for POST) post_data.
+    Relative listing links and slugs are resolved against base_url (default: the request URL).
+    """
+
+    def __init__(self, request, session=None, page_size=None, max_pages=None,
+                 max_requests_per_second=1.0, record_dir=None, base_url=None):
+        self.method = request.get('method', 'GET').upper()
+        parsed = urlparse(request['url'])
+        self.url = urlunparse(parsed._replace(query=''))
+        # Query and form parameters stay [key, value] pairs so repeated keys (tags[]=a&tags[]=b) are replayed as sent
+        self.query = [list(pair) for pair in parse_qsl(parsed.query, keep_blank_values=True)]
+        self.body = None
+        self.body_is_form = False
+        if request.get('post_data'):
+            try:
+                self.body = json.loads(request['post_data'])
+            except ValueError:
+                self.body = [list(pair) for pair in parse_qsl(request['post_data'], keep_blank_values=True)]
+                self.body_is_form = True
+        # Pseudo headers (":authority") and length/encoding are set by requests itself
+        self.base_url = base_url or request['url']
+        self.headers = {key: value for key, value in (request.get('headers') or {}).items()
+                        if not key.startswith(':') and key.lower() not in ('content-length', 'accept-encoding', 'host', 'cookie')}
+        self.session = session or requests.Session()
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.rate_limiter = HostRateLimiter(max_requests_per_second)
+        self.record_dir = Path(record_dir) if record_dir else None
+        if self.record_dir:
+            self.record_dir.mkdir(parents=True, exist_ok=True)
+        self.pages_fetched = 0
+
+    def _locate(self, keys):
+        """(container, key) of a paging parameter, looking in the body first, then the query string"""
+        for payload, is_pairs in ((self.body, self.body_is_form), (self.query, True)):
+            container, key = find_pair_param(payload, keys) if is_pairs else find_page_param(payload, keys)
+            if container is not None:
+                return container, key
+        return None, None
+
+    def iter_records(self):
+        """Yield card dicts (url, name, price, area, record) page by page, from the first page on"""
+        offset_container, offset_key = self._locate(PAGE_OFFSET_KEYS)
+        page_container, page_key = (None, None) if offset_container is not None else self._locate(PAGE_NUMBER_KEYS)
+        if offset_container is None and page_container is None:
+            raise ValueError(f"No offset/page parameter in captured request {self.url}")
+        limit_container, limit_key = self._locate(PAGE_LIMIT_KEYS)
+        if limit_container is not None and self.page_size:
+            limit_container[limit_key] = self.page_size
+        limit = int(limit_container[limit_key]) if limit_container is not None and str(limit_container[limit_key]).isdigit() else None
+
+        position = 0 if offset_container is not None else 1
+        seen = set()
+        while self.max_pages is None or self.pages_fetched < self.max_pages:
+            container, key = (offset_container, offset_key) if offset_container is not None else (page_container, page_key)
+            container[key] = position
+            param_name = container[0] if isinstance(container, list) else key # [key, value] pairs are named by their key
+
+            self.rate_limiter.wait(self.url)
+            kwargs = {'params': self.query, 'headers': self.headers, 'timeout': 30}
+            if self.body is not None:
+                kwargs['data' if self.body_is_form else 'json'] = self.body
+            response = self.session.request(self.method, self.url, **kwargs)
+            response.raise_for_status()
+            self.pages_fetched += 1
+            if self.record_dir:
+                (self.record_dir / f"{param_name}_{position}.json").write_text(response.text, encoding='utf-8')
+
+            payload = response.json()
+            records = find_listing_records(payload)
+            new_records = 0
+            for record in records:
+                card = listing_record_to_card(record, self.base_url)
+                if not card['url'] or card['url'] in seen:
+                    continue
+                seen.add(card['url'])
+                new_records += 1
+                yield card
+
+            has_more = payload.get('has-more', payload.get('has_more', payload.get('hasMore'))) if isinstance(payload, dict) else None
+            if not new_records or has_more is False or (limit and len(records) < limit):
+                break
+            position = position + len(records) if offset_container is not None else position + 1
 
 class ImprovedMamikosScraper:
-    def __init__(self):
-        """Initialize Chrome driver with better anti-detection measures"""
+    def __init__(self, capture_network=False):
+        """
+        Initialize Chrome driver with better anti-detection measures.
+        capture_network=True turns on Chrome's performance log, which API pagination
+        needs to capture the request sent by the "Load More" button.
+        """
         chrome_options = Options()
         
         # Better anti-detection setup
@@ -29,6 +242,9 @@ class ImprovedMamikosScraper:
         # Add user agent to look more like a real browser
         chrome_options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
         
+        if capture_network:
+            chrome_options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        
         self.driver = webdriver.Chrome(options=chrome_options)
         
         # Execute script to hide webdriver property
@@ -39,6 +255,16 @@ class ImprovedMamikosScraper:
         
         # This will now store the URLs of successfully opened product pages
         self.opened_product_urls = []
+        self.corpus = None # Optional PageCorpus that keeps a copy of the fully loaded search page
+        self.page_load_metrics = [] # One {url, matched_selector, elapsed_seconds, preferred} per wait_for_page_load()
+        self.harvest_mode = "fast" # "fast" = read all card links in one call; "tabs" = Ctrl+Click every card
+        self.verify_sample_rate = 0.05 # Fast mode: share of cards still verified by opening them in a tab
+        self.card_details = {} # Product URL -> card-level name/price/area seen on the search page
+        self.pagination_mode = "click" # "click" = press 'Load More' up to 15 times; "api" = replay its JSON request
+        self.api_max_pages = None # API pagination: optional page cap (None = until the results run out)
+        self.api_record_dir = None # API pagination: folder to save raw responses in for start_recorded_api_server()
+        self.http_session = None # Pooled requests session for API pagination, created on first use
+        self.seen_index = None # Optional SeenUrlIndex: listings collected by earlier runs are skipped
         
     def human_like_delay(self, min_seconds=1, max_seconds=3):
         """Add random delay to mimic human behavior"""
@@ -51,28 +277,31 @@ class ImprovedMamikosScraper:
         self.human_like_delay(1, 3)
         
     def wait_for_page_load(self, timeout=20):
-        """Wait for the initial search page or product page to fully load"""
+        """
+        Wait for the initial search page or product page to fully load.
+        All indicators are checked together in one polling loop under one overall deadline;
+        "body"/"main" only count if no page-specific indicator appears in time.
+        """
         print("⏳ Waiting for page to load...")
         
         # Wait for any key indicator that the page has loaded
         load_indicators = [
             ".kost-rc", # For search page
             "p.detail-title__room-name", # For product detail page
+        ]
+        fallback_indicators = [
             "body", # Fallback to body
             "main" # Fallback to main content area
         ]
         
-        for indicator in load_indicators:
-            try:
-                WebDriverWait(self.driver, timeout).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, indicator))
-                )
-                print(f"✓ Page loaded (detected: {indicator})")
-                return True
-            except TimeoutException:
-                continue
+        matched, elapsed, preferred = wait_for_selectors(self.driver, load_indicators, fallback_indicators, timeout)
+        self.page_load_metrics.append({'url': self.driver.current_url, 'matched_selector': matched,
+                                       'elapsed_seconds': round(elapsed, 3), 'preferred': preferred})
+        if matched:
+            print(f"✓ Page loaded (detected: {matched} after {elapsed:.1f}s)")
+            return True
         
-        print("⚠️ Could not confirm page load, proceeding anyway...")
+        print(f"⚠️ Could not confirm page load after {elapsed:.1f}s, proceeding anyway...")
         return False
         
     # Removed handle_popup method as per user request
@@ -96,73 +325,13 @@ class ImprovedMamikosScraper:
         # --- Phase 1: Load all content via "Load More" button clicks ---
         print("\n--- Phase 1: Loading all content via 'Load More' clicks ---")
         pagination_clicks_done = 0
-        MAX_PAGINATION_CLICKS = 15 # Attempt to click at least 13 times, setting a generous max
-        scroll_attempts_without_new_content = 0
-        last_height = self.driver.execute_script("return document.body.scrollHeight")
-
-        while pagination_clicks_done < MAX_PAGINATION_CLICKS:
-            print(f"  Attempting pagination click {pagination_clicks_done + 1}...")
-
-            # Try to find and click the "Load More" button
-            pagination_button_selectors = [
-                # Prioritize the specific selector from user's working code
-                (By.CSS_SELECTOR, "a.list__content-load-link[data-v-4a297354][class*='list__content-load-link']"),
-                (By.XPATH, "//a[contains(., 'Lihat lebih banyak lagi') and contains(@class, 'list__content-load-link')]"),
-                (By.XPATH, "//button[contains(., 'Lihat lebih banyak lagi')]"), 
-                (By.XPATH, "//span[contains(., 'Lihat lebih banyak lagi')]"), 
-                (By.CSS_SELECTOR, "button.Button__solid"), # Common button class
-                (By.CSS_SELECTOR, "div.sticky-bottom-button button"), # Button within a sticky footer
-                (By.CSS_SELECTOR, "button[class*='load-more']"), # Generic load more button
-                (By.CSS_SELECTOR, "[data-testid='load-more-button']"), # If they use data-testids
-            ]
-            
-            load_more_button = None
-            for selector_type, selector_value in pagination_button_selectors:
-                try:
-                    load_more_button = WebDriverWait(self.driver, 5).until(
-                        EC.element_to_be_clickable((selector_type, selector_value))
-                    )
-                    print(f"  ✓ 'Load More' button found with selector: {selector_value}")
-                    break
-                except TimeoutException:
-                    continue
-                except StaleElementReferenceException:
-                    print("  StaleElementReferenceException on load more button, retrying selector...")
-                    self.human_like_delay(0.5)
-                    continue
-                except Exception as e:
-                    print(f"  Error finding 'Load More' button with selector {selector_value}: {e}")
-                    continue
-            
-            if load_more_button:
-                try:
-                    self.scroll_slowly(load_more_button) # Scroll to button first
-                    print("  Clicking 'Load More' button...")
-                    self.driver.execute_script("arguments[0].click();", load_more_button) # Use JS click for robustness
-                    self.human_like_delay(4, 6) # Give time for new content to load
-                    pagination_clicks_done += 1
-                    
-                    # Check if new content actually loaded by comparing page height
-                    new_height = self.driver.execute_script("return document.body.scrollHeight")
-                    if new_height == last_height:
-                        scroll_attempts_without_new_content += 1
-                        print(f"  ⚠️ 'Load More' clicked, but page height did not change. Attempts without new content: {scroll_attempts_without_new_content}")
-                        if scroll_attempts_without_new_content >= 2: # Stop after 2 consecutive attempts with no new content
-                            print("  Stopping pagination: Consecutive attempts to load more yielded no new content.")
-                            break
-                    else:
-                        scroll_attempts_without_new_content = 0 # Reset counter if new content loaded
-                    last_height = new_height # Update last_height for next iteration
-                    
-                except Exception as e:
-                    print(f"  ❌ Error clicking 'Load More' button: {e}. Ending pagination.")
-                    break # Break loop if button click fails
-            else:
-                print("  No more 'Load More' button found. Ending pagination phase.")
-                break # Break loop if button not found
+        for pagination_clicks_done in self.iter_load_more_clicks():
+            pass # Phase 2 reads all cards at once; iter_product_links() harvests after every click instead
 
         print(f"\n--- Phase 1 Complete: Clicked 'Load More' {pagination_clicks_done} times. ---")
         self.human_like_delay(1, 2) # Reduced delay here
+        if self.corpus is not None:
+            self.corpus.save("search", search_url, self.driver.page_source)
         
         # --- Phase 2: Process all loaded product cards ---
         print("\n--- Phase 2: Processing all loaded product cards ---")
@@ -176,6 +345,11 @@ class ImprovedMamikosScraper:
             print("❌ No product cards found after loading all content!")
             return False
 
+        if self.harvest_mode == "fast":
+            processed_count_in_phase_2 = self.harvest_product_links(all_product_cards, processed_urls_set)
+            print(f"\n--- Phase 2 Complete: Harvested {processed_count_in_phase_2} unique product URLs. ---")
+            return len(self.opened_product_urls) > 0
+
         processed_count_in_phase_2 = 0
         for i, card in enumerate(all_product_cards):
             try:
@@ -186,9 +360,9 @@ class ImprovedMamikosScraper:
                 )
                 
                 # Get the URL before attempting to click, for checking against processed_urls_set
-                card_url = clickable_element.get_attribute('href')
+                card_url = canonicalize_url(clickable_element.get_attribute('href'))
 
-                if card_url in processed_urls_set:
+                if self.already_collected(card_url, processed_urls_set):
                     # print(f"  Skipping already processed URL: {card_url}") # Optional: for verbose logging
                     continue # Skip if already processed
 
@@ -213,13 +387,15 @@ class ImprovedMamikosScraper:
                     new_tab_handle = [w for w in all_windows_after_click if w != original_window][0]
                     self.driver.switch_to.window(new_tab_handle)
                     
-                    current_product_page_url = self.driver.current_url
+                    current_product_page_url = canonicalize_url(self.driver.current_url)
                     print(f"✓ Opened product page: {current_product_page_url}")
                     
                     # Add the URL of the opened product page to our list and set
-                    self.opened_product_urls.append(current_product_page_url)
-                    processed_urls_set.add(current_product_page_url)
-                    processed_count_in_phase_2 += 1
+                    processed_urls_set.add(card_url)
+                    if not self.already_collected(current_product_page_url, processed_urls_set):
+                        self.opened_product_urls.append(current_product_page_url)
+                        processed_urls_set.add(current_product_page_url)
+                        processed_count_in_phase_2 += 1
                     
                     # Close the new tab and return to the original search page
                     self.driver.close()
@@ -255,6 +431,273 @@ class ImprovedMamikosScraper:
         print(f"\n--- Phase 2 Complete: Processed {processed_count_in_phase_2} unique product URLs. ---")
         return len(self.opened_product_urls) > 0 # Return True if any URLs were successfully collected
             
+    def iter_load_more_clicks(self, max_clicks=15):
+        """
+        Click 'Load More' on the loaded search page until it disappears, stops adding content
+        twice in a row, or max_clicks is reached (15 by default, a generous max over the ~13
+        clicks a region needs). Yields the number of clicks done after every click.
+        """
+        pagination_clicks_done = 0
+        scroll_attempts_without_new_content = 0
+        last_height = self.driver.execute_script("return document.body.scrollHeight")
+
+        while pagination_clicks_done < max_clicks:
+            print(f"  Attempting pagination click {pagination_clicks_done + 1}...")
+
+            # Try to find and click the "Load More" button
+            load_more_button = self.find_load_more_button()
+            
+            if load_more_button:
+                try:
+                    self.scroll_slowly(load_more_button) # Scroll to button first
+                    print("  Clicking 'Load More' button...")
+                    self.driver.execute_script("arguments[0].click();", load_more_button) # Use JS click for robustness
+                    self.human_like_delay(4, 6) # Give time for new content to load
+                    pagination_clicks_done += 1
+                    yield pagination_clicks_done
+                    
+                    # Check if new content actually loaded by comparing page height
+                    new_height = self.driver.execute_script("return document.body.scrollHeight")
+                    if new_height == last_height:
+                        scroll_attempts_without_new_content += 1
+                        print(f"  ⚠️ 'Load More' clicked, but page height did not change. Attempts without new content: {scroll_attempts_without_new_content}")
+                        if scroll_attempts_without_new_content >= 2: # Stop after 2 consecutive attempts with no new content
+                            print("  Stopping pagination: Consecutive attempts to load more yielded no new content.")
+                            break
+                    else:
+                        scroll_attempts_without_new_content = 0 # Reset counter if new content loaded
+                    last_height = new_height # Update last_height for next iteration
+                    
+                except Exception as e:
+                    print(f"  ❌ Error clicking 'Load More' button: {e}. Ending pagination.")
+                    break # Break loop if button click fails
+            else:
+                print("  No more 'Load More' button found. Ending pagination phase.")
+                break # Break loop if button not found
+
+    def find_load_more_button(self):
+        """Return the first clickable 'Load More' button among LOAD_MORE_SELECTORS, or None."""
+        load_more_button = None
+        for selector_type, selector_value in LOAD_MORE_SELECTORS:
+            try:
+                load_more_button = WebDriverWait(self.driver, 5).until(
+                    EC.element_to_be_clickable((selector_type, selector_value))
+                )
+                print(f"  ✓ 'Load More' button found with selector: {selector_value}")
+                break
+            except TimeoutException:
+                continue
+            except StaleElementReferenceException:
+                print("  StaleElementReferenceException on load more button, retrying selector...")
+                self.human_like_delay(0.5)
+                continue
+            except Exception as e:
+                print(f"  Error finding 'Load More' button with selector {selector_value}: {e}")
+                continue
+        return load_more_button
+
+    def get_http_session(self, pool_size=4):
+        """Pooled requests session carrying the browser's cookies and user agent."""
+        if self.http_session is None:
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=2)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers['User-Agent'] = self.driver.execute_script("return navigator.userAgent")
+            for cookie in self.driver.get_cookies():
+                session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+            self.http_session = session
+        return self.http_session
+
+    def capture_load_more_request(self):
+        """
+        Click 'Load More' once on the loaded search page and pick the XHR/fetch request it
+        sent out of Chrome's performance log: the last one carrying an offset or page
+        parameter. Returns {url, method, headers, post_data} or None if nothing was captured
+        (e.g. the driver was started without capture_network=True).
+        """
+        try:
+            self.driver.get_log('performance') # Drop everything logged while the page loaded
+        except Exception as e:
+            print(f"  ⚠️ Network log unavailable ({e}); start the scraper with capture_network=True")
+            return None
+
+        load_more_button = self.find_load_more_button()
+        if not load_more_button:
+            print("  No 'Load More' button found, so there is no request to capture.")
+            return None
+        self.scroll_slowly(load_more_button)
+        self.driver.execute_script("arguments[0].click();", load_more_button)
+        self.human_like_delay(4, 6)
+
+        captured = None
+        for entry in self.driver.get_log('performance'):
+            message = json.loads(entry['message']).get('message', {})
+            params = message.get('params', {})
+            if message.get('method') != 'Network.requestWillBeSent' or params.get('type') not in ('XHR', 'Fetch'):
+                continue
+            request = params.get('request', {})
+            post_data = request.get('postData')
+            if post_data is None and request.get('hasPostData'):
+                try:
+                    post_data = self.driver.execute_cdp_cmd('Network.getRequestPostData', {'requestId': params.get('requestId')}).get('postData')
+                except Exception:
+                    post_data = None
+            body = None
+            if post_data:
+                try:
+                    body = json.loads(post_data)
+                except ValueError:
+                    body = dict(parse_qsl(post_data))
+            query = dict(parse_qsl(urlparse(request.get('url', '')).query))
+            paging_keys = PAGE_OFFSET_KEYS + PAGE_NUMBER_KEYS
+            if find_page_param(body, paging_keys)[0] is None and find_page_param(query, paging_keys)[0] is None:
+                continue
+            captured = {'url': request['url'], 'method': request.get('method', 'GET'),
+                        'headers': request.get('headers', {}), 'post_data': post_data}
+        if captured:
+            print(f"  ✓ Captured listing request: {captured['method']} {captured['url']}")
+        else:
+            print("  ⚠️ 'Load More' did not send a recognisable paged JSON request.")
+        return captured
+
+    def scrape_products_via_api(self, search_url):
+        """
+        API pagination: load the search page once, capture the request behind 'Load More'
+        and page through its JSON responses with ListingApiPaginator instead of clicking,
+        so there is no 15-click ceiling. Falls back to clicking 'Load More' (with the fast
+        harvest) when no request can be captured.
+        """
+        previous_mode = self.pagination_mode
+        self.pagination_mode = "api"
+        try:
+            for _ in self.iter_product_links(search_url):
+                pass
+        finally:
+            self.pagination_mode = previous_mode
+        return len(self.opened_product_urls) > 0
+
+    def already_collected(self, url, processed_urls_set):
+        """True for a canonical URL collected earlier in this run or, with a seen_index, by an earlier run"""
+        return url in processed_urls_set or (self.seen_index is not None and url in self.seen_index)
+
+    def harvest_product_links(self, all_product_cards, processed_urls_set):
+        """
+        Fast Phase 2: read every card's href (plus visible name, price and area) with one
+        execute_script call instead of Ctrl+Clicking each card. Only hrefs that look like
+        redirects, plus a random verify_sample_rate share of the rest, are still opened in a
+        tab to confirm the final product URL. Returns the number of new URLs collected.
+        """
+        return sum(1 for _ in self.iter_harvested_links(processed_urls_set, all_product_cards))
+
+    def iter_harvested_links(self, processed_urls_set, all_product_cards=None):
+        """
+        Generator behind harvest_product_links(): yields each new product URL as soon as it
+        is collected (and recorded in opened_product_urls/card_details). Card elements for
+        tab verification are looked up only if a card actually needs verifying.
+        """
+        cards = self.driver.execute_script(HARVEST_CARDS_SCRIPT) or []
+        base_url = self.driver.current_url
+        harvested = 0
+        verified = 0
+        for card in cards:
+            href = normalise_card_href(card.get('href'), base_url)
+            if not href:
+                continue
+            card_url = canonicalize_url(href)
+            if self.already_collected(card_url, processed_urls_set):
+                continue
+
+            if looks_like_redirect(href) or random.random() < self.verify_sample_rate:
+                verified += 1
+                if all_product_cards is None:
+                    all_product_cards = self.driver.find_elements(By.CSS_SELECTOR, ".kost-rc")
+                final_url = self.verify_card_in_tab(all_product_cards[card['index']])
+                if final_url and canonicalize_url(final_url) != card_url:
+                    print(f"  ↪ {href} resolved to {final_url}")
+                    processed_urls_set.add(card_url)
+                    card_url = canonicalize_url(final_url)
+                    if self.already_collected(card_url, processed_urls_set):
+                        continue
+
+            self.opened_product_urls.append(card_url)
+            processed_urls_set.add(card_url)
+            self.card_details[card_url] = {
+                'name': card.get('name', ''),
+                'price': card.get('price', ''),
+                'area': card.get('area', ''),
+            }
+            harvested += 1
+            yield card_url
+
+        print(f"✓ Harvested {harvested} product URL(s) from {len(cards)} card(s); {verified} checked in a new tab.")
+
+    def iter_product_links(self, search_url):
+        """
+        Streaming version of scrape_products()/scrape_products_via_api(): yields product URLs
+        while the search is still being paged, so a consumer can start on them right away.
+        Click pagination harvests the cards visible on load and then the new cards after every
+        'Load More' click (always with the fast harvest); API pagination yields each listing
+        as its JSON page arrives.
+        """
+        print(f"🚀 Loading search page: {search_url}")
+        self.driver.get(search_url)
+        self.wait_for_page_load()
+        self.human_like_delay(3, 5)
+        processed_urls_set = set(self.opened_product_urls)
+
+        if self.pagination_mode == "api":
+            request = self.capture_load_more_request()
+            if request is not None:
+                paginator = ListingApiPaginator(request, session=self.get_http_session(), max_pages=self.api_max_pages,
+                                                record_dir=self.api_record_dir, base_url=search_url)
+                harvested = 0
+                try:
+                    for card in paginator.iter_records():
+                        card_url = canonicalize_url(card['url'])
+                        if self.already_collected(card_url, processed_urls_set):
+                            continue
+                        self.opened_product_urls.append(card_url)
+                        processed_urls_set.add(card_url)
+                        self.card_details[card_url] = {'name': card['name'], 'price': card['price'], 'area': card['area']}
+                        harvested += 1
+                        yield card_url
+                except (requests.RequestException, ValueError) as e:
+                    print(f"  ❌ API pagination stopped: {e}")
+                print(f"✓ API pagination: {harvested} product URL(s) from {paginator.pages_fetched} page(s).")
+                return
+            else:
+                print("↩️ Falling back to clicking 'Load More'.")
+
+        yield from self.iter_harvested_links(processed_urls_set)
+        for _ in self.iter_load_more_clicks():
+            yield from self.iter_harvested_links(processed_urls_set)
+        if self.corpus is not None:
+            self.corpus.save("search", search_url, self.driver.page_source)
+
+    def verify_card_in_tab(self, card):
+        """Ctrl+Click a card's link, read the URL the new tab lands on and close it. Returns None on failure."""
+        original_window = self.driver.current_window_handle
+        try:
+            clickable_element = card.find_element(By.CSS_SELECTOR, ".kost-rc__inner")
+            ActionChains(self.driver).key_down(Keys.CONTROL).click(clickable_element).key_up(Keys.CONTROL).perform()
+            self.human_like_delay(3, 5)
+            new_tabs = [w for w in self.driver.window_handles if w != original_window]
+            if not new_tabs:
+                return None
+            self.driver.switch_to.window(new_tabs[0])
+            final_url = self.driver.current_url
+            self.driver.close()
+            return final_url
+        except Exception as e:
+            print(f"  ⚠️ Tab verification failed: {e}")
+            return None
+        finally:
+            try:
+                self.driver.switch_to.window(original_window) # Back to the search page in every case
+            except Exception:
+                pass
+
     def print_results(self):
         """Prints the extracted product URLs in a formatted way."""
         print(f"\n{'='*60}")
@@ -272,26 +715,184 @@ class ImprovedMamikosScraper:
         try:
             with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
                 csv_writer = csv.writer(csvfile)
-                csv_writer.writerow(['Opened_Product_URL']) # Write header row
-                for url in self.opened_product_urls:
-                    csv_writer.writerow([url]) # Write each URL as a new row
+                if self.card_details: # Fast harvest also captured card-level details
+                    csv_writer.writerow(['Opened_Product_URL', 'Card_Name', 'Card_Price', 'Card_Area'])
+                    for url in self.opened_product_urls:
+                        details = self.card_details.get(url, {})
+                        csv_writer.writerow([url, details.get('name', ''), details.get('price', ''), details.get('area', '')])
+                else:
+                    csv_writer.writerow(['Opened_Product_URL']) # Write header row
+                    for url in self.opened_product_urls:
+                        csv_writer.writerow([url]) # Write each URL as a new row
             print(f"✓ Extracted URLs saved to {filename}")
+            if self.seen_index is not None: # Only once they are safely in a CSV
+                new_urls = self.seen_index.add_many(self.opened_product_urls)
+                print(f"✓ {new_urls} URL(s) added to the seen-URL index ({len(self.seen_index)} in total)")
         except Exception as e:
             print(f"❌ Error saving URLs to CSV: {str(e)}")
     
     def close(self):
         """Close the browser"""
+        if self.http_session is not None:
+            self.http_session.close()
         try:
             self.driver.quit()
             print("✓ Browser closed")
         except:
             pass
 
+def load_region_manifest(manifest_path):
+    """
+    Read a manifest of regions to collect. Either a CSV with `region` and `search_url`
+    columns, or a JSON list of {"region": ..., "search_url": ...} objects.
+    Returns a list of (region, search_url) pairs.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        if str(manifest_path).lower().endswith('.json'):
+            rows = json.load(f)
+        else:
+            rows = list(csv.DictReader(f))
+    return [(row['region'].strip(), row['search_url'].strip()) for row in rows if row.get('search_url')]
+
+def collect_regions(regions, workers=2, harvest_mode="fast", verify_sample_rate=0.05, corpus=None,
+                    max_requests_per_second=0.2, pagination_mode="click", seen_index=None):
+    """
+    Batch mode: collect product URLs for many (region, search_url) pairs with a pool of
+    browser sessions. Each worker thread owns one scraper and takes regions from a shared
+    queue; a shared HostRateLimiter spaces out the search page loads. URLs are deduplicated
+    across all regions: the first region to find a listing owns it, and any other regions
+    whose searches also return it are listed in `also_in`. With pagination_mode="api"
+    each region is paged through the search endpoint instead of 'Load More' clicks.
+    URLs already in seen_index (collected by an earlier run) are left out.
+
+    Returns:
+        list: One dict per unique URL (url, region, also_in, name, price, area), in discovery order.
+    """
+    region_queue = queue.Queue()
+    for region, search_url in regions:
+        region_queue.put((region, search_url))
+
+    merged = {} # url -> row; dicts keep discovery order
+    merged_lock = threading.Lock()
+    rate_limiter = HostRateLimiter(max_requests_per_second)
+
+    def worker(worker_number):
+        scraper = ImprovedMamikosScraper(capture_network=pagination_mode == "api")
+        scraper.pagination_mode = pagination_mode
+        scraper.harvest_mode = harvest_mode
+        scraper.verify_sample_rate = verify_sample_rate
+        scraper.corpus = corpus
+        try:
+            while True:
+                try:
+                    region, search_url = region_queue.get_nowait()
+                except queue.Empty:
+                    return
+                print(f"\n[Worker {worker_number}] 🗺️ Collecting region '{region}': {search_url}")
+                # Each region starts from an empty list so its own results can be merged
+                scraper.opened_product_urls = []
+                scraper.card_details = {}
+                try:
+                    rate_limiter.wait(search_url)
+                    if pagination_mode == "api":
+                        scraper.scrape_products_via_api(search_url)
+                    else:
+                        scraper.scrape_products(search_url)
+                except Exception as e:
+                    print(f"❌ [Worker {worker_number}] Region '{region}' failed: {e}")
+                    continue
+                new_urls = 0
+                with merged_lock:
+                    for url in scraper.opened_product_urls:
+                        if url in merged:
+                            if region != merged[url]['region'] and region not in merged[url]['also_in']:
+                                merged[url]['also_in'].append(region)
+                            continue
+                        if seen_index is not None and url in seen_index:
+                            continue
+                        details = scraper.card_details.get(url, {})
+                        merged[url] = {'url': url, 'region': region, 'also_in': [],
+                                       'name': details.get('name', ''), 'price': details.get('price', ''),
+                                       'area': details.get('area', '')}
+                        new_urls += 1
+                print(f"✓ [Worker {worker_number}] '{region}': {len(scraper.opened_product_urls)} URL(s), {new_urls} new across regions.")
+        finally:
+            scraper.close()
+
+    threads = [threading.Thread(target=worker, args=(n + 1,), daemon=True)
+               for n in range(max(1, min(workers, len(regions))))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return list(merged.values())
+
+def save_region_links_to_csv(rows, filename="mamikos_url_merged.csv", seen_index=None):
+    """Save the merged, region-tagged URL set from collect_regions() (and mark it in seen_index)."""
+    try:
+        with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
+            csv_writer = csv.writer(csvfile)
+            csv_writer.writerow(['Opened_Product_URL', 'Region', 'Also_In_Regions', 'Card_Name', 'Card_Price', 'Card_Area'])
+            for row in rows:
+                csv_writer.writerow([row['url'], row['region'], "; ".join(row['also_in']),
+                                     row['name'], row['price'], row['area']])
+        print(f"✓ {len(rows)} unique URLs saved to {filename}")
+        if seen_index is not None:
+            new_urls = seen_index.add_many(row['url'] for row in rows)
+            print(f"✓ {new_urls} URL(s) added to the seen-URL index ({len(seen_index)} in total)")
+    except Exception as e:
+        print(f"❌ Error saving URLs to CSV: {str(e)}")
+
 # Test the improved functionality
 if __name__ == "__main__":
-    search_url = input("Put Mamikos Search URL here: ")
+    parser = argparse.ArgumentParser(description="Collect Mamikos product URLs from a search page.")
+    parser.add_argument("search_url", nargs="?", help="Mamikos search URL (prompted if omitted)")
+    parser.add_argument("--harvest", choices=["fast", "tabs"], default="fast",
+                        help="fast: read all card links in one call; tabs: Ctrl+Click every card (old behaviour)")
+    parser.add_argument("--verify-sample", type=float, default=0.05,
+                        help="Fast harvest: share of cards still opened in a tab to confirm their URL")
+    parser.add_argument("--pagination", choices=["click", "api"], default="click",
+                        help="click: press 'Load More' (max 15 times); api: replay its JSON request page by page")
+    parser.add_argument("--max-pages", type=int, default=None, help="API pagination: stop after this many pages")
+    parser.add_argument("--record-api", metavar="DIR", help="API pagination: save raw responses for offline replay")
+    parser.add_argument("--record-corpus", metavar="DIR", help="Save the fully loaded search page into a benchmark corpus directory")
+    parser.add_argument("--manifest", help="CSV/JSON manifest of regions and search URLs to collect in one batch")
+    parser.add_argument("--workers", type=int, default=2, help="Parallel browser sessions for --manifest batches")
+    parser.add_argument("--max-rps", type=float, default=0.2, help="Search page loads per second across all workers")
+    parser.add_argument("--seen-index", metavar="PATH",
+                        help="Skip listings collected by earlier runs and add this run's (SQLite file, or a .bloom filter for huge runs)")
+    parser.add_argument("--output", default=None, help="Output CSV file name")
+    args = parser.parse_args()
+    seen_index = open_seen_index(args.seen_index, stage="links") if args.seen_index else None
+
+    if args.manifest:
+        regions = load_region_manifest(args.manifest)
+        print(f"🚀 Collecting {len(regions)} region(s) with {args.workers} browser session(s)...")
+        try:
+            merged_rows = collect_regions(regions, workers=args.workers, harvest_mode=args.harvest,
+                                          verify_sample_rate=args.verify_sample,
+                                          corpus=PageCorpus(args.record_corpus) if args.record_corpus else None,
+                                          max_requests_per_second=args.max_rps,
+                                          pagination_mode=args.pagination, seen_index=seen_index)
+            save_region_links_to_csv(merged_rows, args.output or "mamikos_url_merged.csv", seen_index=seen_index)
+        except KeyboardInterrupt:
+            print("\n⚠️ Collection interrupted by user")
+        finally:
+            if seen_index is not None:
+                seen_index.close()
+        sys.exit(0)
+
+    search_url = args.search_url or input("Put Mamikos Search URL here: ")
     
-    scraper = ImprovedMamikosScraper()
+    scraper = ImprovedMamikosScraper(capture_network=args.pagination == "api")
+    scraper.pagination_mode = args.pagination
+    scraper.api_max_pages = args.max_pages
+    scraper.api_record_dir = args.record_api
+    scraper.harvest_mode = args.harvest
+    scraper.verify_sample_rate = args.verify_sample
+    scraper.seen_index = seen_index
+    if args.record_corpus:
+        scraper.corpus = PageCorpus(args.record_corpus)
     
     try:
         print("🚀 Starting Mamikos Product URL Collector...")
@@ -299,12 +900,18 @@ if __name__ == "__main__":
         print("-" * 60)
         
         # Call the new product scraping method to open tabs and collect URLs for ALL products
-        success = scraper.scrape_products(search_url) 
+        if scraper.pagination_mode == "api":
+            success = scraper.scrape_products_via_api(search_url)
+        else:
+            success = scraper.scrape_products(search_url) 
         
         if success:
             print("\n✅ URL COLLECTION COMPLETED!")
             scraper.print_results() # Print the URLs to console
-            scraper.save_links_to_csv() # Save the URLs to a CSV file
+            if args.output:
+                scraper.save_links_to_csv(args.output)
+            else:
+                scraper.save_links_to_csv() # Save the URLs to a CSV file
         else:
             print("\n❌ URL COLLECTION FAILED!")
             
@@ -314,3 +921,5 @@ if __name__ == "__main__":
         print(f"\n❌ Collection failed with error: {str(e)}")
     finally:
         scraper.close()
+        if seen_index is not None:
+            seen_index.close()
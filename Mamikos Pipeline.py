@@ -0,0 +1,205 @@
+import argparse
+import functools
+import queue
+import sys
+import threading
+import time
+from pathlib import Path
+
+from mamikos_storage import open_record_writer
+from mamikos_utils import (DriverManager, HostRateLimiter, PageCorpus, ResourcePolicy, RetryScheduler, ScrapeMetrics,
+                           configure_logging, load_script, open_seen_index)
+
+# How long a put on the full URL queue waits before checking that a detail worker is still alive
+QUEUE_PUT_TIMEOUT = 1.0
+
+
+def load_scrapers():
+    """Import the link and data scraper scripts (their file names are not valid module names)"""
+    link_module = load_script("Mamikos Link Scrapper.py", "mamikos_link_scrapper")
+    data_module = load_script("Mamikos Data Scrapper.py", "mamikos_data_scrapper")
+    return link_module, data_module
+
+
+def run_pipeline(link_scraper, data_scraper, search_url, region_name, detail_workers=2, queue_size=20,
+                 max_requests_per_second=0.5):
+    """
+    Collect links and scrape product details at the same time.
+
+    A link thread runs link_scraper.iter_product_links(), which yields every product URL
+    as soon as its card has been harvested, and puts it on a bounded queue. Detail
+    workers (data_scraper plus detail_workers - 1 extra browser sessions) take URLs off
+    the queue straight away. When the queue is full the link thread blocks, so link
+    collection never runs more than queue_size URLs ahead of detail scraping. The run
+    therefore takes about as long as the slower stage, not the sum of both stages.
+    If every detail worker has died, the link thread stops instead of waiting on the
+    full queue forever.
+
+    Results end up in data_scraper.scraped_data (in harvest order) and in its journal.
+    Failed URLs are retried with backoff once both stages are done (data_scraper.run_retries).
+    URLs already in data_scraper.completed_urls (e.g. from --resume) or in its seen_index
+    (scraped by an earlier run) are not queued.
+
+    Returns:
+        dict: Stage timings and counts (links, queued, link_seconds, total_seconds, backpressure_waits).
+    """
+    url_queue = queue.Queue(maxsize=max(1, queue_size))
+    rate_limiter = HostRateLimiter(max_requests_per_second)
+    sessions = [data_scraper]
+    for _ in range(max(1, detail_workers) - 1):
+        sessions.append(data_scraper.new_worker_session())
+    stats = {'links': 0, 'queued': 0, 'link_seconds': 0.0, 'total_seconds': 0.0, 'backpressure_waits': 0}
+    started = time.perf_counter()
+    workers = []
+
+    def put(item):
+        """url_queue.put() that blocks while the detail workers catch up; False once none is left to take it"""
+        while True:
+            try:
+                url_queue.put(item, timeout=QUEUE_PUT_TIMEOUT)
+                return True
+            except queue.Full:
+                if not any(worker.is_alive() for worker in workers):
+                    return False
+
+    def link_stage():
+        try:
+            for url in link_scraper.iter_product_links(search_url):
+                stats['links'] += 1
+                if url in data_scraper.completed_urls:
+                    continue
+                if data_scraper.seen_index is not None and url in data_scraper.seen_index:
+                    continue
+                if url_queue.full():
+                    stats['backpressure_waits'] += 1
+                if not put((stats['links'] - 1, url)):
+                    print("❌ Every detail worker has stopped; ending link collection early.")
+                    break
+                stats['queued'] += 1
+        except Exception as e:
+            print(f"❌ Link stage failed: {e}")
+        finally:
+            stats['link_seconds'] = time.perf_counter() - started
+            print(f"\n🔗 Link stage done: {stats['links']} URL(s) in {stats['link_seconds']:.0f}s.")
+            for _ in sessions:
+                if not put(None): # One end-of-work marker per detail worker
+                    break
+
+    workers += [
+        threading.Thread(target=data_scraper.run_queue_worker,
+                         args=(session, url_queue, rate_limiter, n + 1, region_name), daemon=True)
+        for n, session in enumerate(sessions)
+    ]
+    threads = [threading.Thread(target=link_stage, daemon=True)] + workers
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        for session in sessions[1:]: # The first session is data_scraper; the caller closes it
+            session.close()
+    data_scraper.run_retries(region_name, rate_limiter)
+
+    data_scraper.scraped_data.sort(key=lambda item: item.get('product_number', 0))
+    stats['total_seconds'] = time.perf_counter() - started
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Collect Mamikos product URLs and scrape their details in one streaming run.")
+    parser.add_argument("search_url", nargs="?", help="Mamikos search URL (prompted if omitted)")
+    parser.add_argument("--region", help="Region name stored with every product (prompted if omitted)")
+    parser.add_argument("--workers", type=int, default=2, help="Detail-page browser sessions")
+    parser.add_argument("--queue-size", type=int, default=20, help="URLs the link stage may run ahead of the detail workers")
+    parser.add_argument("--warm-sessions", type=int, default=0, help="Spare Chrome sessions kept launched for the detail workers")
+    parser.add_argument("--block-resources", action="store_true",
+                        help="Detail pages: skip images, media, fonts, map tiles and analytics, and load pages eagerly")
+    parser.add_argument("--allow-resource", metavar="PATTERN", action="append", default=[],
+                        help="With --block-resources: keep loading this URL pattern or category (images, media, fonts, maps, analytics)")
+    parser.add_argument("--block-resource", metavar="PATTERN", action="append", default=[],
+                        help="With --block-resources: also block this URL pattern ('*' wildcards, e.g. '*intercom.io*')")
+    parser.add_argument("--recycle-after", type=int, default=0, metavar="PAGES",
+                        help="Replace each detail browser session after this many pages (0 = never)")
+    parser.add_argument("--max-rps", type=float, default=0.5, help="Detail page requests per second across all workers")
+    parser.add_argument("--pagination", choices=["click", "api"], default="click",
+                        help="click: press 'Load More'; api: replay its JSON request page by page")
+    parser.add_argument("--engine", choices=["selenium", "http"], default="selenium", help="How product pages are fetched")
+    parser.add_argument("--adaptive-wait", action="store_true", help="Wait for the target selectors instead of fixed sleeps")
+    parser.add_argument("--record-corpus", metavar="DIR", help="Save fetched search and product pages into a benchmark corpus")
+    parser.add_argument("--links-output", default="mamikos_url_pipeline.csv", help="CSV of the collected URLs")
+    parser.add_argument("--output", metavar="PATH", action="append", default=[],
+                        help="Stream every record to this .jsonl, .csv, .parquet or .sqlite file as it is scraped (repeatable)")
+    parser.add_argument("--metrics", metavar="PATH", help="Write per-URL stage timings as JSON lines and print a run summary")
+    parser.add_argument("--seen-index", metavar="PATH",
+                        help="Skip listings scraped by earlier runs and add this run's (SQLite file, or a .bloom filter)")
+    parser.add_argument("--journal", help="Progress journal file (default: <links output>.journal.jsonl)")
+    parser.add_argument("--resume", action="store_true", help="Skip URLs already recorded in the journal")
+    parser.add_argument("--log-level", choices=["DEBUG", "INFO", "WARNING"], default="INFO",
+                        help="DEBUG also logs every field and selector match")
+    args = parser.parse_args()
+    configure_logging(args.log_level)
+
+    search_url = args.search_url or input("Put Mamikos Search URL here: ")
+    region = args.region or input("Input Region Name: ")
+    link_module, data_module = load_scrapers()
+    corpus = PageCorpus(args.record_corpus) if args.record_corpus else None
+
+    link_scraper = link_module.ImprovedMamikosScraper(capture_network=args.pagination == "api")
+    link_scraper.pagination_mode = args.pagination
+    link_scraper.corpus = corpus
+    resource_policy = ResourcePolicy(deny=args.block_resource, allow=args.allow_resource) if args.block_resources else None
+    driver_manager = DriverManager(functools.partial(data_module.create_chrome_driver, resource_policy=resource_policy),
+                                   warm_sessions=args.warm_sessions,
+                                   recycle_after_pages=args.recycle_after)
+    data_scraper = data_module.ImprovedMamikosScraper(fetch_engine=args.engine, driver_manager=driver_manager)
+    data_scraper.readiness_mode = "adaptive" if args.adaptive_wait else "fixed"
+    data_scraper.corpus = corpus
+    if args.seen_index:
+        data_scraper.seen_index = open_seen_index(args.seen_index, stage="details")
+    if args.metrics:
+        data_scraper.metrics = ScrapeMetrics(args.metrics)
+    for output_path in args.output:
+        data_scraper.output_writers.append(open_record_writer(output_path))
+    journal_path = Path(args.journal) if args.journal else Path(args.links_output).with_suffix('.journal.jsonl')
+    data_scraper.open_journal(journal_path, resume=args.resume)
+    data_scraper.retry_scheduler = RetryScheduler(dead_letter_path=Path(args.links_output).with_suffix('.dead_letter.jsonl'))
+
+    try:
+        print(f"🚀 Streaming pipeline: link collection feeding {args.workers} detail worker(s) through a queue of {args.queue_size}.")
+        stats = run_pipeline(link_scraper, data_scraper, search_url, region, detail_workers=args.workers,
+                             queue_size=args.queue_size, max_requests_per_second=args.max_rps)
+        print(f"\n⏱️ Links: {stats['link_seconds']:.0f}s, end to end: {stats['total_seconds']:.0f}s, "
+              f"{data_scraper.record_count} product(s); the link stage waited on a full queue {stats['backpressure_waits']} time(s).")
+        if data_scraper.metrics is not None:
+            data_scraper.metrics.print_summary()
+        if driver_manager.start_seconds:
+            driver_manager.print_summary()
+        data_scraper.retry_scheduler.print_summary()
+        link_scraper.save_links_to_csv(args.links_output)
+        if data_scraper.record_count:
+            print("\n✅ PIPELINE COMPLETED!")
+            data_scraper.save_data_to_json()
+            data_scraper.save_data_to_csv()
+        else:
+            print("\n❌ PIPELINE FAILED or no products scraped!")
+    except KeyboardInterrupt:
+        print("\n⚠️ Pipeline interrupted by user")
+        print(f"  Finished products are kept in '{journal_path}'; rerun with --resume to continue.")
+    finally:
+        data_scraper.journal.close()
+        data_scraper.retry_scheduler.close()
+        if data_scraper.seen_index is not None:
+            data_scraper.seen_index.close()
+        if data_scraper.metrics is not None:
+            data_scraper.metrics.close()
+        for writer in data_scraper.output_writers:
+            writer.close()
+        data_scraper.close()
+        driver_manager.close()
+        link_scraper.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
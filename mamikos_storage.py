@@ -0,0 +1,383 @@
+"""
+Typed output for Mamikos product records.
+
+The scrapers keep every field as the text shown on the page ("Rp1.500.000",
+"3 x 4 meter", "Sisa 2 kamar", "4.8"). The helpers here parse those strings once
+into typed values and write them to columnar files, so analysis code does not
+have to re-parse them on every load. The streaming writers append each record
+to JSONL, CSV, Parquet or an upserting SQLite store as soon as it is scraped.
+"""
+import csv
+import json
+import re
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from mamikos_utils import canonicalize_url
+
+# Values the extractors use when a field was not found on the page
+MISSING_TEXT = ("", "N/A", "Not found", "Not Available")
+
+# Column order of streamed CSV files: every key a product record can have
+CSV_COLUMNS = [
+    'product_number', 'room_name', 'price', 'owner_name', 'room_size', 'room_availability_bs',
+    'deposit_amount_bs', 'is_electricity_included', 'price_before_discount_bs', 'discount_amount',
+    'all_facilities_bs', 'rating', 'rating_count', 'transaction_count', 'tipe_kos', 'location',
+    'region', 'url', 'page_title', 'scraped_at', 'listing_status', 'delisted_at',
+]
+
+# Text patterns behind the parse_* helpers; mamikos_postprocess applies the same ones to whole columns
+AMOUNT_PATTERN = re.compile(r'(?:Rp\.?\s*)?(\d[\d.,]*)\s*(jt|juta|rb|ribu|k)?(?![a-z])', re.IGNORECASE)
+AREA_PATTERN = re.compile(r'(\d+(?:[.,]\d+)?)\s*[x×]\s*(\d+(?:[.,]\d+)?)', re.IGNORECASE)
+DECIMAL_PATTERN = re.compile(r'\d+(?:[.,]\d+)?')
+MULTIPLIERS = {'jt': 1_000_000, 'juta': 1_000_000, 'rb': 1_000, 'ribu': 1_000, 'k': 1_000}
+
+
+def clean_text(value):
+    """The value as stripped text, or None for missing markers ("N/A", "Not found", ...)"""
+    if value is None:
+        return None
+    text = str(value).strip()
+    return None if text in MISSING_TEXT else text
+
+
+def _scaled_number(number, unit):
+    """Number text with an optional jt/rb suffix as int; '1,5' + 'jt' -> 1500000, '1.500.000' -> 1500000"""
+    if unit:
+        decimal = number.replace(',', '.')
+        if decimal.count('.') > 1:
+            decimal = decimal.replace('.', '')
+        return int(round(float(decimal.rstrip('.')) * MULTIPLIERS[unit.lower()]))
+    number = re.sub(r',\d{1,2}$', '', number) # "1.500.000,00" -> drop the cents
+    digits = re.sub(r'\D', '', number)
+    return int(digits) if digits else None
+
+
+def parse_idr(value):
+    """Rupiah amount as int: 'Rp1.500.000' -> 1500000, 'Rp 1,5 jt' -> 1500000, 'Rp750rb' -> 750000"""
+    text = clean_text(value)
+    if text is None:
+        return None
+    match = AMOUNT_PATTERN.search(text)
+    return _scaled_number(*match.groups()) if match else None
+
+
+def parse_count(value):
+    """First count in the text as int: '(123 ulasan)' -> 123, '1.204 transaksi' -> 1204, '1,2rb' -> 1200"""
+    return parse_idr(value)
+
+
+def parse_decimal(value):
+    """First decimal number in the text as float: '4.8' -> 4.8, '4,8' -> 4.8"""
+    text = clean_text(value)
+    if text is None:
+        return None
+    match = DECIMAL_PATTERN.search(text)
+    return float(match.group().replace(',', '.')) if match else None
+
+
+def parse_area_m2(value):
+    """Room area in m² from a size like '3 x 4 meter' or '3,5x4' -> 12.0 / 14.0"""
+    text = clean_text(value)
+    if text is None:
+        return None
+    match = AREA_PATTERN.search(text)
+    if not match:
+        return None
+    width, length = (float(part.replace(',', '.')) for part in match.groups())
+    return width * length
+
+
+def parse_rooms_available(value):
+    """Rooms left as int: 'Sisa 2 kamar' -> 2, 'Kamar penuh' -> 0"""
+    text = clean_text(value)
+    if text is None:
+        return None
+    if 'penuh' in text.lower():
+        return 0
+    return parse_count(text)
+
+
+def parse_electricity(value):
+    """True if electricity is included in the rent, False if not, None if unknown"""
+    text = (clean_text(value) or '').lower()
+    if 'tidak termasuk' in text or 'token' in text:
+        return False
+    if 'termasuk' in text:
+        return True
+    return None
+
+
+def parse_timestamp(value):
+    """datetime from an ISO-8601 `scraped_at`/`delisted_at` string, None if missing or invalid"""
+    text = clean_text(value)
+    if text is None:
+        return None
+    try:
+        return datetime.fromisoformat(text)
+    except ValueError:
+        return None
+
+
+def parse_facilities(value):
+    """Facility list from a record (a list, or the '; '-joined text written by save_data_to_csv)"""
+    if isinstance(value, str):
+        value = value.split(';')
+    return [text for text in (clean_text(item) for item in value or []) if text is not None]
+
+
+def normalise_record(record):
+    """
+    Map one scraped product record onto the typed columns of parquet_schema().
+    Prices are whole rupiah, area is m², and any text that cannot be parsed becomes None.
+    """
+    return {
+        'url': clean_text(record.get('url')),
+        'region': clean_text(record.get('region')),
+        'product_number': parse_count(record.get('product_number')),
+        'room_name': clean_text(record.get('room_name')),
+        'owner_name': clean_text(record.get('owner_name')),
+        'tipe_kos': clean_text(record.get('tipe_kos')),
+        'location': clean_text(record.get('location')),
+        'price_idr': parse_idr(record.get('price')),
+        'price_before_discount_idr': parse_idr(record.get('price_before_discount_bs')),
+        'deposit_idr': parse_idr(record.get('deposit_amount_bs')),
+        'discount_text': clean_text(record.get('discount_amount')),
+        'room_size': clean_text(record.get('room_size')),
+        'room_area_m2': parse_area_m2(record.get('room_size')),
+        'rooms_available': parse_rooms_available(record.get('room_availability_bs')),
+        'rating': parse_decimal(record.get('rating')),
+        'rating_count': parse_count(record.get('rating_count')),
+        'transaction_count': parse_count(record.get('transaction_count')),
+        'electricity_included': parse_electricity(record.get('is_electricity_included')),
+        'electricity_text': clean_text(record.get('is_electricity_included')),
+        'facilities': parse_facilities(record.get('all_facilities_bs')),
+        'listing_status': clean_text(record.get('listing_status')),
+        'scraped_at': parse_timestamp(record.get('scraped_at')),
+        'delisted_at': parse_timestamp(record.get('delisted_at')),
+        'page_title': clean_text(record.get('page_title')),
+    }
+
+
+def parquet_schema(pa):
+    """The fixed Arrow schema for normalised records (pa is the imported pyarrow module)"""
+    return pa.schema([
+        ('url', pa.string()),
+        ('region', pa.string()),
+        ('product_number', pa.int32()),
+        ('room_name', pa.string()),
+        ('owner_name', pa.string()),
+        ('tipe_kos', pa.string()),
+        ('location', pa.string()),
+        ('price_idr', pa.int64()),
+        ('price_before_discount_idr', pa.int64()),
+        ('deposit_idr', pa.int64()),
+        ('discount_text', pa.string()),
+        ('room_size', pa.string()),
+        ('room_area_m2', pa.float64()),
+        ('rooms_available', pa.int32()),
+        ('rating', pa.float64()),
+        ('rating_count', pa.int32()),
+        ('transaction_count', pa.int32()),
+        ('electricity_included', pa.bool_()),
+        ('electricity_text', pa.string()),
+        ('facilities', pa.list_(pa.string())),
+        ('listing_status', pa.string()),
+        ('scraped_at', pa.timestamp('s', tz='UTC')),
+        ('delisted_at', pa.timestamp('s', tz='UTC')),
+        ('page_title', pa.string()),
+    ])
+
+
+class ParquetRecordWriter:
+    """
+    Write normalised product records to a Parquet file as they arrive.
+
+    Records are buffered and written out as one row group every row_group_size
+    records, so memory stays bounded however long the run is. Parquet dictionary-encodes
+    repeated strings (regions, kos types, facility names) and the file is zstd
+    compressed. Needs pyarrow (`pip install pyarrow`).
+    """
+
+    def __init__(self, path, row_group_size=1000):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as e: # Optional dependency, only needed for Parquet output
+            raise RuntimeError("Parquet output needs pyarrow: pip install pyarrow") from e
+        self._pa = pa
+        self.path = path
+        self.row_group_size = max(1, row_group_size)
+        self.schema = parquet_schema(pa)
+        self._writer = pq.ParquetWriter(str(path), self.schema, compression='zstd')
+        self._rows = []
+        self.rows_written = 0
+
+    def write(self, record):
+        """Buffer one scraped record; a full buffer is written as a row group"""
+        self._rows.append(normalise_record(record))
+        if len(self._rows) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Write the buffered records as one row group"""
+        if not self._rows:
+            return
+        table = self._pa.Table.from_pylist(self._rows, schema=self.schema)
+        self._writer.write_table(table, row_group_size=len(self._rows))
+        self.rows_written += len(self._rows)
+        self._rows = []
+
+    def close(self):
+        """Write any buffered records and finish the file (it is unreadable until closed)"""
+        self.flush()
+        self._writer.close()
+
+
+class JsonlRecordWriter:
+    """Append each record as one JSON line (raw record, same keys as save_data_to_json)."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', encoding='utf-8')
+        self.rows_written = 0
+
+    def write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush() # A crash loses at most the record being written
+        self.rows_written += 1
+
+    def close(self):
+        self._file.close()
+
+
+class CsvRecordWriter:
+    """
+    Append each record as one CSV row, with lists joined by "; " like save_data_to_csv.
+    Columns are CSV_COLUMNS plus any other keys of the first record; keys that first
+    appear in later records are left out.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'w', newline='', encoding='utf-8')
+        self._writer = None
+        self.rows_written = 0
+
+    def write(self, record):
+        if self._writer is None:
+            columns = CSV_COLUMNS + [key for key in record if key not in CSV_COLUMNS]
+            self._writer = csv.DictWriter(self._file, fieldnames=columns, extrasaction='ignore')
+            self._writer.writeheader()
+        self._writer.writerow({key: "; ".join(map(str, value)) if isinstance(value, list) else value
+                               for key, value in record.items()})
+        self._file.flush()
+        self.rows_written += 1
+
+    def close(self):
+        self._file.close()
+
+
+# Typed listing columns stored by SqliteRecordStore, in normalise_record() names
+SQLITE_LISTING_COLUMNS = [
+    'url', 'region', 'room_name', 'owner_name', 'tipe_kos', 'location', 'price_idr',
+    'price_before_discount_idr', 'deposit_idr', 'discount_text', 'room_size', 'room_area_m2',
+    'rooms_available', 'rating', 'rating_count', 'transaction_count', 'electricity_included',
+    'listing_status', 'scraped_at', 'delisted_at', 'page_title',
+]
+
+
+class SqliteRecordStore:
+    """
+    Upsert product records into a SQLite database keyed by canonical URL.
+
+    - listings: one row per canonical URL with the typed columns of normalise_record(),
+      the raw record as JSON and the first time the listing was seen. A later scrape of
+      the same listing (another region, a re-run) updates the row instead of adding one.
+    - facilities: (canonical_url, facility) pairs, replaced on every upsert.
+    - scrape_history: one row per stored record (time, price, rating, status), so price
+      and availability changes can be followed over runs.
+
+    The database runs in WAL mode and records are committed in batches of batch_size,
+    so a crash loses at most the last unfinished batch.
+    """
+
+    def __init__(self, path, batch_size=50):
+        self.path = path
+        self.batch_size = max(1, batch_size)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        typed_columns = ", ".join(SQLITE_LISTING_COLUMNS)
+        self._db.executescript(f"""
+            CREATE TABLE IF NOT EXISTS listings (
+                canonical_url TEXT PRIMARY KEY, {typed_columns},
+                first_seen_at TEXT, record_json TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS listings_region ON listings (region);
+            CREATE INDEX IF NOT EXISTS listings_price ON listings (price_idr);
+            CREATE TABLE IF NOT EXISTS facilities (
+                canonical_url TEXT NOT NULL, facility TEXT NOT NULL,
+                PRIMARY KEY (canonical_url, facility));
+            CREATE INDEX IF NOT EXISTS facilities_facility ON facilities (facility);
+            CREATE TABLE IF NOT EXISTS scrape_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, canonical_url TEXT NOT NULL, scraped_at TEXT,
+                region TEXT, price_idr INTEGER, rating REAL, rooms_available INTEGER, listing_status TEXT);
+            CREATE INDEX IF NOT EXISTS scrape_history_url ON scrape_history (canonical_url, scraped_at);
+        """)
+        placeholders = ", ".join("?" for _ in SQLITE_LISTING_COLUMNS)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in SQLITE_LISTING_COLUMNS)
+        self._upsert_sql = (
+            f"INSERT INTO listings (canonical_url, {typed_columns}, first_seen_at, record_json)"
+            f" VALUES (?, {placeholders}, ?, ?)"
+            f" ON CONFLICT(canonical_url) DO UPDATE SET {updates}, record_json = excluded.record_json"
+        )
+        self._pending = 0
+        self.rows_written = 0
+
+    def write(self, record):
+        """Upsert one scraped record; every batch_size records are committed together"""
+        row = normalise_record(record)
+        if not row['url']:
+            return
+        key = canonicalize_url(row['url'])
+        scraped_at = row['scraped_at'].isoformat() if row['scraped_at'] else None
+        values = [row[column] for column in SQLITE_LISTING_COLUMNS]
+        for i, column in enumerate(SQLITE_LISTING_COLUMNS):
+            if isinstance(values[i], datetime):
+                values[i] = values[i].isoformat()
+        self._db.execute(self._upsert_sql, [key] + values + [scraped_at, json.dumps(record, ensure_ascii=False)])
+        self._db.execute("DELETE FROM facilities WHERE canonical_url = ?", (key,))
+        self._db.executemany("INSERT OR IGNORE INTO facilities (canonical_url, facility) VALUES (?, ?)",
+                             [(key, facility) for facility in row['facilities']])
+        self._db.execute(
+            "INSERT INTO scrape_history (canonical_url, scraped_at, region, price_idr, rating, rooms_available, listing_status)"
+            " VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (key, scraped_at, row['region'], row['price_idr'], row['rating'], row['rooms_available'], row['listing_status']))
+        self.rows_written += 1
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Commit the records written since the last commit"""
+        self._db.commit()
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._db.close()
+
+
+def open_record_writer(path, row_group_size=1000):
+    """Streaming writer for `path`, picked by extension: .jsonl, .csv, .parquet or .sqlite/.db"""
+    suffix = Path(path).suffix.lower()
+    if suffix == '.jsonl':
+        return JsonlRecordWriter(path)
+    if suffix == '.csv':
+        return CsvRecordWriter(path)
+    if suffix == '.parquet':
+        return ParquetRecordWriter(path, row_group_size=row_group_size)
+    if suffix in ('.sqlite', '.db'):
+        return SqliteRecordStore(path)
+    raise ValueError(f"Unsupported output format '{suffix}' (use .jsonl, .csv, .parquet or .sqlite)")
@@ -0,0 +1,1246 @@
+"""
+Shared helpers for the Mamikos scraping scripts.
+
+The scraper scripts have spaces in their file names, so reusable pieces (rate
+limiting, browser session management, URL canonicalisation and seen-URL indexes, page
+waits, progress journals, page corpora and caches, local test servers for pages and
+recorded API responses, retry scheduling) live here as a plain importable module.
+"""
+import asyncio
+import contextlib
+import functools
+import gzip
+import hashlib
+import heapq
+import importlib.util
+import json
+import logging
+import math
+import os
+import queue
+import random
+import re
+import sqlite3
+import struct
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlparse, urlunparse
+
+from selenium.common.exceptions import JavascriptException, StaleElementReferenceException, TimeoutException
+
+
+def load_script(file_name, module_name):
+    """
+    Import one of the scraper scripts next to this module by file name (their names
+    contain spaces, so a plain import does not work). The module is registered in
+    sys.modules under module_name, which lets process pools pickle its functions.
+    """
+    path = Path(__file__).with_name(file_name)
+    spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+def configure_logging(level="INFO"):
+    """
+    Send the scripts' "mamikos.*" loggers to stdout as bare messages, so they read like
+    the rest of the console output. DEBUG adds per-field and per-selector diagnostics.
+    """
+    logger = logging.getLogger("mamikos")
+    if not logger.handlers:
+        handler = logging.StreamHandler(sys.stdout)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+# Query parameters that only say where a click came from, never which listing it is
+TRACKING_QUERY_PARAMS = {
+    "fbclid", "gclid", "gbraid", "wbraid", "dclid", "msclkid", "ttclid", "twclid", "yclid", "igshid", "mc_cid",
+    "mc_eid", "_ga", "_gl", "ref", "ref_src", "referrer", "source", "from", "redirection_source", "redirect_source",
+    "trackingid", "tracking_id",
+}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url):
+    """
+    One spelling per listing URL, shared by the link scraper, the data scraper and the stores.
+
+    - Scheme and host are lower-cased, "www." is dropped and default ports are removed.
+    - Mamikos hosts ("m." mobile host included) become https://mamikos.com, and their paths are lower-cased.
+    - Percent-escapes are normalised, repeated slashes are collapsed, and the trailing slash and #fragment are dropped.
+    - utm_* and other tracking parameters (TRACKING_QUERY_PARAMS) are removed and the remaining parameters are sorted.
+    - Listing pages (/room/<slug>) lose their query string entirely: nothing in it identifies the listing.
+
+    >>> canonicalize_url("http://www.Mamikos.com/room/Kos-Melati-Tipe-A/?utm_source=x&redirection_source=list#top")
+    'https://mamikos.com/room/kos-melati-tipe-a'
+    >>> canonicalize_url("http://127.0.0.1:8000/cari//page.html?b=2&a=1&fbclid=z")
+    'http://127.0.0.1:8000/cari/page.html?a=1&b=2'
+    """
+    url = (url or '').strip()
+    if not url:
+        return ''
+    if '://' not in url and not url.startswith('/'):
+        url = '//' + url # "mamikos.com/room/..." without a scheme
+    parsed = urlparse(url)
+    scheme = parsed.scheme.lower() or 'https'
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    is_mamikos = host == 'mamikos.com' or host.endswith('.mamikos.com')
+    if host == 'm.mamikos.com':
+        host = 'mamikos.com'
+    try:
+        port = parsed.port
+    except ValueError:
+        port = None
+    if port and port != _DEFAULT_PORTS.get(scheme) and not is_mamikos:
+        host = f"{host}:{port}"
+    path = re.sub(r'/{2,}', '/', quote(unquote(parsed.path), safe="/:@!$&'()*+,;=-._~"))
+    if is_mamikos:
+        scheme = 'https'
+        path = path.lower()
+    path = path.rstrip('/') or '/'
+    query = ''
+    if not (is_mamikos and path.startswith('/room/')):
+        params = [(key, value) for key, value in parse_qsl(parsed.query, keep_blank_values=True)
+                  if not key.lower().startswith('utm_') and key.lower() not in TRACKING_QUERY_PARAMS]
+        query = urlencode(sorted(params))
+    return urlunparse((scheme, host, path, '', query, ''))
+
+class HostRateLimiter:
+    """
+    Thread-safe request-rate cap shared by every worker session.
+
+    Each host gets its own schedule of request slots spaced 1 / max_requests_per_second
+    apart, so adding more workers never increases the load put on a single site.
+    """
+
+    def __init__(self, max_requests_per_second=0.5):
+        self.min_interval = 1.0 / max_requests_per_second if max_requests_per_second else 0.0
+        self._next_slot = {} # host -> monotonic time of the next free request slot
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """Block the calling worker until it is allowed to request `url`."""
+        if not self.min_interval:
+            return 0.0
+
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+
+class AsyncTokenBucket:
+    """
+    Token-bucket rate limiter for asyncio code: `rate` requests per second on
+    average, with bursts of up to `burst` requests after an idle period.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = None # Created lazily so the bucket can be built outside a running loop
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        if not self.rate:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock: # Waiters queue up in arrival order
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _QuietRequestHandler(SimpleHTTPRequestHandler):
+    """Static file handler that does not print a log line for every request."""
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fixture_server(directory, host="127.0.0.1", port=0):
+    """
+    Serve a directory of saved listing pages over HTTP in a background thread.
+
+    Useful for pointing the scrapers at local copies of Mamikos pages instead of
+    the live site (e.g. a CSV of http://127.0.0.1:<port>/<page>.html URLs).
+
+    Args:
+        directory (str | Path): Folder containing the saved HTML files.
+        host (str): Interface to bind to.
+        port (int): Port to bind to; 0 picks a free port.
+
+    Returns:
+        tuple: (server, base_url). Call server.shutdown() when done.
+    """
+    handler = functools.partial(_QuietRequestHandler, directory=str(directory))
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}"
+    return server, base_url
+
+
+# Query/body keys that page through a JSON listing endpoint, by paging style
+PAGE_OFFSET_KEYS = ("offset", "skip", "start")
+PAGE_NUMBER_KEYS = ("page", "page_number")
+PAGE_LIMIT_KEYS = ("limit", "per_page", "page_size", "size", "take")
+
+
+def find_page_param(payload, keys):
+    """
+    Find the first of `keys` in a (possibly nested) JSON object.
+
+    Returns:
+        tuple: (containing dict, key) so the caller can read or overwrite the value,
+        or (None, None) if none of the keys is present.
+    """
+    if isinstance(payload, dict):
+        for key in keys:
+            if key in payload:
+                return payload, key
+        for value in payload.values():
+            container, key = find_page_param(value, keys)
+            if container is not None:
+                return container, key
+    elif isinstance(payload, list):
+        for value in payload:
+            container, key = find_page_param(value, keys)
+            if container is not None:
+                return container, key
+    return None, None
+
+
+class _RecordedApiHandler(_QuietRequestHandler):
+    """
+    Answers every GET/POST with a recorded JSON response picked by its paging
+    parameter: `offset=40` is served from offset_40.json, `page=3` from page_3.json.
+    Pages that were not recorded get `{}`, which reads as "no more results".
+    """
+
+    def _respond(self, body):
+        params = dict(parse_qsl(urlparse(self.path).query))
+        if body:
+            try:
+                params.update(json.loads(body))
+            except (ValueError, TypeError):
+                params.update(parse_qsl(body.decode('utf-8', 'replace')))
+        payload = b"{}"
+        container, key = find_page_param(params, PAGE_OFFSET_KEYS + PAGE_NUMBER_KEYS)
+        if container is not None:
+            recorded = Path(self.directory) / f"{key}_{container[key]}.json"
+            if recorded.is_file():
+                payload = recorded.read_bytes()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        self._respond(b"")
+
+    def do_POST(self):
+        self._respond(self.rfile.read(int(self.headers.get("Content-Length") or 0)))
+
+
+def start_recorded_api_server(directory, host="127.0.0.1", port=0):
+    """
+    Serve JSON responses recorded from the search results endpoint (see
+    --record-api in the link scraper) so API pagination can be tested offline.
+
+    Args:
+        directory (str | Path): Folder with offset_<n>.json / page_<n>.json files.
+        host (str): Interface to bind to.
+        port (int): Port to bind to; 0 picks a free port.
+
+    Returns:
+        tuple: (server, base_url). Any path under base_url answers; call server.shutdown() when done.
+    """
+    handler = functools.partial(_RecordedApiHandler, directory=str(directory))
+    server = ThreadingHTTPServer((host, port), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://{host}:{server.server_address[1]}"
+    return server, base_url
+
+
+class ScrapeJournal:
+    """
+    Append-only JSONL progress journal: one line per finished product page.
+
+    Each line is {"source_url": <URL from the CSV>, "record": <product data>}. Lines are
+    flushed to the OS immediately but only fsync'ed every `fsync_every` records or
+    `fsync_interval` seconds, so a crash can lose at most that last small batch.
+
+    Without resume, a non-empty journal from an earlier run is renamed to
+    `<name>.bak` (replacing an older backup) instead of being overwritten, so
+    rerunning a crashed command without --resume does not lose its progress.
+    """
+
+    def __init__(self, path, resume=False, fsync_every=25, fsync_interval=5.0):
+        self.path = Path(path)
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.backup_path = None
+        has_entries = self.path.exists() and self.path.stat().st_size > 0
+        if has_entries and not resume:
+            self.backup_path = self.path.with_name(self.path.name + ".bak")
+            self.path.replace(self.backup_path)
+        torn_tail = resume and has_entries and not self._ends_with_newline(self.path)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if torn_tail:
+            self._file.write("\n") # Keep the next record off the half-written line left by a crash
+        self._pending = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ends_with_newline(path):
+        with open(path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    @staticmethod
+    def load(path):
+        """Return {source_url: record} for every complete line in an existing journal."""
+        entries = {}
+        path = Path(path)
+        if not path.exists():
+            return entries
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue # A torn last line from a crash mid-write; that URL is simply redone
+                entries[entry['source_url']] = entry['record']
+        return entries
+
+    def append(self, source_url, record):
+        """Journal one finished product."""
+        line = json.dumps({"source_url": source_url, "record": record}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            self._pending += 1
+            if self._pending >= self.fsync_every or time.monotonic() - self._last_sync >= self.fsync_interval:
+                self._sync()
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._pending = 0
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Flush any unsynced records and close the journal file."""
+        with self._lock:
+            if self._file.closed:
+                return
+            if self._pending:
+                self._sync()
+            self._file.close()
+
+
+class RetryScheduler:
+    """
+    Second chances for product pages that failed during a run.
+
+    The caller classifies each failure (e.g. "timeout", "driver_crash", "missing_fields",
+    "http_error") and hands retriable ones to schedule(). Each URL is tried up to
+    max_attempts times in total. Before attempt n + 1 it waits a jittered exponential
+    backoff: base_delay * 2 ** (n - 1), capped at max_delay and scaled by a random factor
+    between 0.5 and 1. Retries run at the end of the run through iter_due(), so most of
+    the backoff has usually passed by then. Permanent failures go to dead_letter(), which
+    appends one JSON line per URL to dead_letter_path (if set; earlier runs' entries are
+    kept). load_dead_letters() reads that file back in, so a later run can scrape just
+    those URLs.
+    """
+
+    def __init__(self, max_attempts=3, base_delay=10.0, max_delay=300.0, dead_letter_path=None):
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.dead_letter_path = Path(dead_letter_path) if dead_letter_path else None
+        self._lock = threading.Lock()
+        self._pending = [] # heap of (due monotonic time, sequence, item)
+        self._sequence = 0
+        self._attempts = {} # url -> failed attempts so far
+        self._dead_letter_file = None
+        self.retries_by_kind = Counter()
+        self.dead_by_kind = Counter()
+        self.recovered = 0
+
+    def backoff(self, failed_attempts):
+        """Seconds to wait before the next attempt of a URL that has failed `failed_attempts` times"""
+        return min(self.max_delay, self.base_delay * 2 ** (failed_attempts - 1)) * random.uniform(0.5, 1.0)
+
+    def attempts(self, url):
+        with self._lock:
+            return self._attempts.get(url, 0)
+
+    def schedule(self, url, kind, error, **context):
+        """
+        Count a failed attempt and queue the URL for another one. Returns False (nothing
+        queued) once max_attempts is used up; the caller then dead-letters it.
+        """
+        with self._lock:
+            failed = self._attempts.get(url, 0) + 1
+            self._attempts[url] = failed
+            if failed >= self.max_attempts:
+                return False
+            self._sequence += 1
+            item = dict(context, url=url, kind=kind, error=f"{type(error).__name__}: {error}", attempts=failed)
+            heapq.heappush(self._pending, (time.monotonic() + self.backoff(failed), self._sequence, item))
+            self.retries_by_kind[kind] += 1
+            return True
+
+    def __len__(self):
+        with self._lock:
+            return len(self._pending)
+
+    def iter_due(self):
+        """Yield queued items in due order, sleeping until each one's backoff has passed. Items scheduled meanwhile are included."""
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return
+                due, _, item = heapq.heappop(self._pending)
+            time.sleep(max(0.0, due - time.monotonic()))
+            yield item
+
+    def succeeded(self, url):
+        """Record a successful attempt (counted as recovered if the URL had failed before)"""
+        with self._lock:
+            if self._attempts.pop(url, 0):
+                self.recovered += 1
+
+    def dead_letter(self, url, kind, error, **context):
+        """Give up on a URL: keep it in the dead-letter file with the reason and attempt count"""
+        with self._lock:
+            self.dead_by_kind[kind] += 1
+            entry = dict(context, url=url, kind=kind, error=f"{type(error).__name__}: {error}",
+                         attempts=max(1, self._attempts.pop(url, 0)), failed_at=time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()))
+            if self.dead_letter_path is None:
+                return entry
+            if self._dead_letter_file is None:
+                self.dead_letter_path.parent.mkdir(parents=True, exist_ok=True)
+                self._dead_letter_file = open(self.dead_letter_path, 'a', encoding='utf-8') # Keep earlier runs' entries
+            self._dead_letter_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self._dead_letter_file.flush()
+            return entry
+
+    @staticmethod
+    def load_dead_letters(path):
+        """Every entry of a dead-letter file, in the order the URLs failed"""
+        with open(path, 'r', encoding='utf-8') as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def print_summary(self):
+        if not (self.retries_by_kind or self.dead_by_kind):
+            return
+        retried = ", ".join(f"{kind} {count}" for kind, count in self.retries_by_kind.most_common()) or "none"
+        print(f"\n↻ Retries: {retried}; {self.recovered} URL(s) recovered.")
+        if self.dead_by_kind:
+            dead = ", ".join(f"{kind} {count}" for kind, count in self.dead_by_kind.most_common())
+            where = f" in '{self.dead_letter_path}'" if self.dead_letter_path else ""
+            print(f"☠️ {sum(self.dead_by_kind.values())} URL(s) gave up ({dead}){where}.")
+
+    def close(self):
+        with self._lock:
+            if self._dead_letter_file is not None:
+                self._dead_letter_file.close()
+                self._dead_letter_file = None
+
+
+class PageCorpus:
+    """
+    On-disk corpus of raw pages for offline benchmarking and regression checks.
+
+    Layout:
+        <directory>/listing/<key>.html   product detail pages
+        <directory>/search/<key>.html    search result pages
+        <directory>/index.jsonl          one {"kind", "url", "file", "fetched_at"} line per saved page
+    """
+
+    KINDS = ("listing", "search")
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        for kind in self.KINDS:
+            (self.directory / kind).mkdir(parents=True, exist_ok=True)
+        self.index_path = self.directory / "index.jsonl"
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(url):
+        """Stable file name stem for a URL."""
+        return hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+
+    def save(self, kind, url, html_content):
+        """Store one page, replacing any earlier copy of the same URL."""
+        relative = f"{kind}/{self.key_for(url)}.html"
+        entry = {"kind": kind, "url": url, "file": relative, "fetched_at": time.time()}
+        with self._lock:
+            (self.directory / relative).write_text(html_content, encoding='utf-8')
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def entries(self, kind=None):
+        """Latest index entry per URL (optionally only one kind), in first-recorded order."""
+        latest = {}
+        if self.index_path.exists():
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if kind is None or entry["kind"] == kind:
+                        latest[entry["url"]] = entry
+        return list(latest.values())
+
+    def read(self, entry):
+        """HTML of a page returned by entries()."""
+        return (self.directory / entry["file"]).read_text(encoding='utf-8')
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (pct in 0-100); 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class ScrapeMetrics:
+    """
+    Per-URL stage timings for a scraping run.
+
+    Call start_page(url), wrap each step in `with metrics.stage("navigation"):` and end
+    with finish_page(record) or finish_page(error=e). Pages are tracked per thread, so
+    one ScrapeMetrics can be shared by all pool workers. Every finished page is written
+    as one JSON line to `path` (if given): url, status, total seconds, seconds per stage,
+    and the fields that came back missing. summary() and prometheus_text() aggregate
+    the whole run.
+    """
+
+    def __init__(self, path=None, missing_values=("N/A", "Not found")):
+        self.missing_values = missing_values
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._file = open(path, 'w', encoding='utf-8') if path else None
+        self.started = time.time()
+        self.stage_seconds = defaultdict(list)
+        self.page_seconds = []
+        self.pages_ok = 0
+        self.pages_failed = 0
+        self.missing_by_field = Counter()
+        self.errors_by_type = Counter()
+
+    def start_page(self, url):
+        self._local.page = {'url': url, 'stages': defaultdict(float), 'started': time.perf_counter()}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Time one step of the current page; repeated stages on a page add up"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            page = getattr(self._local, 'page', None)
+            if page is not None:
+                page['stages'][name] += time.perf_counter() - started
+
+    def finish_page(self, record=None, error=None):
+        """Close the current page; returns its metrics dict (None if no page was started)"""
+        page = getattr(self._local, 'page', None)
+        if page is None:
+            return None
+        self._local.page = None
+        missing = []
+        if record is not None:
+            missing = sorted(key for key, value in record.items()
+                             if value in self.missing_values or value == [] or value == ["Not found"])
+        entry = {
+            'url': page['url'],
+            'status': 'error' if error is not None else 'ok',
+            'total_seconds': round(time.perf_counter() - page['started'], 4),
+            'stages': {name: round(seconds, 4) for name, seconds in page['stages'].items()},
+            'missing_fields': missing,
+        }
+        if error is not None:
+            entry['error'] = f"{type(error).__name__}: {error}"
+        with self._lock:
+            self.page_seconds.append(entry['total_seconds'])
+            for name, seconds in page['stages'].items():
+                self.stage_seconds[name].append(seconds)
+            if error is not None:
+                self.pages_failed += 1
+                self.errors_by_type[type(error).__name__] += 1
+            else:
+                self.pages_ok += 1
+            self.missing_by_field.update(missing)
+            if self._file is not None:
+                self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                self._file.flush()
+        return entry
+
+    def summary(self):
+        """Run totals: pages, pages/hour, p50/p95/mean per stage, missing fields and error counts"""
+        elapsed = max(time.time() - self.started, 1e-9)
+        pages = self.pages_ok + self.pages_failed
+        return {
+            'pages': pages,
+            'pages_ok': self.pages_ok,
+            'pages_failed': self.pages_failed,
+            'elapsed_seconds': round(elapsed, 1),
+            'pages_per_hour': round(pages * 3600 / elapsed, 1),
+            'stages': {
+                name: {'count': len(values), 'p50': percentile(values, 50), 'p95': percentile(values, 95),
+                       'mean': sum(values) / len(values)}
+                for name, values in sorted(self.stage_seconds.items()) if values
+            },
+            'page_p50': percentile(self.page_seconds, 50),
+            'page_p95': percentile(self.page_seconds, 95),
+            'missing_by_field': dict(self.missing_by_field.most_common()),
+            'errors_by_type': dict(self.errors_by_type.most_common()),
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\n📈 {summary['pages']} page(s) ({summary['pages_failed']} failed) in {summary['elapsed_seconds'] / 60:.1f} min "
+              f"= {summary['pages_per_hour']:.0f} pages/hour; per page p50 {summary['page_p50']:.2f}s, p95 {summary['page_p95']:.2f}s")
+        print(f"  {'Stage':<22}{'Count':>7}{'p50 s':>9}{'p95 s':>9}{'Mean s':>9}")
+        for name, stats in summary['stages'].items():
+            print(f"  {name:<22}{stats['count']:>7}{stats['p50']:>9.3f}{stats['p95']:>9.3f}{stats['mean']:>9.3f}")
+        if summary['missing_by_field']:
+            print("  Missing fields: " + ", ".join(f"{field} {count}" for field, count in summary['missing_by_field'].items()))
+        if summary['errors_by_type']:
+            print("  Errors: " + ", ".join(f"{name} {count}" for name, count in summary['errors_by_type'].items()))
+
+    def prometheus_text(self, prefix="mamikos"):
+        """The run summary in the Prometheus text exposition format"""
+        summary = self.summary()
+        lines = [
+            f"# HELP {prefix}_stage_seconds Time spent in each scraping stage per page.",
+            f"# TYPE {prefix}_stage_seconds summary",
+        ]
+        for name, values in sorted(self.stage_seconds.items()):
+            lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="0.5"}} {percentile(values, 50):.6f}')
+            lines.append(f'{prefix}_stage_seconds{{stage="{name}",quantile="0.95"}} {percentile(values, 95):.6f}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {sum(values):.6f}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {len(values)}')
+        lines += [
+            f"# HELP {prefix}_pages_total Pages finished, by outcome.",
+            f"# TYPE {prefix}_pages_total counter",
+            f'{prefix}_pages_total{{status="ok"}} {summary["pages_ok"]}',
+            f'{prefix}_pages_total{{status="error"}} {summary["pages_failed"]}',
+            f"# HELP {prefix}_pages_per_hour Throughput over the run so far.",
+            f"# TYPE {prefix}_pages_per_hour gauge",
+            f"{prefix}_pages_per_hour {summary['pages_per_hour']}",
+            f"# HELP {prefix}_field_missing_total Pages on which a field came back missing.",
+            f"# TYPE {prefix}_field_missing_total counter",
+        ]
+        lines += [f'{prefix}_field_missing_total{{field="{field}"}} {count}' for field, count in summary['missing_by_field'].items()]
+        lines += [f"# HELP {prefix}_errors_total Failed pages, by exception type.", f"# TYPE {prefix}_errors_total counter"]
+        lines += [f'{prefix}_errors_total{{type="{name}"}} {count}' for name, count in summary['errors_by_type'].items()]
+        return "\n".join(lines) + "\n"
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+# URL patterns (Network.setBlockedURLs wildcards) blocked by ResourcePolicy, by category.
+# The extractors only read the DOM: even the electricity check reads an <img> alt, not its bytes.
+RESOURCE_BLOCK_PATTERNS = {
+    "images": ("*.png", "*.png?*", "*.jpg", "*.jpg?*", "*.jpeg", "*.jpeg?*", "*.gif", "*.gif?*",
+               "*.webp", "*.webp?*", "*.svg", "*.svg?*", "*.ico", "*.avif", "*.avif?*"),
+    "media": ("*.mp4", "*.mp4?*", "*.webm", "*.webm?*", "*.m3u8", "*.mp3", "*.ogg"),
+    "fonts": ("*.woff", "*.woff?*", "*.woff2", "*.woff2?*", "*.ttf", "*.ttf?*", "*.otf", "*.eot",
+              "*fonts.googleapis.com*", "*fonts.gstatic.com*"),
+    "maps": ("*maps.googleapis.com*", "*maps.gstatic.com*", "*tile.openstreetmap.org*", "*api.mapbox.com*"),
+    "analytics": ("*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*",
+                  "*googlesyndication.com*", "*googleadservices.com*", "*connect.facebook.net*",
+                  "*hotjar.com*", "*clarity.ms*", "*analytics.tiktok.com*", "*moengage.com*",
+                  "*sentry.io*", "*newrelic.com*", "*nr-data.net*"),
+}
+
+
+class ResourcePolicy:
+    """
+    Which sub-resources Chrome may download while rendering a listing page.
+
+    By default every category in RESOURCE_BLOCK_PATTERNS is blocked. `deny` adds more
+    URL patterns, and `allow` takes patterns or whole categories back out; allowing a
+    pattern also allows its query-string variant. For example, allow=("fonts",) keeps
+    fonts, and allow=("*.svg",) keeps SVG icons, "icon.svg?v=2" included. apply_to_options()
+    also switches Chrome to the "eager" page-load strategy, so driver.get() returns at
+    DOMContentLoaded instead of waiting for every sub-resource.
+    """
+
+    def __init__(self, block=tuple(RESOURCE_BLOCK_PATTERNS), deny=(), allow=()):
+        allow = set(allow)
+        allow.update(f"{pattern}?*" for pattern in list(allow) if pattern.startswith("*.")) # "*.svg" -> also "*.svg?*"
+        self.categories = [category for category in block if category not in allow]
+        patterns = [pattern for category in self.categories for pattern in RESOURCE_BLOCK_PATTERNS[category]]
+        self.patterns = [pattern for pattern in dict.fromkeys(patterns + list(deny)) if pattern not in allow]
+        # Chrome's patterns only know the '*' wildcard; everything else matches literally
+        self._regex = re.compile("|".join(re.escape(pattern).replace(r"\*", ".*") for pattern in self.patterns) or "(?!)")
+
+    def is_blocked(self, url):
+        """Whether Chrome would refuse to load `url` under this policy"""
+        return self._regex.fullmatch(url) is not None
+
+    def apply_to_options(self, chrome_options):
+        chrome_options.page_load_strategy = "eager"
+        if all(pattern in self.patterns for pattern in RESOURCE_BLOCK_PATTERNS["images"]):
+            # Also catches images the patterns cannot see (no extension in the URL); skipped if any image type is allowed
+            chrome_options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+
+    def apply_to_driver(self, driver):
+        """Install the URL blocklist in a running Chrome session (it applies to every later navigation)"""
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": self.patterns})
+
+class DriverManager:
+    """
+    Lifecycle of the Chrome sessions used by one scraping run.
+
+    `factory()` launches one new WebDriver session. The manager keeps `warm_sessions`
+    spare sessions launched in the background, so acquire() usually returns at once
+    instead of waiting several seconds for Chrome to start. Sessions are checked with a
+    cheap WebDriver call before they are handed out. After `recycle_after_pages` pages
+    (0 = never) page_done() asks for the session to be recycled, which caps Chrome's
+    memory growth. replace() swaps a crashed session for a warm one; the old session
+    is quit in the background. One manager can be shared by all pool workers. It only
+    deals with browser sessions; results stay on the scrapers.
+    """
+
+    def __init__(self, factory, warm_sessions=0, recycle_after_pages=0):
+        self.factory = factory
+        self.warm_sessions = max(0, warm_sessions)
+        self.recycle_after_pages = max(0, recycle_after_pages)
+        self._warm = queue.Queue() # Launched, idle sessions; None marks a failed background launch
+        self._lock = threading.Lock()
+        self._starting = 0 # Background launches in flight
+        self._pages = {} # id(driver) -> pages loaded in that session
+        self._closed = False
+        self.start_seconds = [] # Launch latency of every session started
+        self.failed_starts = 0
+        self.restarts = 0 # Crashed sessions replaced
+        self.recycles = 0 # Sessions retired after recycle_after_pages pages
+        self.warm_hits = 0 # acquire() calls served by an already running spare
+        self.cold_starts = 0 # acquire() calls that had to wait for a launch
+
+    def _launch(self):
+        started = time.perf_counter()
+        try:
+            driver = self.factory()
+        except Exception:
+            with self._lock:
+                self.failed_starts += 1
+            raise
+        with self._lock:
+            self.start_seconds.append(time.perf_counter() - started)
+        return driver
+
+    def _launch_in_background(self):
+        try:
+            driver = self._launch()
+        except Exception as e:
+            print(f"⚠️ Background browser launch failed: {e}")
+            driver = None
+        with self._lock:
+            self._starting -= 1
+            closed = self._closed
+        if closed and driver is not None:
+            self._quit(driver)
+        else:
+            self._warm.put(driver)
+
+    def _top_up(self):
+        """Start background launches until warm_sessions spares are ready or on their way"""
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.warm_sessions - self._warm.qsize() - self._starting
+            self._starting += max(0, missing)
+        for _ in range(missing):
+            threading.Thread(target=self._launch_in_background, daemon=True).start()
+
+    @staticmethod
+    def _is_healthy(driver):
+        try:
+            driver.current_url
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except Exception:
+            pass # A crashed session may not answer any more
+
+    def _discard(self, driver):
+        """Forget a session and quit it in the background (quitting a dead Chrome can hang)"""
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        threading.Thread(target=self._quit, args=(driver,), daemon=True).start()
+
+    def acquire(self):
+        """A healthy session: a warm spare if one is ready, otherwise a newly launched one"""
+        while True:
+            try:
+                driver = self._warm.get_nowait()
+                warm = True
+            except queue.Empty:
+                with self._lock:
+                    starting = self._starting
+                driver = self._warm.get() if starting else None # Wait for a launch already in flight
+                warm = False
+            if driver is None:
+                driver = self._launch()
+            elif not self._is_healthy(driver):
+                self._discard(driver)
+                continue
+            with self._lock:
+                if warm:
+                    self.warm_hits += 1
+                else:
+                    self.cold_starts += 1
+                self._pages[id(driver)] = 0
+            self._top_up()
+            return driver
+
+    def page_done(self, driver):
+        """Count one page loaded by `driver`; True once the session is due for recycling"""
+        with self._lock:
+            pages = self._pages.get(id(driver), 0) + 1
+            self._pages[id(driver)] = pages
+        return bool(self.recycle_after_pages) and pages >= self.recycle_after_pages
+
+    def recycle(self, driver):
+        """Retire a session that has loaded enough pages and return a fresh one"""
+        with self._lock:
+            self.recycles += 1
+        self._discard(driver)
+        return self.acquire()
+
+    def replace(self, driver):
+        """Swap a crashed (or missing) session for a healthy one"""
+        with self._lock:
+            self.restarts += 1
+        if driver is not None:
+            self._discard(driver)
+        return self.acquire()
+
+    def release(self, driver):
+        """Quit a session that is no longer needed (e.g. at the end of a worker's run)"""
+        with self._lock:
+            self._pages.pop(id(driver), None)
+        self._quit(driver)
+
+    def summary(self):
+        return {
+            'sessions_started': len(self.start_seconds),
+            'start_p50': percentile(self.start_seconds, 50),
+            'start_max': max(self.start_seconds, default=0.0),
+            'warm_hits': self.warm_hits,
+            'cold_starts': self.cold_starts,
+            'restarts': self.restarts,
+            'recycles': self.recycles,
+            'failed_starts': self.failed_starts,
+        }
+
+    def print_summary(self):
+        summary = self.summary()
+        print(f"\n🌐 Browser sessions: {summary['sessions_started']} started (launch p50 {summary['start_p50']:.1f}s, "
+              f"max {summary['start_max']:.1f}s), {summary['warm_hits']} handed out warm, {summary['cold_starts']} cold; "
+              f"{summary['restarts']} crash restart(s), {summary['recycles']} recycle(s), {summary['failed_starts']} failed launch(es).")
+
+    def close(self):
+        """Quit the idle spares; spares still launching are quit as soon as they are up"""
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                driver = self._warm.get_nowait()
+            except queue.Empty:
+                return
+            if driver is not None:
+                self._quit(driver)
+
+class CachedPage:
+    """One page returned by PageCache.get()."""
+
+    def __init__(self, html, final_url, fetched_at):
+        self.html = html
+        self.final_url = final_url
+        self.fetched_at = fetched_at
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+
+class PageCache:
+    """
+    Disk cache of rendered pages, keyed by URL.
+
+    Page bodies are stored gzip-compressed under blobs/<sha256 of the HTML>.html.gz, so
+    identical pages are only stored once; index.sqlite maps each URL to its blob with
+    the fetch time and last access time. Entries older than ttl_seconds are treated as
+    misses by get(), and once the blobs exceed max_bytes the least recently used URLs
+    are evicted.
+    """
+
+    def __init__(self, directory, ttl_seconds=7 * 24 * 3600, max_bytes=2 * 1024 ** 3):
+        self.directory = Path(directory)
+        self.blob_dir = self.directory / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.directory / "index.sqlite", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " url TEXT PRIMARY KEY, final_url TEXT, content_hash TEXT NOT NULL,"
+            " size INTEGER NOT NULL, fetched_at REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS pages_content_hash ON pages (content_hash)")
+        self._db.commit()
+
+    def _blob_path(self, content_hash):
+        return self.blob_dir / f"{content_hash}.html.gz"
+
+    def get(self, url, ignore_ttl=False):
+        """Return the cached CachedPage for `url`, or None if missing or older than the TTL."""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT final_url, content_hash, fetched_at FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            final_url, content_hash, fetched_at = row
+            if not ignore_ttl and self.ttl_seconds and time.time() - fetched_at > self.ttl_seconds:
+                return None
+            try:
+                html = gzip.decompress(self._blob_path(content_hash).read_bytes()).decode('utf-8')
+            except (OSError, EOFError):
+                self._db.execute("DELETE FROM pages WHERE url = ?", (url,)) # Blob lost or corrupt
+                self._db.commit()
+                return None
+            self._db.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), url))
+            self._db.commit()
+        return CachedPage(html, final_url or url, fetched_at)
+
+    def put(self, url, html, final_url=None):
+        """Store the rendered HTML of `url` and evict old entries if the cache is over size."""
+        raw = html.encode('utf-8')
+        content_hash = hashlib.sha256(raw).hexdigest()
+        blob_path = self._blob_path(content_hash)
+        now = time.time()
+        with self._lock:
+            if not blob_path.exists():
+                temp_path = blob_path.with_name(blob_path.name + ".tmp")
+                temp_path.write_bytes(gzip.compress(raw, compresslevel=6))
+                os.replace(temp_path, blob_path) # Never leave a half-written blob under its final name
+            old = self._db.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            self._db.execute(
+                "INSERT OR REPLACE INTO pages (url, final_url, content_hash, size, fetched_at, last_access)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (url, final_url or url, content_hash, blob_path.stat().st_size, now, now),
+            )
+            if old and old[0] != content_hash:
+                self._drop_blob_if_unused(old[0])
+            self._db.commit()
+            self._evict()
+
+    def urls(self):
+        """Every cached URL."""
+        with self._lock:
+            return [row[0] for row in self._db.execute("SELECT url FROM pages")]
+
+    def _drop_blob_if_unused(self, content_hash):
+        """Delete the blob once no URL points at it; True if it was dropped"""
+        if self._db.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone():
+            return False
+        try:
+            self._blob_path(content_hash).unlink()
+        except FileNotFoundError:
+            pass
+        return True
+
+    def _total_bytes(self):
+        row = self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT content_hash, size FROM pages)"
+        ).fetchone()
+        return row[0]
+
+    def _evict(self):
+        """Drop least recently used URLs until the stored blobs fit in max_bytes."""
+        if not self.max_bytes:
+            return
+        total = self._total_bytes() # Once; each dropped blob is subtracted below
+        while total > self.max_bytes:
+            row = self._db.execute("SELECT url, content_hash, size FROM pages ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._db.execute("DELETE FROM pages WHERE url = ?", (row[0],))
+            if self._drop_blob_if_unused(row[1]): # A blob shared with other URLs still takes up space
+                total -= row[2]
+        self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+# Seen-URL index namespaces: listings collected by the link scraper vs listings scraped by the data scraper
+SEEN_INDEX_STAGES = ("links", "details")
+
+
+class SeenUrlIndex:
+    """
+    Persistent set of canonical listing URLs in a SQLite file.
+
+    Runs that share an index never collect or scrape the same listing twice, across
+    regions and across runs. URLs are canonicalised (canonicalize_url) on the way in,
+    so tracking parameters, "www." or a trailing slash do not make a listing look new.
+
+    Every stage (SEEN_INDEX_STAGES) keeps its own table, so one file can serve the link
+    and the data scraper: URLs the link scraper collected do not count as scraped.
+    Files from before the split keep a single seen_urls table; each stage starts from
+    a copy of it.
+    """
+
+    def __init__(self, path, stage="details"):
+        if stage not in SEEN_INDEX_STAGES:
+            raise ValueError(f"Unknown seen-index stage {stage!r} (expected one of {', '.join(SEEN_INDEX_STAGES)})")
+        self.path = Path(path)
+        self.stage = stage
+        self._table = f"seen_urls_{stage}"
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        tables = {row[0] for row in self._db.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if self._table not in tables:
+            self._db.execute(f"CREATE TABLE {self._table} (canonical_url TEXT PRIMARY KEY, first_seen_at REAL NOT NULL)")
+            if "seen_urls" in tables:
+                self._db.execute(f"INSERT INTO {self._table} SELECT canonical_url, first_seen_at FROM seen_urls")
+        self._db.commit()
+
+    def __contains__(self, url):
+        with self._lock:
+            return self._db.execute(f"SELECT 1 FROM {self._table} WHERE canonical_url = ?",
+                                    (canonicalize_url(url),)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self._table}").fetchone()[0]
+
+    def add_many(self, urls):
+        """Mark URLs as seen; returns how many were new"""
+        now = time.time()
+        with self._lock:
+            before = self._db.total_changes
+            self._db.executemany(f"INSERT OR IGNORE INTO {self._table} (canonical_url, first_seen_at) VALUES (?, ?)",
+                                 [(canonicalize_url(url), now) for url in urls])
+            self._db.commit()
+            return self._db.total_changes - before
+
+    def add(self, url):
+        """Mark one URL as seen; True if it was new"""
+        return self.add_many([url]) == 1
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+class BloomSeenUrlIndex:
+    """
+    SeenUrlIndex for very large runs: a fixed-size Bloom filter kept in memory and saved
+    to `path` every `save_every` new URLs or `save_interval` seconds, and on close(), so
+    a crash loses at most that much. It never forgets a URL it has seen. Its error is in
+    the other direction: about `error_rate` of unseen URLs are reported as seen and
+    skipped, as long as no more than `capacity` URLs are added. The size is fixed when
+    the file is first created (about 1.8 MB per million URLs at 0.1%).
+
+    A filter holds one stage only: the stage is stored in the file, and opening it for
+    another stage raises ValueError (use one .bloom file per stage).
+    """
+
+    _HEADER = struct.Struct("<4sQIQ") # magic, bit count, hash count, URLs added
+    _STAGE = struct.Struct("<16s") # Follows the header in MKB2 files; MKBF files predate stages
+
+    def __init__(self, path, stage="details", capacity=1_000_000, error_rate=0.001, save_every=1000, save_interval=60.0):
+        if stage not in SEEN_INDEX_STAGES:
+            raise ValueError(f"Unknown seen-index stage {stage!r} (expected one of {', '.join(SEEN_INDEX_STAGES)})")
+        self.path = Path(path)
+        self.stage = stage
+        self.save_every = save_every
+        self.save_interval = save_interval
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+        if self.path.exists():
+            data = self.path.read_bytes()
+            magic, self.bit_count, self.hash_count, self.count = self._HEADER.unpack_from(data)
+            if magic not in (b"MKBF", b"MKB2"):
+                raise ValueError(f"{self.path} is not a Bloom filter index")
+            offset = self._HEADER.size
+            if magic == b"MKB2":
+                file_stage = self._STAGE.unpack_from(data, offset)[0].rstrip(b"\0").decode("ascii")
+                if file_stage != stage:
+                    raise ValueError(f"{self.path} holds the {file_stage} stage's URLs; "
+                                     f"give the {stage} stage its own .bloom file")
+                offset += self._STAGE.size
+            self._bits = bytearray(data[offset:])
+        else:
+            self.bit_count = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+            self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+            self.count = 0
+            self._bits = bytearray((self.bit_count + 7) // 8)
+
+    def _positions(self, url):
+        digest = hashlib.blake2b(canonicalize_url(url).encode('utf-8'), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * second) % self.bit_count for i in range(self.hash_count)]
+
+    def __contains__(self, url):
+        with self._lock:
+            return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(url))
+
+    def __len__(self):
+        return self.count
+
+    def add_many(self, urls):
+        """Mark URLs as seen; returns how many looked new"""
+        added = 0
+        with self._lock:
+            for url in urls:
+                new = False
+                for position in self._positions(url):
+                    if not self._bits[position >> 3] & (1 << (position & 7)):
+                        self._bits[position >> 3] |= 1 << (position & 7)
+                        new = True
+                added += new
+            self.count += added
+            self._unsaved += added
+            if self._unsaved and (self._unsaved >= self.save_every or time.monotonic() - self._last_save >= self.save_interval):
+                self._save()
+        return added
+
+    def add(self, url):
+        """Mark one URL as seen; True if it looked new"""
+        return self.add_many([url]) == 1
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        temp_path.write_bytes(self._HEADER.pack(b"MKB2", self.bit_count, self.hash_count, self.count)
+                              + self._STAGE.pack(self.stage.encode("ascii")) + bytes(self._bits))
+        os.replace(temp_path, self.path)
+        self._unsaved = 0
+        self._last_save = time.monotonic()
+
+    def save(self):
+        with self._lock:
+            self._save()
+
+    def close(self):
+        self.save()
+
+
+def open_seen_index(path, stage="details", capacity=1_000_000, error_rate=0.001):
+    """
+    The `stage` ("links" or "details") view of a seen-URL index: a BloomSeenUrlIndex for a
+    .bloom path, otherwise an (exact) SQLite SeenUrlIndex
+    """
+    if Path(path).suffix.lower() == ".bloom":
+        return BloomSeenUrlIndex(path, stage=stage, capacity=capacity, error_rate=error_rate)
+    return SeenUrlIndex(path, stage=stage)
+
+
+# Returns the first selector in arguments[0] that matches an element, or null
+_FIRST_PRESENT_SELECTOR_SCRIPT = """
+for (const selector of arguments[0]) {
+    try {
+        if (document.querySelector(selector)) return selector;
+    } catch (e) {}
+}
+return null;
+"""
+
+
+# Script errors a page raises while it is still navigating or re-rendering; anything
+# else (InvalidSessionIdException, a dead Chrome, ...) means the session is gone
+_TRANSIENT_SCRIPT_ERRORS = (JavascriptException, StaleElementReferenceException, TimeoutException)
+
+
+def wait_for_selectors(driver, preferred, fallback=(), timeout=20, poll_interval=0.25):
+    """
+    Wait for a page by checking all indicator selectors together under one deadline.
+
+    Every poll is a single execute_script call that reports the first present
+    `preferred` selector (in priority order), so the wait ends as soon as any of them
+    appears. If none shows up before the deadline, the first present `fallback`
+    selector (generic ones such as "main" or "body") is reported instead.
+
+    Only transient script errors are retried on the next poll; a crashed or closed
+    session raises straight away instead of waiting out the deadline.
+
+    Returns:
+        tuple: (matched selector or None, elapsed seconds, whether it was a preferred selector)
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    while True:
+        try:
+            matched = driver.execute_script(_FIRST_PRESENT_SELECTOR_SCRIPT, list(preferred))
+        except _TRANSIENT_SCRIPT_ERRORS:
+            matched = None # Page still navigating; try again on the next poll
+        if matched:
+            return matched, time.monotonic() - started, True
+        if time.monotonic() >= deadline:
+            break
+        time.sleep(poll_interval)
+
+    matched = None
+    if fallback:
+        try:
+            matched = driver.execute_script(_FIRST_PRESENT_SELECTOR_SCRIPT, list(fallback))
+        except _TRANSIENT_SCRIPT_ERRORS:
+            pass
+    return matched, time.monotonic() - started, False
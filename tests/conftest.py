@@ -0,0 +1,52 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+FIXTURES = Path(__file__).resolve().parent / "fixtures"
+sys.path.insert(0, str(ROOT))
+
+from mamikos_utils import load_script, start_fixture_server, start_recorded_api_server # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def data_module():
+    return load_script("Mamikos Data Scrapper.py", "mamikos_data_scrapper")
+
+
+@pytest.fixture(scope="session")
+def link_module():
+    return load_script("Mamikos Link Scrapper.py", "mamikos_link_scrapper")
+
+
+@pytest.fixture
+def listing_server():
+    """Base URL of a local server for the saved listing pages in fixtures/listings"""
+    server, base_url = start_fixture_server(FIXTURES / "listings")
+    yield base_url
+    server.shutdown()
+
+
+@pytest.fixture
+def recorded_api():
+    """start(name) serves the recorded search responses in fixtures/api/<name>; returns its base URL"""
+    servers = []
+
+    def start(name):
+        server, base_url = start_recorded_api_server(FIXTURES / "api" / name)
+        servers.append(server)
+        return base_url
+
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def listing_urls(base_url):
+    return [f"{base_url}/{page.name}" for page in sorted((FIXTURES / "listings").glob("*.html"))]
+
+
+def write_url_csv(path, urls):
+    path.write_text("Product_URL\n" + "".join(f"{url}\n" for url in urls), encoding="utf-8")
+    return path
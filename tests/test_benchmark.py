@@ -0,0 +1,49 @@
+"""Corpus replay: both product and search pages are timed."""
+import json
+
+import pytest
+
+from conftest import FIXTURES
+from mamikos_utils import PageCorpus, load_script
+
+SEARCH_PAGE = FIXTURES / "search" / "kost-jakarta-timur.html"
+SEARCH_URL = "https://mamikos.com/cari/jakarta-timur"
+
+
+@pytest.fixture(scope="module")
+def benchmark():
+    return load_script("Mamikos Benchmark.py", "mamikos_benchmark")
+
+
+def test_harvest_cards_matches_the_browser_script(benchmark):
+    driver = benchmark.SoupDriver(SEARCH_PAGE.read_text(encoding="utf-8"), SEARCH_URL)
+    cards = benchmark.harvest_cards(driver)
+    assert [card["index"] for card in cards] == [0, 1, 3] # The ad card has no link
+    assert cards[0] == {
+        "index": 0,
+        "href": "https://mamikos.com/room/kos-melati-tipe-a-jatinegara-jakarta-timur",
+        "name": "Kos Melati Tipe A Jatinegara Jakarta Timur",
+        "price": "Rp1.500.000/ bulan",
+        "area": "Jatinegara",
+    }
+
+
+def test_replay_card_harvest_collects_canonical_urls(benchmark, link_module):
+    urls = benchmark.replay_card_harvest(link_module, SEARCH_PAGE.read_text(encoding="utf-8"), SEARCH_URL)
+    assert urls == ["https://mamikos.com/room/kos-melati-tipe-a-jatinegara-jakarta-timur",
+                    "https://mamikos.com/room/kos-mawar-residence-tebet-jakarta-selatan"]
+
+
+def test_benchmark_times_search_and_listing_stages(benchmark, tmp_path, monkeypatch):
+    corpus = PageCorpus(tmp_path / "corpus")
+    corpus.save("search", SEARCH_URL, SEARCH_PAGE.read_text(encoding="utf-8"))
+    for page in sorted((FIXTURES / "listings").glob("*.html")):
+        corpus.save("listing", f"https://mamikos.com/room/{page.stem}", page.read_text(encoding="utf-8"))
+
+    report = tmp_path / "report.json"
+    monkeypatch.setattr("sys.argv", ["benchmark", str(tmp_path / "corpus"), "--repeat", "1", "--update-golden",
+                                     "--json", str(report)])
+    assert benchmark.main() == 0
+    stages = {row["stage"]: row["pages"] for row in json.loads(report.read_text(encoding="utf-8"))["stages"]}
+    assert stages["harvest_cards"] == 1
+    assert stages["full_record"] == 3
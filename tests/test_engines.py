@@ -0,0 +1,156 @@
+"""Smoke tests for the browser-free engines, pool mode and API pagination against local fixture servers."""
+import json
+from urllib.request import urlopen
+
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import listing_urls, write_url_csv
+from mamikos_utils import DriverManager, RetryScheduler
+
+
+class StubDriver:
+    """
+    Just enough of a Chrome WebDriver for the Selenium path: pages come from the fixture
+    server, the adaptive wait reports "ready" at once and the single-pass field script is
+    answered from the same selectors with BeautifulSoup.
+    """
+
+    def __init__(self):
+        self.current_url = "about:blank"
+        self.page_source = ""
+        self.title = ""
+        self.visited = []
+
+    def get(self, url):
+        with urlopen(url) as response:
+            self.page_source = response.read().decode("utf-8")
+        self.current_url = url
+        soup = BeautifulSoup(self.page_source, "html.parser")
+        self.title = soup.title.get_text(strip=True) if soup.title else ""
+        self.visited.append(url)
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script, *args):
+        return {"reason": "ready", "missing": []}
+
+    def execute_script(self, script, *args):
+        if not args or not isinstance(args[0], list): # Scrolling and other fire-and-forget scripts
+            return None
+        soup = BeautifulSoup(self.page_source, "html.parser")
+        candidates = {}
+        for data_key, selectors in args[0]:
+            texts = []
+            for selector in selectors:
+                if ":contains(" in selector:
+                    continue
+                texts += [element.get_text(" ", strip=True) for element in soup.select(selector)]
+            candidates[data_key] = texts
+        return candidates
+
+    def quit(self):
+        pass
+
+
+def scraper_for(data_module, tmp_path, **kwargs):
+    scraper = data_module.ImprovedMamikosScraper(**kwargs)
+    scraper.readiness_mode = "adaptive" # No fixed sleeps
+    scraper.retry_scheduler = RetryScheduler(base_delay=0.01, max_delay=0.02, dead_letter_path=tmp_path / "dead.jsonl")
+    return scraper
+
+
+def test_async_engine_scrapes_fixture_pages(data_module, listing_server, tmp_path):
+    urls = listing_urls(listing_server)
+    csv_path = write_url_csv(tmp_path / "urls.csv", urls + [f"{listing_server}/gone.html"])
+    scraper = scraper_for(data_module, tmp_path, fetch_engine="async")
+    try:
+        assert scraper.scrape_products_async(str(csv_path), "Jakarta", concurrency=2, requests_per_second=100,
+                                             burst=4, parse_workers=1)
+    finally:
+        scraper.retry_scheduler.close()
+        scraper.close()
+
+    assert [record["url"] for record in scraper.scraped_data] == urls
+    assert [record["product_number"] for record in scraper.scraped_data] == [1, 2, 3]
+    assert all(record["room_name"].startswith("Kos ") for record in scraper.scraped_data)
+    assert scraper.scraped_data[2]["price"] == "Rp1.500.000 / bulan"
+    # A 404 is dead-lettered straight away, without a browser fallback
+    dead = RetryScheduler.load_dead_letters(tmp_path / "dead.jsonl")
+    assert [(entry["url"], entry["kind"]) for entry in dead] == [(f"{listing_server}/gone.html", "http_error")]
+    assert scraper.driver is None
+
+
+def test_pool_mode_with_stub_driver(data_module, listing_server, tmp_path):
+    urls = listing_urls(listing_server)
+    csv_path = write_url_csv(tmp_path / "urls.csv", urls)
+    drivers = []
+
+    def factory():
+        drivers.append(StubDriver())
+        return drivers[-1]
+
+    manager = DriverManager(factory)
+    scraper = scraper_for(data_module, tmp_path, driver_manager=manager)
+    try:
+        assert scraper.scrape_products_pool(str(csv_path), "Depok", workers=2, max_requests_per_second=0)
+    finally:
+        scraper.retry_scheduler.close()
+        scraper.close()
+        manager.close()
+
+    assert len(drivers) == 2 # One session per worker
+    assert sorted(url for driver in drivers for url in driver.visited) == sorted(urls)
+    assert [record["url"] for record in scraper.scraped_data] == urls # CSV order restored
+    assert {record["region"] for record in scraper.scraped_data} == {"Depok"}
+    by_name = {record["room_name"]: record for record in scraper.scraped_data}
+    melati = by_name["Kos Melati Tipe A Jatinegara Jakarta Timur"]
+    assert melati["price"] == "Rp1.500.000 / bulan"
+    assert melati["room_availability_bs"] == "Sisa 2 kamar"
+    assert len(scraper.readiness_seconds) == 3 # Workers report into the shared metric lists
+
+
+def paginate(link_module, base_url, query, max_pages=None):
+    request = {"url": f"{base_url}/api/v1/room/list?{query}", "method": "GET", "headers": {}}
+    paginator = link_module.ListingApiPaginator(request, max_pages=max_pages, max_requests_per_second=0)
+    cards = list(paginator.iter_records())
+    return [card["url"] for card in cards], paginator.pages_fetched
+
+
+def melati(*numbers):
+    return [f"https://mamikos.com/room/kos-melati-{n}-jatinegara" for n in numbers]
+
+
+@pytest.mark.parametrize("name, query, expected_urls, expected_pages", [
+    ("has_more_false", "offset=0", melati(0, 1), 1),
+    ("short_page", "offset=0&limit=3", melati(0, 1, 2, 3), 2),
+    ("empty_page", "offset=0", melati(0, 1, 2, 3), 3),
+    ("seen_page", "offset=0", melati(0, 1), 2),
+    ("page_numbers", "page=1", melati(0, 1, 2), 2),
+])
+def test_api_paginator_stopping_conditions(link_module, recorded_api, name, query, expected_urls, expected_pages):
+    urls, pages = paginate(link_module, recorded_api(name), query)
+    assert urls == expected_urls
+    assert pages == expected_pages
+
+
+def test_api_paginator_max_pages(link_module, recorded_api):
+    assert paginate(link_module, recorded_api("empty_page"), "offset=0", max_pages=1) == (melati(0, 1), 1)
+
+
+def test_api_paginator_keeps_repeated_parameters(link_module, recorded_api, tmp_path):
+    request = {"url": f"{recorded_api('empty_page')}/api?tags[]=ac&tags[]=wifi&offset=0", "method": "GET"}
+    paginator = link_module.ListingApiPaginator(request, max_requests_per_second=0, record_dir=tmp_path)
+    sent = []
+    original = paginator.session.request
+
+    def spy(method, url, **kwargs):
+        response = original(method, url, **kwargs)
+        sent.append(response.request.url)
+        return response
+
+    paginator.session.request = spy
+    assert len(list(paginator.iter_records())) == 4
+    assert all("tags%5B%5D=ac&tags%5B%5D=wifi" in url for url in sent)
+    assert json.loads((tmp_path / "offset_2.json").read_text(encoding="utf-8"))["rooms"][0]["_id"] == 4102
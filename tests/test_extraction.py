@@ -0,0 +1,53 @@
+"""The single-parse lxml extraction must give the same record as the BeautifulSoup path."""
+import pytest
+from bs4 import BeautifulSoup
+
+from conftest import FIXTURES
+
+LISTING_PAGES = sorted((FIXTURES / "listings").glob("*.html"))
+
+
+def soup_record(ds, html, url):
+    soup = BeautifulSoup(html, "html.parser")
+    record = {"url": url, "page_title": soup.title.get_text(strip=True) if soup.title else ""}
+    record.update(ds.scrape_mamikos_details_from_html(html))
+    record.update(ds.extract_product_fields_from_soup(soup))
+    return record
+
+
+@pytest.mark.parametrize("path", LISTING_PAGES, ids=lambda path: path.stem)
+def test_lxml_record_matches_soup_record(data_module, path):
+    html = path.read_text(encoding="utf-8")
+    assert data_module.scrape_product_data_from_html(html, path.name) == soup_record(data_module, html, path.name)
+
+
+def test_ruby_annotations_are_left_out_like_get_text(data_module):
+    html = ("<html><head><title>Kos</title></head><body>"
+            "<p class='detail-title__room-name'>Kos <ruby>Sakura<rp>(</rp><rt>sa-ku-ra</rt><rp>)</rp></ruby> Tebet</p>"
+            "<p class='detail-kost-overview__availability-text bg-c-text bg-c-text--body-2'>Sisa <rt>x</rt>1 kamar</p>"
+            "</body></html>")
+    record = data_module.scrape_product_data_from_html(html, "u")
+    assert record == soup_record(data_module, html, "u")
+    assert record["room_name"] == "Kos Sakura Tebet"
+    assert record["room_availability_bs"] == "Sisa1 kamar"
+
+
+@pytest.mark.parametrize("selector, expected", [
+    ("h1", ["a"]),
+    ("main h1", ["a"]),
+    ("p.x.y", ["c"]),
+    ("[class*='ti']", ["b"]),
+    ("p[data-v-1].x", ["c"]),
+    ("*[data-v-1='']", ["c"]),
+    ("section p", []),
+])
+def test_lxml_page_select(data_module, selector, expected):
+    page = data_module.LxmlPage.parse("<main><div><h1>a</h1></div></main><div class='title'>b</div>"
+                                      "<p data-v-1 class='y x'>c</p>")
+    assert [element.text for element in page.select(selector)] == expected
+
+
+def test_lxml_page_rejects_unsupported_selectors(data_module):
+    page = data_module.LxmlPage.parse("<p>a</p>")
+    with pytest.raises(ValueError):
+        page.select("div > p")
@@ -0,0 +1,87 @@
+"""Incremental re-crawls: planning over the whole CSV, the max_products cap and failed refreshes."""
+import json
+
+from conftest import listing_urls, write_url_csv
+from mamikos_utils import RetryScheduler, canonicalize_url
+
+
+def room(slug):
+    return f"https://mamikos.com/room/{slug}"
+
+
+def previous_record(url, scraped_at, name):
+    return {"url": url, "room_name": name, "price": "Rp1.000.000", "scraped_at": scraped_at}
+
+
+def make_scraper(data_module, tmp_path):
+    scraper = data_module.ImprovedMamikosScraper(fetch_engine="async")
+    scraper.retry_scheduler = RetryScheduler(base_delay=0.01, max_delay=0.02, dead_letter_path=tmp_path / "dead.jsonl")
+    return scraper
+
+
+def test_max_products_caps_only_the_urls_to_scrape(data_module, tmp_path):
+    previous_path = tmp_path / "previous.json"
+    previous_path.write_text(json.dumps([
+        previous_record(room("a"), "2026-01-01T00:00:00+00:00", "A"),
+        previous_record(room("b"), "2026-01-02T00:00:00+00:00", "B"),
+        previous_record(room("c"), "2026-09-01T00:00:00+00:00", "C"),
+        previous_record(room("d"), "2026-09-01T00:00:00+00:00", "D"),
+    ]), encoding="utf-8")
+    csv_path = write_url_csv(tmp_path / "urls.csv", [room(slug) for slug in "abcef"])
+    scraper = make_scraper(data_module, tmp_path)
+
+    delisted = scraper.prepare_incremental_crawl(str(csv_path), previous_path, region_name="Bekasi",
+                                                 refresh_fraction=0.5, max_products=2)
+
+    # a and b (oldest) are refreshed and use up max_products; c is kept; e and f wait for the next run
+    assert [record["url"] for record in delisted] == [room("d")]
+    assert [record["url"] for record in scraper.scraped_data] == [room("c")]
+    assert scraper.completed_urls == {room("c"), room("e"), room("f")}
+    assert set(scraper.incremental_refresh) == {room("a"), room("b")}
+    assert scraper.incremental_url_count == 5
+
+    # Only a gets a new record; b failed and keeps its previous one
+    scraper.record_product({"url": room("a"), "room_name": "A (new)", "product_number": 1, "region": "Bekasi"},
+                           source_url=room("a"))
+    scraper.finish_incremental_crawl(delisted)
+    summary = [(record["url"], record["product_number"], record["room_name"], record["listing_status"])
+               for record in scraper.scraped_data]
+    assert summary == [
+        (room("a"), 1, "A (new)", "active"),
+        (room("b"), 2, "B", "active"),
+        (room("c"), 3, "C", "active"),
+        (room("d"), 6, "D", "delisted"),
+    ]
+
+
+def test_unreadable_csv_aborts_instead_of_delisting_everything(data_module, tmp_path):
+    previous_path = tmp_path / "previous.json"
+    previous_path.write_text(json.dumps([previous_record(room("a"), "2026-01-01T00:00:00+00:00", "A")]), encoding="utf-8")
+    scraper = make_scraper(data_module, tmp_path)
+    assert scraper.prepare_incremental_crawl(str(tmp_path / "missing.csv"), previous_path) is None
+    assert not scraper.incremental_crawl
+    assert scraper.scraped_data == []
+
+
+def test_failed_refresh_keeps_previous_record_end_to_end(data_module, listing_server, tmp_path):
+    gone = canonicalize_url(f"{listing_server}/gone.html")
+    live = [canonicalize_url(url) for url in listing_urls(listing_server)]
+    previous_path = tmp_path / "previous.json"
+    previous_path.write_text(json.dumps([previous_record(gone, "2026-01-01T00:00:00+00:00", "Gone"),
+                                         previous_record(live[0], "2026-01-02T00:00:00+00:00", "Old name")]),
+                             encoding="utf-8")
+    csv_path = write_url_csv(tmp_path / "urls.csv", [gone] + live)
+    scraper = make_scraper(data_module, tmp_path)
+    try:
+        delisted = scraper.prepare_incremental_crawl(str(csv_path), previous_path, refresh_fraction=1.0)
+        scraper.scrape_products_async(str(csv_path), concurrency=2, requests_per_second=100, burst=4, parse_workers=1)
+        scraper.finish_incremental_crawl(delisted)
+    finally:
+        scraper.retry_scheduler.close()
+        scraper.close()
+
+    by_url = {record["url"]: record for record in scraper.scraped_data}
+    assert by_url[gone]["room_name"] == "Gone" # 404 on refresh: the previous record stays
+    assert by_url[gone]["product_number"] == 1
+    assert by_url[live[0]]["room_name"] != "Old name"
+    assert [record["product_number"] for record in scraper.scraped_data] == [1, 2, 3, 4]
@@ -0,0 +1,60 @@
+"""The streaming pipeline must finish even when its detail workers die."""
+import threading
+
+import pytest
+
+from mamikos_utils import load_script
+
+
+@pytest.fixture(scope="module")
+def pipeline():
+    return load_script("Mamikos Pipeline.py", "mamikos_pipeline")
+
+
+class EndlessLinks:
+    def __init__(self):
+        self.yielded = 0
+
+    def iter_product_links(self, search_url):
+        while True:
+            self.yielded += 1
+            yield f"https://mamikos.com/room/kos-{self.yielded}"
+
+
+class CrashingDetails:
+    """Data scraper whose detail workers crash on their first URL"""
+
+    def __init__(self):
+        self.completed_urls = set()
+        self.seen_index = None
+        self.scraped_data = []
+        self.retried = False
+
+    def new_worker_session(self):
+        return self
+
+    def close(self):
+        pass
+
+    def run_queue_worker(self, session, url_queue, rate_limiter, worker_number, region_name):
+        url_queue.get()
+        raise RuntimeError("chrome not reachable")
+
+    def run_retries(self, region_name, rate_limiter):
+        self.retried = True
+
+
+def test_link_stage_stops_when_every_worker_has_died(pipeline, monkeypatch):
+    monkeypatch.setattr(pipeline, "QUEUE_PUT_TIMEOUT", 0.05)
+    monkeypatch.setattr(threading, "excepthook", lambda args: None) # The worker crashes are expected
+    links, details = EndlessLinks(), CrashingDetails()
+    result = {}
+    runner = threading.Thread(target=lambda: result.update(stats=pipeline.run_pipeline(
+        links, details, "https://mamikos.com/cari", "Jakarta", detail_workers=2, queue_size=2,
+        max_requests_per_second=0)), daemon=True)
+    runner.start()
+    runner.join(timeout=10)
+
+    assert not runner.is_alive(), "run_pipeline hung on a full queue with no workers left"
+    assert details.retried
+    assert result["stats"]["queued"] <= 2 + 2 # Two taken by the crashed workers, two left in the queue
@@ -0,0 +1,138 @@
+"""
+Batch post-processing against captured scraper output.
+
+fixtures/captured holds what the scraper itself wrote for the three saved listing
+pages in fixtures/listings plus one delisted listing (an incremental re-crawl):
+save_data_to_json(), save_data_to_csv() and the ScrapeJournal of the same run.
+"""
+import csv
+import json
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import mamikos_postprocess as mp
+from conftest import FIXTURES
+from mamikos_storage import normalise_record
+
+CAPTURED = FIXTURES / "captured"
+SAMPLES = {
+    "json": CAPTURED / "mamikos_data.json",
+    "csv": CAPTURED / "mamikos_data.csv",
+    "journal": CAPTURED / "mamikos_data.journal.jsonl",
+}
+MELATI = "https://mamikos.com/room/kos-melati-tipe-a-jatinegara"
+MAWAR = "https://mamikos.com/room/kos-mawar-residence-tebet"
+ANGGREK = "https://mamikos.com/room/kos-anggrek-putra-margonda"
+KENANGA = "https://mamikos.com/room/kos-kenanga-exclusive-cibubur"
+
+
+@pytest.fixture(params=list(SAMPLES), scope="module")
+def sample(request):
+    """(name, raw records DataFrame, post-processed table) for each captured output format"""
+    records = mp.load_records(SAMPLES[request.param])
+    return request.param, records, mp.postprocess(records)
+
+
+def raw_records(name):
+    """The records as the scraper wrote them, read without pandas (missing keys stay missing)"""
+    path = SAMPLES[name]
+    with open(path, encoding="utf-8", newline="") as f:
+        if name == "csv":
+            return list(csv.DictReader(f))
+        if name == "journal":
+            return [json.loads(line)["record"] for line in f if line.strip()]
+        return json.load(f)
+
+
+def by_url(table):
+    return table.set_index("url")
+
+
+def test_loaders_read_every_record(sample):
+    name, records, table = sample
+    expected = [ANGGREK, MAWAR, MELATI] + ([] if name == "journal" else [KENANGA]) # Delisted records are not journaled
+    assert records["url"].tolist() == expected
+    assert table["url"].tolist() == expected
+
+
+def test_column_dtypes(sample):
+    _, _, table = sample
+    expected = {
+        "url": "string", "room_name": "string", "listing_status": "string",
+        "product_number": "Int64", "price_idr": "Int64", "price_before_discount_idr": "Int64", "deposit_idr": "Int64",
+        "discount_idr": "Int64", "rooms_available": "Int64", "rating_count": "Int64", "transaction_count": "Int64",
+        "discount_pct": "float64", "room_area_m2": "float64", "rating": "float64",
+        "electricity_included": "boolean",
+    }
+    assert {column: str(table[column].dtype) for column in expected} == expected
+    assert isinstance(table["scraped_at"].dtype, pd.DatetimeTZDtype)
+    assert all(isinstance(table[column].dtype, pd.SparseDtype) for column in table if column.startswith("facility_"))
+
+
+def test_parsed_values(sample):
+    _, _, table = sample
+    rows = by_url(table)
+    melati, mawar, anggrek = rows.loc[MELATI], rows.loc[MAWAR], rows.loc[ANGGREK]
+
+    assert (melati["price_idr"], melati["price_before_discount_idr"], melati["deposit_idr"]) == (1500000, 1600000, 500000)
+    assert (melati["discount_idr"], melati["rooms_available"], melati["room_area_m2"]) == (100000, 2, 12.0)
+    assert (melati["rating"], melati["rating_count"], melati["transaction_count"]) == (4.8, 12, 10)
+    assert melati["electricity_included"] == True and math.isnan(melati["discount_pct"]) # noqa: E712 (numpy bool)
+
+    assert (mawar["price_idr"], mawar["rooms_available"], mawar["room_area_m2"]) == (2350000, 0, 14.0)
+    assert mawar["electricity_included"] == False # noqa: E712 (Token Mandiri)
+    assert pd.isna(mawar["price_before_discount_idr"]) and pd.isna(mawar["rating_count"]) and math.isnan(mawar["rating"])
+
+    assert (anggrek["rating"], anggrek["discount_pct"], anggrek["deposit_idr"]) == (4.5, 10.0, 250000)
+    assert anggrek["electricity_included"] == False and pd.isna(anggrek["discount_idr"]) # noqa: E712
+    assert melati["scraped_at"] == pd.Timestamp("2026-10-17T01:59:08Z")
+
+
+def test_delisted_listing(sample):
+    name, _, table = sample
+    if name == "journal":
+        pytest.skip("the journal only holds scraped records")
+    kenanga = by_url(table).loc[KENANGA]
+    assert kenanga["listing_status"] == "delisted"
+    assert kenanga["delisted_at"] == pd.Timestamp("2026-10-17T01:59:08Z")
+    assert (kenanga["price_idr"], kenanga["room_area_m2"], kenanga["product_number"]) == (3100000, 20.0, 4)
+    assert pd.isna(kenanga["owner_name"]) and pd.isna(kenanga["electricity_included"])
+
+
+NUMERIC_COLUMNS = ["product_number", "price_idr", "price_before_discount_idr", "deposit_idr", "room_area_m2",
+                   "rooms_available", "rating", "rating_count", "transaction_count", "electricity_included"]
+TEXT_COLUMNS = ["url", "region", "room_name", "owner_name", "tipe_kos", "location", "room_size", "listing_status"]
+
+
+def test_matches_normalise_record_on_every_row(sample):
+    name, _, table = sample
+    for i, record in enumerate(raw_records(name)):
+        expected = normalise_record(record)
+        for column in NUMERIC_COLUMNS + TEXT_COLUMNS:
+            value = table[column].iloc[i]
+            value = None if pd.isna(value) else value
+            assert value == expected[column], (record["url"], column)
+        for column in ("scraped_at", "delisted_at"):
+            value = table[column].iloc[i]
+            assert (None if pd.isna(value) else value.to_pydatetime()) == expected[column], (record["url"], column)
+        facilities = sorted(column[len("facility_"):] for column in table if column.startswith("facility_") and table[column].iloc[i])
+        assert facilities == sorted(set(expected["facilities"])), record["url"]
+
+
+def test_facility_matrix_from_csv_strings():
+    records = mp.load_records(SAMPLES["csv"])
+    assert records["all_facilities_bs"].iloc[0] == "3 x 3 meter; Tidak termasuk listrik; Kasur; Meja; WiFi"
+    matrix = mp.facility_matrix(records["all_facilities_bs"])
+    assert all(isinstance(dtype, pd.SparseDtype) for dtype in matrix.dtypes)
+    assert "facility_AC" in matrix and "facility_ AC" not in matrix # '; '-joined text is stripped
+    dense = matrix.sparse.to_dense()
+    assert dense["facility_AC"].tolist() == [0, 1, 1, 1]
+    assert dense["facility_WiFi"].tolist() == [1, 0, 1, 0]
+    assert dense.sum(axis=1).tolist() == [5, 4, 7, 3]
+    assert dense.to_numpy().dtype == np.uint8
+    # The same matrix as from the JSON lists
+    from_json = mp.facility_matrix(mp.load_records(SAMPLES["json"])["all_facilities_bs"])
+    assert from_json.sparse.to_dense().equals(dense)
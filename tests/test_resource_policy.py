@@ -0,0 +1,26 @@
+"""ResourcePolicy blocklists: categories, extra patterns and allowed patterns."""
+import pytest
+
+from mamikos_utils import ResourcePolicy
+
+
+@pytest.mark.parametrize("url, blocked", [
+    ("https://static.mamikos.com/uploads/kos/photo.jpg", True),
+    ("https://static.mamikos.com/uploads/kos/photo.webp?w=720", True),
+    ("https://mamikos.com/assets/icons/listrik.svg", False),
+    ("https://mamikos.com/assets/icons/listrik.svg?v=2", False),
+    ("https://www.google-analytics.com/analytics.js", True),
+    ("https://mamikos.com/room/kos-melati", False),
+])
+def test_allowed_pattern_covers_its_query_string_variant(url, blocked):
+    policy = ResourcePolicy(allow=("*.svg",))
+    assert policy.is_blocked(url) is blocked
+    assert "*.svg?*" not in policy.patterns
+
+
+def test_categories_and_extra_patterns():
+    policy = ResourcePolicy(block=("images",), deny=("*intercom.io*",), allow=("*.png",))
+    assert policy.categories == ["images"]
+    assert policy.is_blocked("https://widget.intercom.io/widget/abc")
+    assert not policy.is_blocked("https://mamikos.com/logo.png?x=1")
+    assert not policy.is_blocked("https://fonts.gstatic.com/s/font.woff2")
@@ -0,0 +1,26 @@
+"""RetryScheduler: backoff bookkeeping and the dead-letter file."""
+from mamikos_utils import RetryScheduler
+
+
+def test_dead_letters_from_earlier_runs_are_kept(tmp_path):
+    path = tmp_path / "links.dead_letter.jsonl"
+    for run, url in enumerate(["https://mamikos.com/room/a", "https://mamikos.com/room/b"]):
+        scheduler = RetryScheduler(dead_letter_path=path)
+        scheduler.dead_letter(url, "http_error", RuntimeError("404"), product_number=run + 1, region="Depok")
+        scheduler.close()
+
+    entries = RetryScheduler.load_dead_letters(path)
+    assert [(entry["url"], entry["product_number"]) for entry in entries] == [
+        ("https://mamikos.com/room/a", 1), ("https://mamikos.com/room/b", 2)]
+
+
+def test_retries_until_max_attempts_then_dead_letters(tmp_path):
+    scheduler = RetryScheduler(max_attempts=2, base_delay=0, max_delay=0, dead_letter_path=tmp_path / "dead.jsonl")
+    url = "https://mamikos.com/room/a"
+    assert scheduler.schedule(url, "timeout", TimeoutError("slow"))
+    assert [item["url"] for item in scheduler.iter_due()] == [url]
+    assert not scheduler.schedule(url, "timeout", TimeoutError("slow again")) # Second failure: attempts used up
+    scheduler.dead_letter(url, "timeout", TimeoutError("slow again"))
+    scheduler.close()
+    assert [(entry["kind"], entry["attempts"]) for entry in RetryScheduler.load_dead_letters(tmp_path / "dead.jsonl")] == [
+        ("timeout", 2)]
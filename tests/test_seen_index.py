@@ -0,0 +1,62 @@
+"""Seen-URL indexes: per-stage namespaces and Bloom filter persistence."""
+import sqlite3
+
+import pytest
+
+from mamikos_utils import BloomSeenUrlIndex, SeenUrlIndex, open_seen_index
+
+LISTING = "https://mamikos.com/room/kos-melati-tipe-a-jatinegara"
+
+
+def test_sqlite_stages_share_a_file_without_sharing_urls(tmp_path):
+    path = tmp_path / "seen.sqlite"
+    links = open_seen_index(path, stage="links")
+    details = open_seen_index(path, stage="details")
+    try:
+        assert links.add(LISTING + "?utm_source=x")
+        assert LISTING in links
+        assert LISTING not in details # Collected is not the same as scraped
+        assert details.add(LISTING)
+        assert (len(links), len(details)) == (1, 1)
+    finally:
+        links.close()
+        details.close()
+
+
+def test_sqlite_index_from_before_stages_is_copied_into_each_stage(tmp_path):
+    path = tmp_path / "seen.sqlite"
+    with sqlite3.connect(path) as db:
+        db.execute("CREATE TABLE seen_urls (canonical_url TEXT PRIMARY KEY, first_seen_at REAL NOT NULL)")
+        db.execute("INSERT INTO seen_urls VALUES (?, 0)", (LISTING,))
+    db.close()
+    index = SeenUrlIndex(path, stage="links")
+    try:
+        assert LISTING in index
+    finally:
+        index.close()
+
+
+def test_unknown_stage_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        open_seen_index(tmp_path / "seen.sqlite", stage="detail")
+
+
+def test_bloom_filter_is_saved_periodically(tmp_path):
+    path = tmp_path / "seen.bloom"
+    index = BloomSeenUrlIndex(path, capacity=1000, save_every=2, save_interval=3600)
+    index.add(LISTING + "-1")
+    assert not path.exists()
+    index.add(LISTING + "-2") # Second new URL: saved without close()
+    reopened = BloomSeenUrlIndex(path)
+    assert LISTING + "-1" in reopened and LISTING + "-2" in reopened
+    assert len(reopened) == 2
+
+
+def test_bloom_filter_belongs_to_one_stage(tmp_path):
+    path = tmp_path / "seen.bloom"
+    index = open_seen_index(path, stage="links", capacity=1000)
+    index.add(LISTING)
+    index.close()
+    assert LISTING in open_seen_index(path, stage="links")
+    with pytest.raises(ValueError, match="own .bloom file"):
+        open_seen_index(path, stage="details")